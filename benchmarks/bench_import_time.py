@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令行启动耗时基准测试
+
+在独立子进程中执行各子命令(含--help)，统计启动耗时并检查是否加载了
+不应加载的重量级依赖。任何一项超出预算或加载了禁止的模块时以非零状态退出，
+可直接用于发现启动性能回退。
+
+使用方法:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 10 --budget-ms 120
+    python benchmarks/bench_import_time.py --top 15   # 列出--help最慢的导入
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 各场景不允许加载的模块
+HELP_FORBIDDEN = ['pandas', 'sqlalchemy', 'requests', 'urllib3', 'openpyxl', 'dotenv']
+QUERY_FORBIDDEN = ['pandas', 'numpy', 'requests', 'urllib3', 'openpyxl']
+
+# (场景名称, 命令行参数, 禁止加载的模块)
+CASES = [
+    ('help', ['--help'], HELP_FORBIDDEN),
+    ('crawl --help', ['crawl', '--help'], HELP_FORBIDDEN),
+    ('export --help', ['export', '--help'], HELP_FORBIDDEN),
+    ('query --help', ['query', '--help'], HELP_FORBIDDEN),
+    ('serve --help', ['serve', '--help'], HELP_FORBIDDEN),
+    ('maintain --help', ['maintain', '--help'], HELP_FORBIDDEN),
+    ('backfill --help', ['backfill', '--help'], HELP_FORBIDDEN),
+    ('query --count', ['query', '--count'], QUERY_FORBIDDEN),
+]
+
+CHILD_TEMPLATE = r'''
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.cli import main
+try:
+    main({argv!r})
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print("\n__BENCH__" + json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+'''
+
+def run_case(argv, cwd):
+    """在子进程中执行一次命令
+
+    Args:
+        argv: 命令行参数
+        cwd: 子进程工作目录
+
+    Returns:
+        (进程总耗时毫秒, 进程内耗时毫秒, 已加载模块集合)
+    """
+    code = CHILD_TEMPLATE.format(root=ROOT_DIR, argv=argv)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    marker = result.stdout.rsplit('__BENCH__', 1)[1]
+    payload = json.loads(marker)
+    return wall_ms, payload['elapsed'] * 1000, set(payload['modules'])
+
+def interpreter_baseline(repeat):
+    """测量空解释器启动耗时(毫秒)，用于扣除解释器自身开销"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def top_imports(argv, cwd, limit):
+    """使用-X importtime列出最慢的导入
+
+    Args:
+        argv: 命令行参数
+        cwd: 子进程工作目录
+        limit: 输出条数
+
+    Returns:
+        [(累计耗时微秒, 模块名)]
+    """
+    code = CHILD_TEMPLATE.format(root=ROOT_DIR, argv=argv)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+def main():
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='命令行启动耗时基准测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景的执行次数，默认5次')
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='--help场景扣除解释器启动后的耗时预算(毫秒)，默认150')
+    parser.add_argument('--top', type=int, default=0, help='列出--help场景最慢的N个导入')
+    parser.add_argument('--json', type=str, default=None, help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    baseline = interpreter_baseline(args.repeat)
+    print(f"解释器启动基线: {baseline:.1f} ms")
+
+    results = []
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, argv, forbidden in CASES:
+            wall_samples, inproc_samples, modules = [], [], set()
+            for _ in range(args.repeat):
+                wall_ms, inproc_ms, loaded = run_case(argv, workdir)
+                wall_samples.append(wall_ms)
+                inproc_samples.append(inproc_ms)
+                modules |= loaded
+
+            leaked = [m for m in forbidden if m in modules]
+            wall = statistics.median(wall_samples)
+            inproc = statistics.median(inproc_samples)
+            # 耗时预算只约束--help场景，实际执行的命令耗时取决于数据量
+            over_budget = argv[-1] == '--help' and (wall - baseline) > args.budget_ms
+            status = 'FAIL' if leaked or over_budget else 'ok'
+            failed = failed or status == 'FAIL'
+
+            print(f"{name:<16} 总耗时 {wall:7.1f} ms  进程内 {inproc:7.1f} ms  "
+                  f"模块数 {len(modules):4d}  {status}"
+                  + (f"  加载了禁止的模块: {', '.join(leaked)}" if leaked else ''))
+            results.append({
+                'case': name,
+                'wall_ms': round(wall, 2),
+                'in_process_ms': round(inproc, 2),
+                'modules': len(modules),
+                'forbidden_loaded': leaked,
+                'status': status,
+            })
+
+        if args.top:
+            print(f"\n--help 最慢的 {args.top} 个导入(累计耗时):")
+            for cumulative, module in top_imports(['--help'], workdir, args.top):
+                print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'baseline_ms': round(baseline, 2), 'budget_ms': args.budget_ms,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
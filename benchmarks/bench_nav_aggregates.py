@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+净值聚合基准测试
+
+生成指定数量的模拟产品和逐日净值写入临时SQLite数据库，比较三种方式的耗时：
+每次从products × 净值全表连接按维度分组重新计算(报表原来的做法)、查询预先计算的
+nav_aggregates表，写入一天新净值后增量更新聚合，以及部分产品更换发行机构后只重新计算
+原发行机构和新发行机构的单元格。并抽查两种计算方式的结果是否一致。
+
+使用方法:
+    python benchmarks/bench_nav_aggregates.py
+    python benchmarks/bench_nav_aggregates.py --products 5000 --days 60 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from src.database.db_manager import DatabaseManager
+from src.database.partitions import ALL_VIEW
+
+ISSUERS = ['招银理财', '工银理财', '建信理财', '农银理财', '中银理财', '交银理财', '光大理财', '兴银理财']
+RISK_LEVELS = ['R1', 'R2', 'R3', 'R4', 'R5']
+PRODUCT_TYPES = ['固定收益类', '混合类', '权益类', '商品及金融衍生品类']
+
+
+def make_navs(rng: random.Random, products: int, day: date):
+    """生成一天的模拟净值"""
+    return [{'product_code': f'Z{i:07d}', 'nav_date': day.isoformat(),
+             'current_nav': round(rng.uniform(0.85, 1.3), 4)} for i in range(products)]
+
+
+def full_scan(engine, dimension: str):
+    """从净值和产品全表连接按维度分组，逐单元格计算中位数"""
+    cells = defaultdict(list)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT n.nav_date, p.{dimension}, n.current_nav FROM {ALL_VIEW} n "
+            f"JOIN products p ON n.product_code = p.product_code WHERE n.current_nav IS NOT NULL"
+        ))
+        for nav_date, value, nav in rows:
+            cells[(str(nav_date), value or '')].append(nav)
+    return {key: (len(navs), statistics.median(navs)) for key, navs in cells.items()}
+
+
+def timed(func, repeat: int):
+    """重复执行并返回(中位耗时, 最后一次的结果)"""
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='净值聚合基准测试')
+    parser.add_argument('--products', type=int, default=1000, help='模拟产品数，默认1000')
+    parser.add_argument('--days', type=int, default=20, help='净值天数，默认20')
+    parser.add_argument('--repeat', type=int, default=5, help='查询重复次数，默认5')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_cube_')
+    db = DatabaseManager(f"sqlite:///{os.path.join(workdir, 'cube.db')}",
+                         archive_dir=os.path.join(workdir, 'archive'))
+    rng = random.Random(42)
+    start_day = date.today().replace(day=1) - timedelta(days=args.days)
+    db.save_products([{'product_code': f'Z{i:07d}', 'product_name': f'模拟产品{i}', 'issuer': rng.choice(ISSUERS),
+                       'risk_level': rng.choice(RISK_LEVELS), 'product_type': rng.choice(PRODUCT_TYPES),
+                       'currency': '人民币'} for i in range(args.products)])
+
+    start = time.perf_counter()
+    with db.cube.batch():
+        for offset in range(args.days):
+            db.save_product_navs(make_navs(rng, args.products, start_day + timedelta(days=offset)))
+    load_seconds = time.perf_counter() - start
+
+    results = []
+    mismatches = 0
+    for dimension in ('issuer', 'risk_level', 'product_type'):
+        scan_seconds, scanned = timed(lambda: full_scan(db.engine, dimension), args.repeat)
+        cube_seconds, cells = timed(lambda: db.get_nav_aggregates(dimension), args.repeat)
+        precomputed = {(str(cell['nav_date']), cell['dim_value']): (cell['nav_count'], cell['median_nav'])
+                       for cell in cells}
+        same = scanned.keys() == precomputed.keys() and all(
+            scanned[key][0] == precomputed[key][0] and abs(scanned[key][1] - precomputed[key][1]) < 1e-9
+            for key in scanned)
+        if not same:
+            mismatches += 1
+        results.append({'dimension': dimension, 'cells': len(cells),
+                        'full_scan_ms': round(scan_seconds * 1000, 2), 'cube_ms': round(cube_seconds * 1000, 2),
+                        'same_results': same})
+
+    # 写入新一天的净值，增量更新只重新计算这一天
+    new_navs = make_navs(rng, args.products, start_day + timedelta(days=args.days))
+    with db.cube.batch():
+        db.save_product_navs(new_navs)
+        start = time.perf_counter()
+    incremental_seconds = time.perf_counter() - start
+
+    # 1%的产品更换发行机构，只重新计算这些产品有净值的日期上原取值和新取值的单元格
+    moved = [{'product_code': f'Z{i:07d}', 'issuer': rng.choice(ISSUERS)}
+             for i in rng.sample(range(args.products), max(1, args.products // 100))]
+    start = time.perf_counter()
+    db.save_products(moved)
+    regroup_seconds = time.perf_counter() - start
+    regrouped = {(str(cell['nav_date']), cell['dim_value']): (cell['nav_count'], cell['median_nav'])
+                 for cell in db.get_nav_aggregates('issuer')}
+
+    start = time.perf_counter()
+    db.rebuild_nav_aggregates()
+    rebuild_seconds = time.perf_counter() - start
+    rebuilt = {(str(cell['nav_date']), cell['dim_value']): (cell['nav_count'], cell['median_nav'])
+               for cell in db.get_nav_aggregates('issuer')}
+    if regrouped != rebuilt:
+        mismatches += 1
+    db.close()
+
+    summary = {
+        'products': args.products, 'days': args.days, 'load_seconds': round(load_seconds, 2),
+        'results': results,
+        'incremental_refresh_seconds': round(incremental_seconds, 3),
+        'regrouped_products': len(moved), 'regroup_refresh_seconds': round(regroup_seconds, 3),
+        'regroup_same_results': regrouped == rebuilt,
+        'full_rebuild_seconds': round(rebuild_seconds, 3),
+    }
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"{args.products} 个产品 × {args.days} 天，写入并建立聚合耗时 {load_seconds:.2f} 秒")
+        for r in results:
+            print(f"{r['dimension']:<14} 单元格 {r['cells']:5d}  全表分组 {r['full_scan_ms']:9.2f} ms  "
+                  f"聚合表 {r['cube_ms']:8.2f} ms  结果一致 {r['same_results']}")
+        print(f"写入一天净值后增量更新聚合 {incremental_seconds:.3f} 秒，全部重新计算 {rebuild_seconds:.3f} 秒")
+        print(f"{len(moved)} 个产品更换发行机构后更新聚合 {regroup_seconds:.3f} 秒，"
+              f"结果与全部重新计算一致 {regrouped == rebuilt}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
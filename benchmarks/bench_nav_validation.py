@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+净值入库校验基准测试
+
+生成指定数量的模拟产品和若干天的历史净值，再按页写入新一天的净值，其中按比例
+注入隔夜跳变、累计净值与当前净值互换、初始净值变化等异常。分别在关闭和开启校验时
+计时，输出入库吞吐(条/秒)、校验本身的耗时占比，以及注入的异常被检出的比例和误报数。
+
+使用方法:
+    python benchmarks/bench_nav_validation.py
+    python benchmarks/bench_nav_validation.py --products 5000 --page-size 500 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.db_manager import DatabaseManager
+from src.database.validation import NavValidator
+
+# 注入的异常类型
+INJECTIONS = ('jump', 'swapped', 'initial')
+
+
+def history(rng: random.Random, products: int, days: int, start_day: date):
+    """生成逐日小幅波动的历史净值，返回(按天的净值列表, 每个产品最后的净值)"""
+    last = {f'Z{i:07d}': (1.0, round(rng.uniform(0.95, 1.2), 4)) for i in range(products)}
+    batches = []
+    for offset in range(days):
+        day = (start_day + timedelta(days=offset)).isoformat()
+        batch = []
+        for code, (initial, current) in last.items():
+            current = round(current * (1 + rng.uniform(-0.003, 0.003)), 4)
+            last[code] = (initial, current)
+            batch.append({'product_code': code, 'nav_date': day, 'initial_nav': initial,
+                          'current_nav': current, 'accumulated_nav': round(current + 0.05, 4)})
+        batches.append(batch)
+    return batches, last
+
+
+def new_day(rng: random.Random, last: dict, day: date, ratio: float):
+    """生成新一天的净值，按比例注入异常，返回(净值列表, {产品编码: 注入类型})"""
+    navs, injected = [], {}
+    for code, (initial, current) in last.items():
+        current = round(current * (1 + rng.uniform(-0.003, 0.003)), 4)
+        accumulated = round(current + 0.05, 4)
+        if rng.random() < ratio:
+            kind = rng.choice(INJECTIONS)
+            injected[code] = kind
+            if kind == 'jump':
+                current, accumulated = round(current * 1.4, 4), round(accumulated * 1.4, 4)
+            elif kind == 'swapped':
+                current, accumulated = accumulated, current
+            else:
+                initial = 0.5
+        navs.append({'product_code': code, 'nav_date': day.isoformat(), 'initial_nav': initial,
+                     'current_nav': current, 'accumulated_nav': accumulated})
+    return navs, injected
+
+
+def run_case(workdir: str, label: str, enabled: bool, products: int, days: int, page_size: int, ratio: float):
+    """建库、写入历史后按页写入新一天的净值，返回统计"""
+    rng = random.Random(7)
+    validator_config = {'enabled': enabled, 'action': 'quarantine', 'max_change': 0.2, 'max_nav': 50.0,
+                        'lookback_days': 31}
+    db = DatabaseManager(f"sqlite:///{os.path.join(workdir, label + '.db')}",
+                         archive_dir=os.path.join(workdir, 'archive'))
+    db.nav_validator = NavValidator.from_config(db.engine, validator_config)
+    db.save_products([{'product_code': f'Z{i:07d}', 'product_name': f'模拟产品{i}'} for i in range(products)])
+    start_day = date.today().replace(day=1) - timedelta(days=days)
+    batches, last = history(rng, products, days, start_day)
+    with db.cube.batch():
+        for batch in batches:
+            db.save_product_navs(batch)
+
+    navs, injected = new_day(rng, last, start_day + timedelta(days=days), ratio)
+    check_seconds = 0.0
+    check = db.nav_validator.check
+
+    def timed_check(*args, **kwargs):
+        nonlocal check_seconds
+        begin = time.perf_counter()
+        try:
+            return check(*args, **kwargs)
+        finally:
+            check_seconds += time.perf_counter() - begin
+
+    db.nav_validator.check = timed_check
+    start = time.perf_counter()
+    for offset in range(0, len(navs), page_size):
+        db.save_product_navs(navs[offset:offset + page_size])
+    elapsed = time.perf_counter() - start
+
+    flagged = {anomaly.product_code for anomaly in db.get_nav_anomalies(limit=len(navs))}
+    db.close()
+    return {
+        'case': label,
+        'rows': len(navs),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(len(navs) / elapsed, 1),
+        'validation_seconds': round(check_seconds, 3),
+        'injected': len(injected),
+        'detected': len(flagged & set(injected)),
+        'false_positives': len(flagged - set(injected)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='净值入库校验基准测试')
+    parser.add_argument('--products', type=int, default=2000, help='模拟产品数，默认2000')
+    parser.add_argument('--days', type=int, default=5, help='历史净值天数，默认5')
+    parser.add_argument('--page-size', type=int, default=100, help='每批写入的净值条数，默认100(一页)')
+    parser.add_argument('--anomaly-ratio', type=float, default=0.02, help='注入异常的比例，默认0.02')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_validation_')
+    results = [run_case(workdir, label, enabled, args.products, args.days, args.page_size, args.anomaly_ratio)
+               for label, enabled in (('off', False), ('on', True))]
+
+    if args.json:
+        print(json.dumps({'products': args.products, 'page_size': args.page_size, 'results': results},
+                         ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            print(f"校验{r['case']:<4} {r['rows']} 条  耗时 {r['seconds']:6.2f} 秒  {r['rows_per_second']:8.1f} 条/秒  "
+                  f"校验 {r['validation_seconds']:.3f} 秒  注入 {r['injected']}  检出 {r['detected']}  "
+                  f"误报 {r['false_positives']}")
+
+    enabled = results[-1]
+    if enabled['detected'] < enabled['injected'] or enabled['false_positives']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
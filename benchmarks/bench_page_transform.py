@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+整页数据转换基准测试
+
+对比逐条构建字典的旧实现与transform_page批量转换为__slots__记录的新实现，
+输出每秒处理的记录数以及每条记录占用的内存。
+
+使用方法:
+    python benchmarks/bench_page_transform.py
+    python benchmarks/bench_page_transform.py --pages 200 --repeat 5
+"""
+
+import os
+import sys
+import random
+import argparse
+import tracemalloc
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scrapers.records import transform_page
+
+PAGE_SIZE = 100
+
+ISSUERS = [('C10102', '中国工商银行股份有限公司'), ('C10103', '中国农业银行股份有限公司'),
+           ('C10104', '中国银行股份有限公司'), ('Z7000', '招银理财有限责任公司')]
+NAV_VALUES = ['1.0000', '0.9827', '1.0235', ' 1.1002 ', '--', 'null', '', '1.0']
+
+def make_page(page: int) -> list:
+    """生成一页接近真实接口返回格式的产品数据
+
+    Args:
+        page: 页码
+
+    Returns:
+        产品数据列表
+    """
+    rng = random.Random(page)
+    products = []
+    for i in range(PAGE_SIZE):
+        issuer_code, issuer = rng.choice(ISSUERS)
+        seq = page * PAGE_SIZE + i
+        products.append({
+            "id": str(100000 + seq),
+            "cpdjbm": f"{issuer_code}{seq:09d}",
+            "copy": ["", "", f"稳健增利理财产品{seq}期"],
+            "cpms": f"稳健增利理财产品{seq}期",
+            "fxjgms": issuer, "fxjgdm": issuer_code,
+            "fxdjms": "二级(中低)", "cpfxdj": "02",
+            "cptzxzms": "固定收益类", "cptzxz": "01",
+            "mjbz": "人民币(CNY)", "qxms": "1-3个月(含)", "qdxsjef": "10000",
+            "syztdm": "02", "cpxsqy": "北京市,上海市,广东省",
+            "cpqsrq": "2024/01/02", "cpyjzzrq": "9999/12/31",
+            "cplx": "03", "cpsylx": "03", "sfxcp": "02",
+            "csjz": rng.choice(NAV_VALUES), "ljjz": rng.choice(NAV_VALUES), "cpjz": rng.choice(NAV_VALUES),
+        })
+    return products
+
+# ---- 旧实现：逐条构建字典，每条记录单独取时间 ----
+
+def _legacy_product_name(product_data):
+    try:
+        copy_list = product_data.get("copy", [])
+        if isinstance(copy_list, list) and len(copy_list) > 2:
+            return copy_list[2]
+        return product_data.get("cpms", "")
+    except Exception:
+        return product_data.get("cpms", "")
+
+def _legacy_clean_nav(value):
+    try:
+        if not value or value == "--" or value == "null":
+            return 0.0
+        return float(value.strip())
+    except (ValueError, TypeError):
+        return 0.0
+
+def _legacy_basic_info(product_data):
+    product_code = product_data.get("cpdjbm", "")
+    if not product_code:
+        product_code = f"UNKNOWN_{product_data.get('id', '')}"
+    return {
+        "product_id": product_data.get("id", ""),
+        "product_code": product_code,
+        "product_name": _legacy_product_name(product_data),
+        "issuer": product_data.get("fxjgms", ""),
+        "issuer_code": product_data.get("fxjgdm", ""),
+        "risk_level": product_data.get("fxdjms", ""),
+        "risk_level_code": product_data.get("cpfxdj", ""),
+        "product_type": product_data.get("cptzxzms", ""),
+        "product_type_code": product_data.get("cptzxz", ""),
+        "currency": product_data.get("mjbz", ""),
+        "investment_period": product_data.get("qxms", ""),
+        "min_investment": product_data.get("qdxsjef", ""),
+        "sale_status": product_data.get("syztdm", ""),
+        "sale_regions": product_data.get("cpxsqy", ""),
+        "start_date": product_data.get("cpqsrq", ""),
+        "end_date": product_data.get("cpyjzzrq", ""),
+        "product_category": product_data.get("cplx", ""),
+        "income_type": product_data.get("cpsylx", ""),
+        "sale_method": product_data.get("sfxcp", ""),
+        "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def _legacy_nav_data(product_data):
+    initial_nav = _legacy_clean_nav(product_data.get("csjz", ""))
+    accumulated_nav = _legacy_clean_nav(product_data.get("ljjz", ""))
+    current_nav = _legacy_clean_nav(product_data.get("cpjz", ""))
+    product_code = product_data.get("cpdjbm", "")
+    if not product_code:
+        return None
+    if not any([initial_nav > 0, accumulated_nav > 0, current_nav > 0]):
+        return None
+    return {
+        "product_id": product_data.get("id", ""),
+        "product_code": product_code,
+        "initial_nav": initial_nav if initial_nav > 0 else None,
+        "accumulated_nav": accumulated_nav if accumulated_nav > 0 else None,
+        "current_nav": current_nav if current_nav > 0 else None,
+        "nav_date": datetime.now().strftime("%Y-%m-%d"),
+        "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def legacy_transform(products):
+    """旧实现：逐条处理并构建字典"""
+    basic_list, nav_list = [], []
+    for product in products:
+        basic_list.append(_legacy_basic_info(product))
+        nav = _legacy_nav_data(product)
+        if nav:
+            nav_list.append(nav)
+    return basic_list, nav_list
+
+# ---- 测量 ----
+
+def measure_speed(transform, pages, repeat):
+    """测量转换速度
+
+    Returns:
+        (每秒记录数, 生成的记录数)
+    """
+    best = None
+    records = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = 0
+        for page in pages:
+            basic, navs = transform(page)
+            records += len(basic) + len(navs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return records / best, records
+
+def measure_memory(transform, pages):
+    """测量转换结果常驻内存
+
+    Returns:
+        每条记录平均占用字节数
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    results = [transform(page) for page in pages]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    records = sum(len(basic) + len(navs) for basic, navs in results)
+    return (after - before) / records
+
+def main():
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='整页数据转换基准测试')
+    parser.add_argument('--pages', type=int, default=100, help='参与测试的页数，默认100页')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快一次，默认3次')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    pages = [make_page(page) for page in range(args.pages)]
+    print(f"测试数据: {args.pages} 页，每页 {PAGE_SIZE} 条产品")
+
+    results = {}
+    for name, transform in [('逐条字典(旧)', legacy_transform), ('批量slots记录(新)', transform_page)]:
+        speed, records = measure_speed(transform, pages, args.repeat)
+        bytes_per_record = measure_memory(transform, pages)
+        results[name] = (speed, bytes_per_record)
+        print(f"{name:<14} {speed:12,.0f} 条/秒  {bytes_per_record:8.1f} 字节/条  (共 {records} 条记录)")
+
+    (old_speed, old_bytes), (new_speed, new_bytes) = results.values()
+    print(f"速度提升 {new_speed / old_speed:.2f} 倍，内存减少 {(1 - new_bytes / old_bytes) * 100:.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+产品检索基准测试
+
+生成指定数量的模拟产品写入临时SQLite数据库，分别用LIKE全表扫描和FTS5全文索引
+执行相同的检索词，输出每种方式的单次查询延迟(p50/max)和命中数，并检查两种方式
+命中的产品集合是否一致。
+
+使用方法:
+    python benchmarks/bench_product_search.py
+    python benchmarks/bench_product_search.py --products 200000 --repeat 20 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+
+from src.models.product import Base, Product
+from src.database.engine import create_db_engine
+from src.database.search import ProductSearchIndex
+
+ISSUERS = ['招银理财', '工银理财', '建信理财', '农银理财', '中银理财', '交银理财', '光大理财', '兴银理财']
+WORDS = ['稳健', '增利', '恒睿', '安享', '鑫益', '天天', '悦享', '添利', '固收', '丰裕', '睿盈', '汇利']
+REGIONS = ['全国', '北京', '上海', '广东', '浙江', '江苏', '四川', '湖北']
+QUERIES = ['稳健增利', '恒睿', '光大理财', '上海', '365天', '鑫益 90天']
+
+
+def seed(engine, count: int):
+    """写入模拟产品"""
+    rng = random.Random(42)
+    Base.metadata.create_all(engine)
+    rows = []
+    for i in range(count):
+        issuer = rng.choice(ISSUERS)
+        name = f"{issuer}{''.join(rng.sample(WORDS, 2))}{rng.choice([30, 90, 180, 365])}天第{i}期"
+        rows.append({'product_code': f'Z{i:09d}', 'product_name': name, 'issuer': f'{issuer}有限责任公司',
+                     'sale_regions': ','.join(rng.sample(REGIONS, 2))})
+    with engine.begin() as conn:
+        conn.execute(insert(Product), rows)
+
+
+def measure(index: ProductSearchIndex, query: str, repeat: int):
+    """重复检索并返回(延迟列表, 命中总数, 全部命中的产品编码)"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total, _ = index.search(query, limit=20)
+        latencies.append(time.perf_counter() - start)
+    _, ranked = index.search(query, limit=10 ** 9)
+    return sorted(latencies), total, {code for code, _ in ranked}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='产品检索基准测试')
+    parser.add_argument('--products', type=int, default=50000, help='模拟产品数，默认50000')
+    parser.add_argument('--repeat', type=int, default=10, help='每个检索词重复次数，默认10')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_search_'), 'search.db')
+    engine = create_db_engine(f"sqlite:///{path}")
+    seed(engine, args.products)
+
+    start = time.perf_counter()
+    fts = ProductSearchIndex(engine)
+    fts.ensure()
+    build_seconds = time.perf_counter() - start
+    like = ProductSearchIndex(engine)
+
+    results = []
+    mismatches = 0
+    for query in QUERIES:
+        like_latencies, like_total, like_codes = measure(like, query, args.repeat)
+        fts_latencies, fts_total, fts_codes = measure(fts, query, args.repeat)
+        # LIKE按整个检索词匹配，含空格的检索词不可比较
+        comparable = ' ' not in query
+        if comparable and like_codes != fts_codes:
+            mismatches += 1
+        results.append({
+            'query': query,
+            'like_p50_ms': round(like_latencies[len(like_latencies) // 2] * 1000, 2),
+            'like_max_ms': round(like_latencies[-1] * 1000, 2),
+            'like_total': like_total,
+            'fts_p50_ms': round(fts_latencies[len(fts_latencies) // 2] * 1000, 2),
+            'fts_max_ms': round(fts_latencies[-1] * 1000, 2),
+            'fts_total': fts_total,
+            'same_results': like_codes == fts_codes if comparable else None,
+        })
+
+    if args.json:
+        print(json.dumps({'products': args.products, 'index_build_seconds': round(build_seconds, 2),
+                          'results': results}, ensure_ascii=False, indent=2))
+    else:
+        print(f"{args.products} 个产品，建立索引耗时 {build_seconds:.2f} 秒")
+        for r in results:
+            print(f"{r['query']:<10} LIKE p50 {r['like_p50_ms']:8.2f} ms 命中 {r['like_total']:6d}   "
+                  f"FTS5 p50 {r['fts_p50_ms']:8.2f} ms 命中 {r['fts_total']:6d}   "
+                  f"结果一致 {r['same_results']}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+代理池基准测试
+
+在本地启动一个模拟查询接口和若干个转发代理：接口按出口(代理)分别下发Cookie，
+检查Cookie是否来自同一出口，并统计每个出口的最小请求间隔；其中一个代理对所有
+请求返回502。分别直连和经代理池抓取相同页数，输出总耗时、吞吐、各代理的统计，
+以及Cookie串用次数和单个出口的最小请求间隔。
+
+使用方法:
+    python benchmarks/bench_proxy_pool.py
+    python benchmarks/bench_proxy_pool.py --pages 12 --proxies 4 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import http.client
+import http.server
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scrapers.chinawealth_scraper import ChinaWealthScraper
+from src.scrapers.proxy_pool import ProxyPool
+
+
+class Upstream:
+    """模拟查询接口的状态"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = 0
+        self.cookie_mismatches = 0
+        self.last_seen = {}
+        self.min_interval = {}
+
+    def touch(self, egress: str):
+        """记录出口的请求时间，统计最小间隔"""
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_seen.get(egress)
+            if last is not None:
+                self.min_interval[egress] = min(self.min_interval.get(egress, float('inf')), now - last)
+            self.last_seen[egress] = now
+
+
+def make_upstream_handler(state: Upstream):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _egress(self) -> str:
+            return self.headers.get('X-Egress', 'direct')
+
+        def do_GET(self):
+            egress = self._egress()
+            with state.lock:
+                state.sessions += 1
+                sid = f"{egress}-{state.sessions}"
+            self.send_response(200)
+            self.send_header('Set-Cookie', f'sid={sid}; Path=/')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def do_POST(self):
+            egress = self._egress()
+            state.touch(egress)
+            form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+            page = int(form['pagenum'][0])
+            cookie = self.headers.get('Cookie', '')
+            if f'sid={egress}-' not in cookie:
+                with state.lock:
+                    state.cookie_mismatches += 1
+                body = {'code': 'error'}
+            else:
+                body = {'Count': 10000, 'List': [
+                    {'id': str(page * 100 + i), 'cpdjbm': f'C{page:04d}{i:03d}', 'cpms': f'产品{page}-{i}',
+                     'csjz': '1.0', 'ljjz': '1.01', 'cpjz': '1.01'} for i in range(100)
+                ]}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def make_proxy_handler(name: str, broken: bool):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _forward(self):
+            if broken:
+                self.send_response(502)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            target = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            headers = {key: value for key, value in self.headers.items()
+                       if key.lower() not in ('proxy-connection', 'connection', 'host')}
+            headers['X-Egress'] = name
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+            conn.request(self.command, target.path or '/', body=body or None, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            self.send_response(response.status)
+            for key, value in response.getheaders():
+                if key.lower() not in ('transfer-encoding', 'connection', 'content-length'):
+                    self.send_header(key, value)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            conn.close()
+
+        do_GET = _forward
+        do_POST = _forward
+
+    return Handler
+
+
+def serve(handler) -> http.server.ThreadingHTTPServer:
+    """在后台线程启动本地服务"""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_case(label: str, upstream_url: str, pages: int, request_delay: float, pool: ProxyPool = None):
+    """抓取指定页数并返回统计"""
+    scraper = ChinaWealthScraper(base_url=upstream_url + '/', api_url=upstream_url + '/api',
+                                 request_delay=request_delay, retry_times=3, proxy_pool=pool,
+                                 use_proxy=pool is not None)
+    os.makedirs('data', exist_ok=True)
+    start = time.perf_counter()
+    fetched = 0
+    for _ in scraper.iter_pages(max_pages=pages):
+        fetched += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'case': label,
+        'pages': fetched,
+        'elapsed': round(elapsed, 2),
+        'pages_per_second': round(fetched / elapsed, 3),
+        'proxies': pool.stats() if pool is not None else [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代理池基准测试')
+    parser.add_argument('--pages', type=int, default=8, help='抓取页数，默认8')
+    parser.add_argument('--proxies', type=int, default=3, help='正常代理数，另加1个故障代理，默认3')
+    parser.add_argument('--request-delay', type=float, default=0.0, help='请求延迟(秒)，默认0(另有1-3秒随机等待)')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    # 调试响应写入临时目录
+    os.chdir(tempfile.mkdtemp(prefix='bench_proxy_'))
+
+    upstream = Upstream()
+    upstream_server = serve(make_upstream_handler(upstream))
+    upstream_url = f"http://127.0.0.1:{upstream_server.server_address[1]}"
+    proxy_servers = [serve(make_proxy_handler(f'p{i}', broken=False)) for i in range(args.proxies)]
+    proxy_servers.append(serve(make_proxy_handler('broken', broken=True)))
+    proxy_urls = [f"http://127.0.0.1:{server.server_address[1]}" for server in proxy_servers]
+
+    results = [run_case('direct', upstream_url, args.pages, args.request_delay)]
+    pool = ProxyPool(proxy_urls, min_requests=2, quarantine=60)
+    results.append(run_case(f'pool x{len(proxy_urls)}', upstream_url, args.pages, args.request_delay, pool))
+    summary = {
+        'results': results,
+        'cookie_mismatches': upstream.cookie_mismatches,
+        'min_interval_per_egress': {egress: round(value, 2) for egress, value in upstream.min_interval.items()},
+    }
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            print(f"{r['case']:<10} {r['pages']} 页  耗时 {r['elapsed']:6.2f} 秒  {r['pages_per_second']:.2f} 页/秒")
+            for stats in r['proxies']:
+                print(f"    {stats['proxy']:<18} 请求 {stats['requests']:3d}  错误 {stats['errors']:2d}  "
+                      f"限流 {stats['throttled']:2d}  延迟 {stats['latency']}  隔离 {stats['trips']} 次")
+        print(f"Cookie串用 {summary['cookie_mismatches']} 次，各出口最小请求间隔(秒): "
+              f"{summary['min_interval_per_egress']}")
+
+    if upstream.cookie_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+接口响应解码基准测试
+
+对比旧的解码方式(写调试文件时生成response.text，再由response.json()解析一遍)与
+decode_page(按字节解析一次、只保留用到的字段、调试文件直接写入原始字节)，
+输出每页的解码耗时、解码过程中的峰值内存分配，以及解码结果常驻的内存。
+
+测试页面除整页转换用到的字段外，还带有真实接口返回的其他字段(募集起止日期、业绩比较基准、
+开放周期等)，产品数和字段数可以调整。
+
+使用方法:
+    python benchmarks/bench_response_decode.py
+    python benchmarks/bench_response_decode.py --pages 50 --page-size 500 --repeat 5
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tracemalloc
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+from src.scrapers import decoding
+from src.scrapers.decoding import decode_page
+
+ISSUERS = [('C10102', '中国工商银行股份有限公司'), ('C10103', '中国农业银行股份有限公司'),
+           ('C10104', '中国银行股份有限公司'), ('Z7000', '招银理财有限责任公司')]
+NAV_VALUES = ['1.0000', '0.9827', '1.0235', '1.1002', '--', '']
+REGIONS = '北京市,天津市,河北省,山西省,内蒙古自治区,辽宁省,吉林省,黑龙江省,上海市,江苏省,浙江省,安徽省'
+
+
+def make_product(seq: int, rng: random.Random) -> dict:
+    """生成一条接近真实接口返回格式的产品数据，包含整页转换用不到的字段"""
+    issuer_code, issuer = rng.choice(ISSUERS)
+    name = f"稳健增利理财产品{seq}期"
+    return {
+        "id": str(100000 + seq), "cpdjbm": f"{issuer_code}{seq:09d}",
+        "copy": [f"<em>{issuer}</em>", f"<em>{seq}</em>", name, f"登记编码{issuer_code}{seq:09d}"],
+        "cpms": name, "fxjgms": issuer, "fxjgdm": issuer_code,
+        "fxdjms": "二级(中低)", "cpfxdj": "02", "cptzxzms": "固定收益类", "cptzxz": "01",
+        "mjbz": "人民币(CNY)", "qxms": "1-3个月(含)", "qdxsjef": "10000", "syztdm": "02",
+        "cpxsqy": REGIONS, "cpqsrq": "2024/01/02", "cpyjzzrq": "9999/12/31",
+        "cplx": "03", "cpsylx": "03", "sfxcp": "02",
+        "csjz": rng.choice(NAV_VALUES), "ljjz": rng.choice(NAV_VALUES), "cpjz": rng.choice(NAV_VALUES),
+        # 以下字段整页转换不使用
+        "cpjglb": "01", "cpjglbms": "理财公司", "cpyzms": "01", "cpyzmsms": "封闭式净值型",
+        "mjfsdm": "01", "mjfsms": "公募", "cptssx": "", "cpzt": "02", "cpztms": "在售",
+        "mjqsrq": "2023/12/20", "mjjsrq": "2023/12/29", "dqrq": "2025/01/02",
+        "yjbjjzxx": f"{rng.uniform(2, 3):.2f}", "yjbjjzsx": f"{rng.uniform(3, 4):.2f}",
+        "yjbjjzms": "业绩比较基准为年化2.50%-3.50%，业绩比较基准不是预期收益率，不代表产品的未来表现和实际收益",
+        "kfzqms": "每月开放", "tzzlxms": "个人投资者,机构投资者", "cpglr": issuer,
+        "tgjgms": "中国工商银行股份有限公司", "cptgrmc": "托管人", "fbrq": "2023/12/18",
+        "zhgxrq": "2024/06/30", "sfkfs": "0", "sfzq": "1", "bz": "", "score": rng.random(),
+    }
+
+
+def make_body(page: int, page_size: int) -> bytes:
+    """生成一页响应体"""
+    rng = random.Random(page)
+    products = [make_product(page * page_size + i, rng) for i in range(page_size)]
+    return json.dumps({"List": products, "Count": 250000}, ensure_ascii=False).encode('utf-8')
+
+
+def make_response(body: bytes) -> requests.Response:
+    """构造与requests实际返回相同的响应对象，响应体已读取"""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json;charset=UTF-8'
+    response.encoding = 'UTF-8'
+    response._content = body
+    return response
+
+
+# ---- 两种解码方式，调试文件写入空设备 ----
+
+def legacy_decode(response, sink):
+    """旧实现：调试文件写入response.text，再调用response.json()"""
+    sink.write(f"Status Code: {response.status_code}\n".encode('utf-8'))
+    sink.write(f"Headers: {dict(response.headers)}\n".encode('utf-8'))
+    sink.write(f"Response Text: {response.text}\n".encode('utf-8'))
+    return response.json()["List"]
+
+
+def new_decode(response, sink):
+    """新实现：调试文件和解码共用response.content"""
+    body = response.content
+    sink.write(f"Status Code: {response.status_code}\n".encode('utf-8'))
+    sink.write(f"Headers: {dict(response.headers)}\n".encode('utf-8'))
+    sink.write(b"Response Text: ")
+    sink.write(body)
+    sink.write(b"\n")
+    return decode_page(body, encoding=response.encoding)["List"]
+
+
+# ---- 测量 ----
+
+def measure_speed(decode, bodies, repeat, sink):
+    """测量每页平均解码耗时(毫秒)，取最快一次
+
+    每次解码使用新的响应对象，response.text不会在两次之间缓存。
+    """
+    best = None
+    for _ in range(repeat):
+        responses = [make_response(body) for body in bodies]
+        start = time.perf_counter()
+        for response in responses:
+            decode(response, sink)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(bodies) * 1000
+
+
+def measure_memory(decode, bodies, sink):
+    """测量内存
+
+    Returns:
+        (每页解码过程中的峰值分配字节数, 每页解码结果常驻字节数)
+    """
+    peaks = []
+    retained = []
+    for body in bodies:
+        response = make_response(body)
+        tracemalloc.start()
+        products = decode(response, sink)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        # 响应对象丢弃后仍占用的内存即解码结果
+        del response
+        retained.append(current)
+        del products
+    return sum(peaks) / len(peaks), sum(retained) / len(retained)
+
+
+def main():
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='接口响应解码基准测试')
+    parser.add_argument('--pages', type=int, default=20, help='参与测试的页数，默认20页')
+    parser.add_argument('--page-size', type=int, default=100, help='每页产品数，默认100条')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快一次，默认3次')
+    args = parser.parse_args()
+
+    bodies = [make_body(page, args.page_size) for page in range(args.pages)]
+    average = sum(len(body) for body in bodies) / len(bodies)
+    parser_name = 'orjson' if decoding.orjson is not None else 'json(标准库)'
+    print(f"测试数据: {args.pages} 页，每页 {args.page_size} 条产品，平均 {average / 1024:.0f} KB，新实现使用 {parser_name}")
+
+    results = {}
+    with open(os.devnull, 'wb') as sink:
+        for name, decode in [('text+json(旧)', legacy_decode), ('bytes一次解码(新)', new_decode)]:
+            ms = measure_speed(decode, bodies, args.repeat, sink)
+            peak, retained = measure_memory(decode, bodies, sink)
+            results[name] = (ms, peak, retained)
+            print(f"{name:<14} {ms:8.2f} 毫秒/页  峰值分配 {peak / 1024:8.0f} KB/页  结果常驻 {retained / 1024:8.0f} KB/页")
+
+    (old_ms, old_peak, old_retained), (new_ms, new_peak, new_retained) = results.values()
+    print(f"解码提速 {old_ms / new_ms:.2f} 倍，峰值分配减少 {(1 - new_peak / old_peak) * 100:.1f}%，"
+          f"结果常驻内存减少 {(1 - new_retained / old_retained) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SQLite并发读写基准测试
+
+模拟抓取写入与导出读取同时进行：一个写入线程按批次在长事务中写入净值数据，
+多个读取线程在快照事务中反复执行导出查询。分别测试默认配置(回滚日志)和
+create_db_engine的性能配置(WAL)，输出写入吞吐、单批提交耗时、读取延迟、
+锁错误次数以及快照内前后两次查询结果不一致的次数。
+
+使用方法:
+    python benchmarks/bench_sqlite_concurrency.py
+    python benchmarks/bench_sqlite_concurrency.py --batches 30 --readers 4 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.exc import OperationalError
+
+from src.models.product import Base, Product, ProductNav
+from src.database.engine import create_db_engine, snapshot_connection
+
+# 与导出工具相同的联合查询
+EXPORT_QUERY = """
+SELECT p.product_code, p.product_name, n.nav_date, n.current_nav
+FROM products p LEFT JOIN product_navs n ON p.product_code = n.product_code
+ORDER BY p.product_code, n.nav_date DESC
+"""
+COUNT_QUERY = "SELECT COUNT(*) FROM product_navs"
+
+def make_engine(mode: str, path: str, busy_timeout: float):
+    """创建测试用引擎
+
+    Args:
+        mode: default(回滚日志，不做调整)或wal(性能配置)
+        path: 数据库文件路径
+        busy_timeout: 锁等待超时(秒)
+    """
+    url = f"sqlite:///{path}"
+    if mode == 'wal':
+        return create_db_engine(url, sqlite_options={
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size_mb': 64,
+            'mmap_size_mb': 256, 'busy_timeout': busy_timeout,
+        })
+
+    engine = create_engine(url, connect_args={'timeout': busy_timeout})
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA journal_mode = DELETE")
+
+    return engine
+
+def seed(engine, products: int, days: int):
+    """写入初始数据"""
+    Base.metadata.create_all(engine)
+    start = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {'product_id': str(i), 'product_code': f'C{i:08d}', 'product_name': f'理财产品{i}'}
+            for i in range(products)
+        ])
+        conn.execute(insert(ProductNav), [
+            {'product_id': str(i), 'product_code': f'C{i:08d}', 'nav_date': start + timedelta(days=d),
+             'current_nav': 1.0 + d / 1000, 'is_updated': 0}
+            for i in range(products) for d in range(days)
+        ])
+
+def percentile(values, pct):
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run_case(mode: str, args) -> dict:
+    """执行一组并发测试
+
+    Returns:
+        测试结果字典
+    """
+    workdir = tempfile.mkdtemp(prefix='bench_sqlite_')
+    engine = make_engine(mode, os.path.join(workdir, 'bench.db'), args.busy_timeout)
+    seed(engine, args.products, args.days)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    result = {'mode': mode, 'commit_seconds': [], 'read_seconds': [], 'writer_errors': 0,
+              'reader_errors': 0, 'snapshot_violations': 0, 'rows_written': 0}
+
+    def writer():
+        base_day = date(2025, 1, 1)
+        try:
+            for batch in range(args.batches):
+                rows = [{'product_id': str(i), 'product_code': f'C{i % args.products:08d}',
+                         'nav_date': base_day + timedelta(days=batch * 1000 + i // args.products),
+                         'current_nav': 1.0, 'is_updated': 0}
+                        for i in range(args.batch_size)]
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(ProductNav), rows)
+                        # 模拟逐行查询更新导致的长事务
+                        time.sleep(args.hold)
+                except OperationalError:
+                    with lock:
+                        result['writer_errors'] += 1
+                    continue
+                with lock:
+                    result['commit_seconds'].append(time.perf_counter() - start)
+                    result['rows_written'] += len(rows)
+        finally:
+            stop.set()
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with snapshot_connection(engine) as conn:
+                    before = conn.execute(text(COUNT_QUERY)).scalar()
+                    conn.execute(text(EXPORT_QUERY)).fetchall()
+                    after = conn.execute(text(COUNT_QUERY)).scalar()
+            except OperationalError:
+                with lock:
+                    result['reader_errors'] += 1
+                continue
+            with lock:
+                result['read_seconds'].append(time.perf_counter() - start)
+                if before != after:
+                    result['snapshot_violations'] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    writer_thread.join()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    commits, reads = result.pop('commit_seconds'), result.pop('read_seconds')
+    result.update({
+        'elapsed_seconds': round(elapsed, 3),
+        'writer_rows_per_second': round(result['rows_written'] / elapsed, 1),
+        'commit_p50': round(percentile(commits, 50), 4),
+        'commit_max': round(max(commits, default=0.0), 4),
+        'reads': len(reads),
+        'read_p50': round(percentile(reads, 50), 4),
+        'read_p95': round(percentile(reads, 95), 4),
+        'read_max': round(max(reads, default=0.0), 4),
+    })
+    return result
+
+def main():
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='SQLite并发读写基准测试')
+    parser.add_argument('--products', type=int, default=500, help='初始产品数，默认500')
+    parser.add_argument('--days', type=int, default=60, help='每个产品的初始净值天数，默认60')
+    parser.add_argument('--batches', type=int, default=20, help='写入批次数，默认20')
+    parser.add_argument('--batch-size', type=int, default=2000, help='每批写入行数，默认2000')
+    parser.add_argument('--hold', type=float, default=0.05, help='每批事务额外持有的秒数，默认0.05')
+    parser.add_argument('--readers', type=int, default=2, help='读取线程数，默认2')
+    parser.add_argument('--busy-timeout', type=float, default=5.0, help='锁等待超时(秒)，默认5')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    results = [run_case(mode, args) for mode in ('default', 'wal')]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"写入 {args.batches} 批 x {args.batch_size} 行，{args.readers} 个读取线程在快照事务中执行导出查询")
+        for r in results:
+            print(f"{r['mode']:<8} 写入 {r['writer_rows_per_second']:10,.0f} 行/秒  "
+                  f"提交 p50 {r['commit_p50'] * 1000:7.1f} ms  max {r['commit_max'] * 1000:7.1f} ms  "
+                  f"读取 {r['reads']:4d} 次 p50 {r['read_p50'] * 1000:7.1f} ms  "
+                  f"p95 {r['read_p95'] * 1000:7.1f} ms  max {r['read_max'] * 1000:7.1f} ms  "
+                  f"锁错误 写{r['writer_errors']}/读{r['reader_errors']}  快照不一致 {r['snapshot_violations']}")
+
+    wal = results[-1]
+    if wal['writer_errors'] or wal['reader_errors'] or wal['snapshot_violations']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
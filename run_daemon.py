@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+理财产品抓取守护进程入口脚本
+
+以常驻进程方式按计划执行抓取、导出和定向刷新任务。
+
+使用方法:
+    python run_daemon.py
+    python run_daemon.py --run-now crawl
+"""
+
+import sys
+import os
+
+# 添加源码目录到sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+# 导入守护进程
+from src.daemon import main
+
+if __name__ == "__main__":
+    main()
@@ -38,9 +38,17 @@ fi
 # 检查并安装依赖
 echo "检查项目依赖..." >> "$CRON_LOG_FILE"
 if [ -f "$PROJECT_DIR/requirements.txt" ]; then
-    echo "安装依赖包..." >> "$CRON_LOG_FILE"
-    $PYTHON_CMD -m pip install -r "$PROJECT_DIR/requirements.txt" >> "$CRON_LOG_FILE" 2>&1
-    echo "依赖安装完成" >> "$CRON_LOG_FILE"
+    # 仅在requirements.txt变化后重新安装依赖，避免每次执行都调用pip
+    REQ_STAMP="$PROJECT_DIR/data/.requirements.sha"
+    REQ_HASH=$(shasum "$PROJECT_DIR/requirements.txt" | awk '{print $1}')
+    if [ ! -f "$REQ_STAMP" ] || [ "$(cat "$REQ_STAMP")" != "$REQ_HASH" ]; then
+        echo "安装依赖包..." >> "$CRON_LOG_FILE"
+        $PYTHON_CMD -m pip install -r "$PROJECT_DIR/requirements.txt" >> "$CRON_LOG_FILE" 2>&1 && \
+            mkdir -p "$PROJECT_DIR/data" && echo "$REQ_HASH" > "$REQ_STAMP"
+        echo "依赖安装完成" >> "$CRON_LOG_FILE"
+    else
+        echo "依赖未变化，跳过安装" >> "$CRON_LOG_FILE"
+    fi
 else
     # 如果没有requirements.txt，至少安装必要的包
     echo "未找到requirements.txt，安装基本依赖..." >> "$CRON_LOG_FILE"
@@ -55,8 +63,11 @@ cd "$PROJECT_DIR" || {
 
 # 执行抓取任务
 echo "开始抓取理财产品数据 - $(date +%H:%M:%S)" >> "$CRON_LOG_FILE"
-# 这里将应用日志重定向到应用日志文件
-$PYTHON_CMD run.py > "$APP_LOG_FILE" 2>&1
+# 应用日志由程序直接写入应用日志文件(按大小轮转)，不再经标准输出重复写一份；
+# 标准输出和未捕获的异常记录到crontab日志
+export LOG_FILE="$APP_LOG_FILE"
+export LOG_CONSOLE=false
+$PYTHON_CMD run.py >> "$CRON_LOG_FILE" 2>&1
 SCRAPER_EXIT_CODE=$?
 
 # 检查抓取任务是否成功
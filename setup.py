@@ -30,6 +30,8 @@ setup(
         "console_scripts": [
             "financial-scraper=src.main:main",
             "financial-exporter=src.utils.export_data:main",
+            "financial-daemon=src.daemon:main",
+            "financial=src.cli:main",
         ],
     },
 )
\ No newline at end of file
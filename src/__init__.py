@@ -3,5 +3,22 @@
 __version__ = '0.1.0'
 
 # 导出常用模块，简化导入路径
-from src.config.config import setup_logging, get_database_url, get_scraper_config
-from src.scrapers.chinawealth_scraper import ChinaWealthScraper 
\ No newline at end of file
+# 按需导入：只有在访问对应名称时才加载爬虫、数据库等较重的依赖
+_LAZY_EXPORTS = {
+    'setup_logging': 'src.config.config',
+    'get_database_url': 'src.config.config',
+    'get_scraper_config': 'src.config.config',
+    'ChinaWealthScraper': 'src.scrapers.chinawealth_scraper',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    """首次访问时导入导出的名称"""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
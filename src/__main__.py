@@ -0,0 +1,6 @@
+# 统一命令行入口: python -m src <command>
+
+from src.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+从历史导出文件回填数据库
+
+读取export命令导出的products_*.csv、navs_*.csv、combined_*.csv和financial_products_*.xlsx，
+按列名识别其中的产品信息和净值：
+- 多个文件由进程池并行解析，每个文件按块读取并在文件内去重，净值写入临时文件，不传回主进程
+- 产品按导出时间合并，按product_code去重，较新的导出优先，缺少的列用其他文件中的值补齐
+- 净值按导出时间从新到旧逐个文件分块写入，只插入数据库中还没有的记录，同一净值以较新的导出为准，
+  主进程同时只持有一个文件的净值
+- 经临时表批量插入数据库中还没有的产品和净值，已有的记录保持不变，可以重复执行
+
+已归档月份的净值不再写回数据库。SQLite上早于热数据保留期的净值直接写入对应的月表(不存在时创建)，
+不经过热表再轮转。回填完成后重建检索索引和新增日期的净值聚合。
+
+使用方法:
+    python -m src backfill data/export
+    python -m src backfill /backup/exports/*.csv --workers 4
+"""
+
+import os
+import re
+import glob
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from src.config.config import setup_logging, get_database_url, get_partition_config
+
+logger = logging.getLogger(__name__)
+
+# 可识别的导出文件
+EXPORT_PATTERNS = ('products_*.csv', 'navs_*.csv', 'combined_*.csv', 'financial_products_*.xlsx')
+
+# 导出文件名中的时间戳，用于确定重复记录的新旧
+_TIMESTAMP_RE = re.compile(r'(\d{8}_\d{6})')
+
+# 导出文件中与产品表对应的列(不含数据库自增ID和时间戳)
+PRODUCT_FIELDS = (
+    'product_id', 'product_code', 'product_name', 'issuer', 'issuer_code',
+    'risk_level', 'risk_level_code', 'product_type', 'product_type_code',
+    'currency', 'investment_period', 'min_investment', 'sale_status',
+    'sale_regions', 'start_date', 'end_date', 'product_category',
+    'income_type', 'sale_method', 'crawl_time',
+)
+
+# 导出文件中与净值表对应的列
+NAV_FIELDS = (
+    'product_id', 'product_code', 'nav_date', 'initial_nav', 'accumulated_nav', 'current_nav',
+    'is_updated', 'last_update_date', 'crawl_time',
+)
+NAV_VALUES = ('initial_nav', 'accumulated_nav', 'current_nav')
+
+
+def add_arguments(parser):
+    """注册回填命令的命令行参数
+
+    Args:
+        parser: 命令行参数解析器
+    """
+    parser.add_argument('paths', nargs='*', default=None,
+                        help='导出文件或所在目录，默认为data/export')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行解析文件的进程数，默认为CPU核数(最多8)')
+    parser.add_argument('--chunk-rows', type=int, default=50000,
+                        help='读取文件和写入数据库时每块的行数，默认50000')
+    parser.add_argument('--source', type=str, default='chinawealth',
+                        help='回填记录的数据来源标记，默认chinawealth')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='只解析和去重，输出统计而不写入数据库')
+
+
+def find_export_files(paths: List[str]) -> List[str]:
+    """展开目录和通配符，返回按导出时间排序的文件列表
+
+    Args:
+        paths: 文件、目录或通配符
+
+    Returns:
+        文件路径列表，Excel的临时锁文件(~$开头)除外
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in EXPORT_PATTERNS:
+                files.extend(glob.glob(os.path.join(path, pattern)))
+        else:
+            files.extend(glob.glob(path) or [path])
+    files = [path for path in dict.fromkeys(files) if not os.path.basename(path).startswith('~$')]
+    return sorted(files, key=export_rank)
+
+
+def export_rank(path: str) -> str:
+    """导出时间，取文件名中的时间戳，没有时使用修改时间"""
+    match = _TIMESTAMP_RE.search(os.path.basename(path))
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y%m%d_%H%M%S')
+
+
+def _iter_csv(path: str, chunk_rows: int):
+    import pandas as pd
+    # 全部按字符串读取，保留产品代码等字段的前导零；只有空字符串视为缺失("NA"、"N/A"是有效取值)
+    yield from pd.read_csv(path, dtype=str, encoding='utf-8-sig', keep_default_na=False, na_values=[''],
+                           chunksize=chunk_rows)
+
+
+def _cell_text(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d' if value.time() == datetime.min.time() else '%Y-%m-%d %H:%M:%S')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _iter_xlsx(path: str, chunk_rows: int):
+    """以只读模式逐行读取每个工作表，按块转换为DataFrame"""
+    import pandas as pd
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                continue
+            header = [str(name) for name in header]
+            chunk = []
+            for row in rows:
+                chunk.append([_cell_text(value) for value in row])
+                if len(chunk) >= chunk_rows:
+                    yield pd.DataFrame(chunk, columns=header, dtype=object)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+
+def read_export_file(path: str, chunk_rows: int = 50000) -> Tuple[str, 'pd.DataFrame', 'pd.DataFrame', int]:
+    """解析一个导出文件，在工作进程中执行
+
+    Args:
+        path: 文件路径
+        chunk_rows: 每块读取的行数
+
+    Returns:
+        (文件路径, 按product_code去重的产品, 按(product_code, nav_date)去重的净值, 读取的行数)
+    """
+    import pandas as pd
+
+    reader = _iter_xlsx if path.lower().endswith(('.xlsx', '.xlsm')) else _iter_csv
+    product_parts, nav_parts = [], []
+    rows = 0
+    for chunk in reader(path, chunk_rows):
+        rows += len(chunk)
+        chunk = chunk[chunk['product_code'].notna()] if 'product_code' in chunk else chunk.iloc[0:0]
+        if chunk.empty:
+            continue
+        product_parts.append(chunk[[name for name in PRODUCT_FIELDS if name in chunk]])
+        if 'nav_date' in chunk:
+            navs = chunk[[name for name in NAV_FIELDS if name in chunk]]
+            # 产品没有净值时联合数据中的净值列为空
+            nav_parts.append(navs[navs['nav_date'].notna()])
+
+    products = pd.concat(product_parts, ignore_index=True) if product_parts else pd.DataFrame(columns=['product_code'])
+    # 同一文件中后出现的记录优先，缺失的列取前面记录的值
+    products = products.groupby('product_code', sort=False, as_index=False).last()
+
+    if nav_parts:
+        navs = pd.concat(nav_parts, ignore_index=True)
+        for name in ('nav_date', 'last_update_date'):
+            if name in navs:
+                navs[name] = pd.to_datetime(navs[name].str[:10], format='%Y-%m-%d', errors='coerce').dt.date
+        navs = navs[navs['nav_date'].notna()]
+        for name in NAV_VALUES + ('is_updated',):
+            if name in navs:
+                navs[name] = pd.to_numeric(navs[name], errors='coerce')
+        navs['is_updated'] = navs['is_updated'].fillna(0).astype(int) if 'is_updated' in navs else 0
+        navs = navs.drop_duplicates(['product_code', 'nav_date'], keep='last')
+    else:
+        navs = pd.DataFrame(columns=['product_code', 'nav_date'])
+    return path, products, navs, rows
+
+
+def spill_export_file(path: str, chunk_rows: int, spill_dir: str) -> Tuple[str, 'pd.DataFrame', str, int, int]:
+    """解析一个导出文件，净值写入spill_dir中的临时文件，在工作进程中执行
+
+    Args:
+        path: 文件路径
+        chunk_rows: 每块读取的行数
+        spill_dir: 临时文件目录
+
+    Returns:
+        (文件路径, 按product_code去重的产品, 净值临时文件(没有净值时为None), 净值条数, 读取的行数)
+    """
+    path, products, navs, rows = read_export_file(path, chunk_rows)
+    if navs.empty:
+        return path, products, None, 0, rows
+    handle, spill = tempfile.mkstemp(suffix='.pkl', dir=spill_dir)
+    os.close(handle)
+    navs.to_pickle(spill)
+    return path, products, spill, len(navs), rows
+
+
+def read_exports(files: List[str], workers: int, chunk_rows: int,
+                 spill_dir: str) -> Tuple['pd.DataFrame', List[Tuple[str, str, int]], int]:
+    """并行解析导出文件，合并产品，各文件的净值留在临时文件中
+
+    Args:
+        files: 按导出时间排序的文件列表
+        workers: 进程数，1表示在当前进程中解析
+        chunk_rows: 每块读取的行数
+        spill_dir: 净值临时文件目录
+
+    Returns:
+        (按product_code去重的产品，重复时保留导出时间较新的,
+         [(文件路径, 净值临时文件, 净值条数)]，按导出时间从新到旧, 读取的总行数)
+    """
+    import pandas as pd
+
+    if workers > 1 and len(files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+            results = list(executor.map(spill_export_file, files, [chunk_rows] * len(files),
+                                        [spill_dir] * len(files)))
+    else:
+        results = [spill_export_file(path, chunk_rows, spill_dir) for path in files]
+
+    rows = 0
+    product_parts, nav_files = [], []
+    for path, products, spill, nav_count, count in results:
+        logger.info("%s: %s 行，产品 %s 个，净值 %s 条", os.path.basename(path), count, len(products), nav_count)
+        rows += count
+        product_parts.append(products)
+        if spill is not None:
+            nav_files.append((path, spill, nav_count))
+
+    # results与files顺序一致，即按导出时间从旧到新
+    products = pd.concat(product_parts, ignore_index=True).groupby('product_code', sort=False, as_index=False).last()
+    return products, nav_files[::-1], rows
+
+
+def nav_targets(partitions, navs: 'pd.DataFrame', hot_months: int) -> Iterator[Tuple[object, 'pd.DataFrame']]:
+    """按写入的表拆分净值
+
+    SQLite上早于热数据保留期的净值属于对应的月表，其余写入热表；MySQL的按月分区由数据库自行路由。
+
+    Args:
+        partitions: NavPartitionManager
+        navs: 净值
+        hot_months: 热表保留的月数(含当月)
+
+    Returns:
+        (目标表，None表示热表, 该表的净值)序列
+    """
+    if partitions.dialect != 'sqlite':
+        yield None, navs
+        return
+    cutoff = partitions.hot_cutoff(hot_months)
+    hot = navs['nav_date'] >= cutoff
+    if hot.any():
+        yield None, navs[hot]
+    older = navs[~hot]
+    if not older.empty:
+        months = older['nav_date'].map(lambda day: day.strftime('%Y%m'))
+        for label, part in older.groupby(months, sort=True):
+            yield partitions.month_table(label), part
+
+
+def iter_records(frame: 'pd.DataFrame', chunk_rows: int, **constants) -> Iterator[List[Dict]]:
+    """将DataFrame按块转换为记录字典列表，缺失值转换为None
+
+    Args:
+        frame: 数据
+        chunk_rows: 每块的行数
+        **constants: 每条记录附加的固定字段
+    """
+    columns = list(frame.columns)
+    for offset in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[offset:offset + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield [dict(zip(columns, values), **constants) for values in chunk.itertuples(index=False, name=None)]
+
+
+def backfill(db_manager, files: List[str], workers: int = 1, chunk_rows: int = 50000,
+             source: str = 'chinawealth', dry_run: bool = False) -> Dict:
+    """解析导出文件并写入数据库中还没有的产品和净值
+
+    Args:
+        db_manager: 数据库管理器
+        files: 导出文件列表
+        workers: 并行解析的进程数
+        chunk_rows: 每块的行数
+        source: 数据来源标记
+        dry_run: 只解析不写入
+
+    Returns:
+        统计信息字典
+    """
+    spill_dir = tempfile.mkdtemp(prefix='backfill_')
+    try:
+        return _backfill(db_manager, files, workers, chunk_rows, source, dry_run, spill_dir)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def _backfill(db_manager, files: List[str], workers: int, chunk_rows: int, source: str, dry_run: bool,
+              spill_dir: str) -> Dict:
+    import pandas as pd
+    from src.database.backfill import BackfillLoader
+
+    start = time.perf_counter()
+    products, nav_files, rows = read_exports(files, workers, chunk_rows, spill_dir)
+    parse_seconds = time.perf_counter() - start
+
+    navs_parsed = sum(count for _, _, count in nav_files)
+    stats = {'files': len(files), 'rows': rows, 'products': len(products), 'navs': navs_parsed,
+             'parse_seconds': round(parse_seconds, 3)}
+    logger.info("解析 %s 个文件共 %s 行，去重后产品 %s 个，各文件去重后净值共 %s 条，耗时 %.2f 秒",
+                len(files), rows, len(products), navs_parsed, parse_seconds)
+    if dry_run:
+        return stats
+
+    now = datetime.now()
+    loader = BackfillLoader(db_manager.engine)
+    partitions = db_manager.partitions
+    archived = set(partitions.archived_months())
+    hot_months = get_partition_config()['hot_months']
+    load_start = time.perf_counter()
+    new_navs, span = 0, []
+    with db_manager.write_lock:
+        # 先写入产品，净值引用的产品已经存在
+        stats['new_products'] = loader.load_products(
+            iter_records(products, chunk_rows, source=source, created_at=now, updated_at=now))
+        del products
+        # 从新到旧逐个文件写入，只插入还没有的净值，同一净值以较新的导出为准
+        for path, spill, _ in nav_files:
+            navs = pd.read_pickle(spill)
+            os.remove(spill)
+            # 已归档的月份不写回数据库
+            if archived:
+                months = navs['nav_date'].map(lambda day: day.strftime('%Y%m'))
+                skipped = int(months.isin(archived).sum())
+                if skipped:
+                    logger.info("%s: 跳过已归档月份的净值 %s 条", os.path.basename(path), skipped)
+                    navs = navs[~months.isin(archived)]
+            for table, part in nav_targets(partitions, navs, hot_months):
+                count, first_date, last_date = loader.load_navs(
+                    iter_records(part, chunk_rows, source=source, created_at=now, updated_at=now), table)
+                new_navs += count
+                if count:
+                    span.extend((first_date, last_date))
+    stats['new_navs'] = new_navs
+    stats['load_seconds'] = round(time.perf_counter() - load_start, 3)
+
+    if stats['new_products']:
+        db_manager.search_index.rebuild()
+    if new_navs:
+        stats['aggregate_dates'] = db_manager.rebuild_nav_aggregates(min(span), max(span))
+    logger.info("回填完成: 新增产品 %s 个、净值 %s 条，写入耗时 %.2f 秒", stats['new_products'], new_navs, stats['load_seconds'])
+    return stats
+
+
+def run(args):
+    """执行回填命令
+
+    Args:
+        args: 解析后的命令行参数
+    """
+    from src.database.db_manager import DatabaseManager
+
+    setup_logging()
+    files = find_export_files(args.paths or [os.path.join(os.getcwd(), 'data', 'export')])
+    if not files:
+        logger.error("没有找到可回填的导出文件")
+        return
+    workers = args.workers or min(8, os.cpu_count() or 1)
+
+    config = get_partition_config()
+    db_manager = DatabaseManager(get_database_url(), archive_dir=config['archive_dir'])
+    try:
+        stats = backfill(db_manager, files, workers=workers, chunk_rows=args.chunk_rows,
+                         source=args.source, dry_run=args.dry_run)
+        print(' '.join(f"{key}={value}" for key, value in stats.items()))
+    finally:
+        db_manager.close()
+
+
+def main(argv=None):
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='从历史导出文件回填数据库')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
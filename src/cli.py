@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+统一命令行入口
+
+使用方法:
+    python -m src crawl --max-pages 10
+    python -m src export --format csv
+    python -m src query --product-code C1010207000003
+    python -m src serve --run-now crawl
+    python -m src maintain --list
+    python -m src backfill data/export
+
+各子命令模块在顶层只导入轻量依赖，pandas、SQLAlchemy、requests等
+较重的依赖在子命令实际执行时才导入，保证--help等操作能快速返回。
+"""
+
+import sys
+import argparse
+import importlib
+
+# 子命令名称 -> (实现模块, 帮助信息)
+COMMANDS = {
+    'crawl': ('src.main', '抓取理财产品信息和净值数据'),
+    'export': ('src.utils.export_data', '导出数据为CSV或Excel格式'),
+    'query': ('src.query', '查询单个产品信息和最新净值'),
+    'serve': ('src.daemon', '以守护进程模式按计划执行任务'),
+    'maintain': ('src.maintain', '净值分区轮转和冷数据归档'),
+    'backfill': ('src.backfill', '从历史导出文件回填数据库'),
+}
+
+def build_parser():
+    """构建命令行参数解析器
+
+    Returns:
+        命令行参数解析器
+    """
+    parser = argparse.ArgumentParser(prog='financial', description='理财产品数据抓取工具')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    for name, (module_name, help_text) in COMMANDS.items():
+        module = importlib.import_module(module_name)
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        module.add_arguments(subparser)
+        subparser.set_defaults(handler=module.run)
+
+    return parser
+
+def main(argv=None):
+    """命令行入口函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
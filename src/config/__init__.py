@@ -1,5 +1,5 @@
 # 配置模块
 
-from src.config.config import setup_logging, get_database_url, get_scraper_config
+from src.config.config import setup_logging, get_database_url, get_scraper_config, get_source_config, get_scheduler_config, get_metrics_config, get_sqlite_config, get_mysql_config, get_partition_config, get_nav_validation_config, get_listing_config
 
-__all__ = ['setup_logging', 'get_database_url', 'get_scraper_config']
\ No newline at end of file
+__all__ = ['setup_logging', 'get_database_url', 'get_scraper_config', 'get_source_config', 'get_scheduler_config', 'get_metrics_config', 'get_sqlite_config', 'get_mysql_config', 'get_partition_config', 'get_nav_validation_config', 'get_listing_config']
\ No newline at end of file
@@ -1,30 +1,51 @@
 import os
 import logging
-from dotenv import load_dotenv
+
+_env_loaded = False
 
 # 加载环境变量
-load_dotenv()
+def load_env():
+    """加载.env文件中的环境变量
+
+    首次读取配置时才加载，避免导入配置模块时产生额外开销。
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
 
 # 日志配置
 def setup_logging(log_level=None):
-    """配置日志"""
+    """配置日志
+
+    日志经内存队列由后台线程格式化和输出，抓取线程只负责入队；重复日志按位置限流，日志文件按大小轮转。
+    """
+    load_env()
     if log_level is None:
         log_level = os.getenv('LOG_LEVEL', 'INFO')
     
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
     
     # 创建日志目录
-    log_dir = os.path.join(os.getcwd(), 'logs')
-    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.getenv('LOG_FILE') or os.path.join(os.getenv('LOG_DIR', os.path.join(os.getcwd(), 'logs')), 'app.log')
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
     
-    # 配置日志格式
-    logging.basicConfig(
-        level=numeric_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(os.path.join(log_dir, 'app.log')),
-            logging.StreamHandler()
-        ]
+    from ..utils.logs import build_handlers, install
+    handlers = build_handlers(
+        log_file,
+        fmt=os.getenv('LOG_FORMAT', 'text').lower(),  # text或json
+        max_bytes=int(float(os.getenv('LOG_MAX_MB', '50')) * 1024 * 1024),  # 0表示不轮转
+        backup_count=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+        console=os.getenv('LOG_CONSOLE', 'true').lower() == 'true',
+    )
+    install(
+        handlers,
+        numeric_level,
+        rate_limit=int(os.getenv('LOG_RATE_LIMIT', '10')),  # 同一位置每个窗口最多输出的条数，0表示不限流
+        rate_window=float(os.getenv('LOG_RATE_WINDOW', '60')),
+        asynchronous=os.getenv('LOG_ASYNC', 'true').lower() == 'true',
     )
     
     # 设置第三方库的日志级别
@@ -35,6 +56,7 @@ def setup_logging(log_level=None):
 # 数据库配置
 def get_database_url():
     """获取数据库连接URL"""
+    load_env()
     db_type = os.getenv('DB_TYPE', 'sqlite')
     
     if db_type.lower() == 'sqlite':
@@ -51,13 +73,167 @@ def get_database_url():
     else:
         raise ValueError(f"不支持的数据库类型: {db_type}")
 
+# SQLite性能配置
+def get_sqlite_config():
+    """获取SQLite连接的PRAGMA配置"""
+    load_env()
+    return {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size_mb': float(os.getenv('SQLITE_CACHE_SIZE_MB', '64')),
+        'mmap_size_mb': float(os.getenv('SQLITE_MMAP_SIZE_MB', '256')),
+        'busy_timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '30')),  # 秒
+    }
+
+# MySQL连接池与批量读写配置
+def get_mysql_config():
+    """获取MySQL连接池、批量写入和导出流式读取的配置"""
+    load_env()
+    return {
+        'pool_size': int(os.getenv('MYSQL_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('MYSQL_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('MYSQL_POOL_TIMEOUT', '30')),  # 秒，等待空闲连接的时间
+        'pool_recycle': int(os.getenv('MYSQL_POOL_RECYCLE', '1800')),  # 秒，应小于服务端wait_timeout
+        'pool_pre_ping': os.getenv('MYSQL_POOL_PRE_PING', 'true').lower() == 'true',
+        'charset': os.getenv('MYSQL_CHARSET', 'utf8mb4'),
+        'bulk_write': os.getenv('MYSQL_BULK_WRITE', 'true').lower() == 'true',  # 多行INSERT ... ON DUPLICATE KEY UPDATE
+        'max_packet_mb': float(os.getenv('MYSQL_MAX_PACKET_MB', '0')),  # 0表示读取服务端max_allowed_packet
+        'stream_exports': os.getenv('MYSQL_STREAM_EXPORTS', 'true').lower() == 'true',  # 导出使用服务端游标
+        'stream_chunk_rows': int(os.getenv('MYSQL_STREAM_CHUNK_ROWS', '50000')),
+    }
+
 # 爬虫配置
 def get_scraper_config():
     """获取爬虫配置"""
+    load_env()
     return {
         'max_pages': int(os.getenv('MAX_PAGES', '0')),  # 0表示不限制
         'use_proxy': os.getenv('USE_PROXY', 'false').lower() == 'true',
         'request_delay': float(os.getenv('REQUEST_DELAY', '5')),
-        'retry_times': int(os.getenv('RETRY_TIMES', '5')),
+        'retry_times': int(os.getenv('RETRY_TIMES', '5')),  # 单页最大尝试次数
         'timeout': int(os.getenv('REQUEST_TIMEOUT', '30')),
-    } 
\ No newline at end of file
+        'retry_budget': int(os.getenv('RETRY_BUDGET', '50')),  # 单次抓取的重试总预算，0表示不限制
+        'empty_page_retries': int(os.getenv('EMPTY_PAGE_RETRIES', '1')),
+        'backoff_base': float(os.getenv('BACKOFF_BASE', '2')),
+        'backoff_max': float(os.getenv('BACKOFF_MAX', '60')),
+        'breaker_error_rate': float(os.getenv('BREAKER_ERROR_RATE', '0.5')),
+        'breaker_window': int(os.getenv('BREAKER_WINDOW', '20')),
+        'breaker_min_requests': int(os.getenv('BREAKER_MIN_REQUESTS', '10')),
+        'breaker_cooldown': float(os.getenv('BREAKER_COOLDOWN', '300')),
+        'breaker_max_trips': int(os.getenv('BREAKER_MAX_TRIPS', '3')),
+        'base_url': os.getenv('CHINAWEALTH_BASE_URL', ''),  # 留空使用官网地址，可指向离线替身服务
+        'api_url': os.getenv('CHINAWEALTH_API_URL', ''),
+        'pipeline': os.getenv('PIPELINE_ENABLED', 'false').lower() == 'true',  # 抓取与入库流水线并行
+        'pipeline_queue_size': int(os.getenv('PIPELINE_QUEUE_SIZE', '4')),  # 阶段间队列缓存的页数
+        'pipeline_write_batch': int(os.getenv('PIPELINE_WRITE_BATCH', '5')),  # 每次提交最多合并的页数
+        'cache_enabled': os.getenv('HTTP_CACHE_ENABLED', 'false').lower() == 'true',  # 分页查询响应缓存，默认关闭
+        'cache_dir': os.getenv('HTTP_CACHE_DIR', os.path.join(os.getcwd(), 'data', 'cache')),
+        'cache_ttl': float(os.getenv('HTTP_CACHE_TTL', '43200')),  # 秒，默认12小时
+        'cache_max_mb': float(os.getenv('HTTP_CACHE_MAX_MB', '200')),
+        'sources': [name.strip() for name in os.getenv('SCRAPER_SOURCES', 'chinawealth').split(',') if name.strip()],
+        'rate_limit': float(os.getenv('RATE_LIMIT', '0')),  # 每秒最多请求数，0表示只按请求延迟等待
+        'rate_burst': int(os.getenv('RATE_BURST', '1')),
+        'pool_size': int(os.getenv('HTTP_POOL_SIZE', '4')),  # 每个数据源的连接池大小
+        'proxy_list': [url.strip() for url in os.getenv('PROXY_LIST', '').split(',') if url.strip()],
+        'proxy_file': os.getenv('PROXY_FILE', ''),  # 每行一个代理地址
+        'proxy_window': int(os.getenv('PROXY_WINDOW', '20')),  # 计算代理失败率的最近请求数
+        'proxy_min_requests': int(os.getenv('PROXY_MIN_REQUESTS', '5')),
+        'proxy_max_failure_rate': float(os.getenv('PROXY_MAX_FAILURE_RATE', '0.5')),
+        'proxy_quarantine': float(os.getenv('PROXY_QUARANTINE', '300')),  # 首次隔离秒数，再次隔离时加倍
+        'deadline': os.getenv('CRAWL_DEADLINE', ''),  # "06:00"或"4h"，留空表示不按截止时间安排
+        'min_request_delay': float(os.getenv('CRAWL_MIN_DELAY', '2')),  # 赶时间时允许的最小请求间隔(秒)
+        'deadline_margin': float(os.getenv('CRAWL_DEADLINE_MARGIN', '300')),  # 截止前预留给入库和导出的秒数
+        'priority_share': float(os.getenv('CRAWL_PRIORITY_SHARE', '0.2')),  # 来不及时预留给重点产品刷新的时间比例
+        'active_issuer_days': int(os.getenv('ACTIVE_ISSUER_DAYS', '7')),  # 近期活跃发行机构的统计天数
+        'crawl_mode': os.getenv('CRAWL_MODE', 'full'),  # full: 每次完整抓取；delta: 增量抓取，按周期完整抓取
+        'delta_orderby': os.getenv('DELTA_ORDERBY', 'cpqsrq desc'),  # 增量抓取时接口的排序参数
+        'delta_stop_pages': int(os.getenv('DELTA_STOP_PAGES', '1')),  # 连续多少整页没有变化时停止翻页
+        'full_sweep_days': int(os.getenv('FULL_SWEEP_DAYS', '7')),  # 增量模式下完整抓取的间隔天数
+        'crawl_state_file': os.getenv('CRAWL_STATE_FILE', os.path.join(os.getcwd(), 'data', 'crawl_state.json')),
+    }
+
+def get_source_config(source: str):
+    """获取单个数据源的爬虫配置
+
+    在get_scraper_config()的基础上，用SOURCE_<数据源>_<配置项>形式的环境变量覆盖，
+    例如SOURCE_CHINAWEALTH_REQUEST_DELAY=8、SOURCE_CHINAWEALTH_RETRY_BUDGET=20。
+
+    Args:
+        source: 数据源名称
+    """
+    config = get_scraper_config()
+    prefix = f"SOURCE_{source.upper()}_"
+    for key, default in list(config.items()):
+        value = os.getenv(prefix + key.upper())
+        if value is None:
+            continue
+        if isinstance(default, list):
+            config[key] = [item.strip() for item in value.split(',') if item.strip()]
+        elif isinstance(default, bool):
+            config[key] = value.lower() == 'true'
+        else:
+            config[key] = type(default)(value)
+    return config
+
+# 调度配置
+def get_scheduler_config():
+    """获取守护进程调度配置
+
+    调度表达式支持两种写法：
+    - "HH:MM": 每天在指定时间执行
+    - "30s" / "15m" / "2h": 按固定间隔执行
+    留空表示不启用该任务。
+    """
+    load_env()
+    watchlist = os.getenv('WATCHLIST_CODES', '')
+    return {
+        'crawl_schedule': os.getenv('CRAWL_SCHEDULE', '02:00'),
+        'export_schedule': os.getenv('EXPORT_SCHEDULE', ''),
+        'export_after_crawl': os.getenv('EXPORT_AFTER_CRAWL', 'true').lower() == 'true',
+        'export_format': os.getenv('EXPORT_FORMAT', 'all'),
+        'refresh_schedule': os.getenv('REFRESH_SCHEDULE', ''),
+        'watchlist_codes': [code.strip() for code in watchlist.split(',') if code.strip()],
+        'poll_interval': float(os.getenv('SCHEDULER_POLL_INTERVAL', '30')),
+        'session_max_age': int(os.getenv('SESSION_MAX_AGE', '1800')),
+        'maintain_schedule': os.getenv('MAINTAIN_SCHEDULE', '03:30'),  # 净值分区轮转和归档
+    }
+
+# 净值分区配置
+def get_partition_config():
+    """获取净值分区轮转和归档配置"""
+    load_env()
+    return {
+        'hot_months': int(os.getenv('NAV_HOT_MONTHS', '1')),  # 热表保留的月数(含当月)
+        'archive_after_months': int(os.getenv('NAV_ARCHIVE_AFTER_MONTHS', '0')),  # 默认0，不归档
+        'archive_dir': os.getenv('NAV_ARCHIVE_DIR', os.path.join(os.getcwd(), 'data', 'archive', 'navs')),
+    }
+
+# 净值入库校验配置
+def get_nav_validation_config():
+    """获取净值入库校验的规则阈值"""
+    load_env()
+    return {
+        'enabled': os.getenv('NAV_VALIDATION', 'true').lower() == 'true',
+        'action': os.getenv('NAV_ANOMALY_ACTION', 'quarantine'),  # quarantine: 不入库；flag: 仍入库
+        'max_change': float(os.getenv('NAV_MAX_CHANGE', '0.2')),  # 相对上一条净值的最大涨跌幅
+        'max_nav': float(os.getenv('NAV_MAX_VALUE', '50')),  # 净值上限
+        'lookback_days': int(os.getenv('NAV_LOOKBACK_DAYS', '31')),  # 查找上一条净值的天数
+    }
+
+# 产品列表变化配置
+def get_listing_config():
+    """获取产品列表变化跟踪配置"""
+    load_env()
+    return {
+        'enabled': os.getenv('LISTING_DIFF', 'true').lower() == 'true',
+        'export_dir': os.getenv('LISTING_DIFF_DIR', os.path.join(os.getcwd(), 'data', 'changes')),
+    }
+
+# 指标配置
+def get_metrics_config():
+    """获取运行指标输出配置"""
+    load_env()
+    return {
+        'enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+        'output_dir': os.getenv('METRICS_DIR', os.path.join(os.getcwd(), 'data', 'metrics')),
+    }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+守护进程模式
+在常驻进程中按计划执行抓取、导出和定向刷新任务，
+复用已预热的爬虫会话和数据库连接池，避免每次任务都冷启动。
+"""
+
+import os
+import signal
+import logging
+import argparse
+from datetime import datetime
+
+from src.config.config import (
+    setup_logging, get_database_url, get_scraper_config, get_scheduler_config, get_metrics_config,
+    get_partition_config
+)
+from src.main import run_crawl
+from src.runner import run_sources
+from src.maintain import run_maintenance
+from src.utils.export_data import DataExporter
+from src.utils.metrics import RunTracker
+from src.utils.scheduler import JobScheduler
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，跳过进程锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class ScraperDaemon:
+    """抓取守护进程
+
+    持有常驻的爬虫实例和数据库管理器，由调度器按计划调用各任务。
+    """
+
+    def __init__(self, scheduler_config: dict = None, scraper_config: dict = None,
+                 db_url: str = None, output_dir: str = None, max_pages: int = None,
+                 use_proxy: bool = None):
+        """
+        初始化守护进程
+
+        Args:
+            scheduler_config: 调度配置，默认读取环境变量
+            scraper_config: 爬虫配置，传入时所有数据源共用，默认按数据源读取环境变量
+            db_url: 数据库连接URL，默认使用配置文件中的设置
+            output_dir: 导出目录，默认为'data/export'
+            max_pages: 每次抓取的最大页数，默认使用爬虫配置
+            use_proxy: 是否使用代理，默认使用爬虫配置
+        """
+        from src.scrapers.registry import create_scraper
+        from src.database.db_manager import DatabaseManager
+
+        self.scheduler_config = scheduler_config or get_scheduler_config()
+        self.scraper_config = scraper_config or get_scraper_config()
+        self.output_dir = output_dir
+        self.max_pages = max_pages if max_pages is not None else self.scraper_config['max_pages']
+
+        # 常驻的数据库连接池和爬虫会话
+        self.partition_config = get_partition_config()
+        self.db_manager = DatabaseManager(db_url or get_database_url(),
+                                          archive_dir=self.partition_config['archive_dir'])
+        overrides = {'use_proxy': use_proxy} if use_proxy is not None else {}
+        self.scrapers = {
+            name: create_scraper(name, scraper_config, **overrides)
+            for name in self.scraper_config['sources']
+        }
+        # 定向刷新使用第一个数据源
+        self.scraper = next(iter(self.scrapers.values()))
+
+        self.scheduler = JobScheduler(
+            stats_file=os.path.join(os.getcwd(), 'data', 'daemon', 'job_stats.json'),
+            poll_interval=self.scheduler_config['poll_interval']
+        )
+        self._register_jobs()
+
+    def _register_jobs(self):
+        """按配置注册调度任务"""
+        config = self.scheduler_config
+        self.scheduler.add_job('crawl', self._tracked('crawl', self.crawl_job), config['crawl_schedule'])
+        self.scheduler.add_job('export', self._tracked('export', self.export_job), config['export_schedule'])
+        if config['watchlist_codes']:
+            self.scheduler.add_job('refresh', self._tracked('refresh', self.refresh_job),
+                                   config['refresh_schedule'])
+        elif config['refresh_schedule']:
+            logger.warning("已配置定向刷新调度但未设置WATCHLIST_CODES，跳过刷新任务")
+        self.scheduler.add_job('maintain', self.maintain_job, config['maintain_schedule'])
+
+    def _tracked(self, command: str, func):
+        """包装任务函数，为每次执行记录运行指标
+
+        Args:
+            command: 写入runs表的命令名称
+            func: 任务函数
+
+        Returns:
+            包装后的任务函数
+        """
+        def job():
+            metrics_config = get_metrics_config()
+            tracker = RunTracker(command, output_dir=metrics_config['output_dir'],
+                                 enabled=metrics_config['enabled'])
+            status = 'failed'
+            try:
+                func()
+                status = 'success'
+            finally:
+                tracker.finish(status, db_manager=self.db_manager)
+        return job
+
+    def crawl_job(self):
+        """全量抓取任务"""
+        pipeline = None
+        if self.scraper_config['pipeline']:
+            pipeline = {'queue_size': self.scraper_config['pipeline_queue_size'],
+                        'write_batch_pages': self.scraper_config['pipeline_write_batch']}
+        run_sources(self.scrapers, self.db_manager, max_pages=self.max_pages,
+                    session_max_age=self.scheduler_config['session_max_age'], pipeline=pipeline)
+        if self.scheduler_config['export_after_crawl']:
+            self.scheduler.trigger('export')
+
+    def export_job(self):
+        """数据导出任务"""
+        export_format = self.scheduler_config['export_format']
+        exporter = DataExporter(output_dir=self.output_dir, engine=self.db_manager.engine)
+        with exporter.snapshot():
+            if export_format in ['csv', 'all']:
+                exporter.export_to_csv()
+            if export_format in ['excel', 'all']:
+                exporter.export_to_excel()
+
+    def refresh_job(self):
+        """关注产品定向刷新任务"""
+        run_crawl(self.scraper, self.db_manager,
+                  product_codes=self.scheduler_config['watchlist_codes'],
+                  session_max_age=self.scheduler_config['session_max_age'])
+
+    def maintain_job(self):
+        """净值分区轮转和归档任务"""
+        run_maintenance(self.db_manager, self.partition_config['hot_months'],
+                        self.partition_config['archive_after_months'])
+
+    def run(self, run_now: list = None):
+        """运行调度循环
+
+        Args:
+            run_now: 启动后立即执行的任务名称列表
+        """
+        for name in run_now or []:
+            self.scheduler.trigger(name)
+        try:
+            self.scheduler.run_forever()
+        finally:
+            self.db_manager.close()
+
+    def stop(self, *_):
+        """停止守护进程"""
+        logger.info("收到停止信号，当前任务结束后退出")
+        self.scheduler.stop()
+
+def _acquire_pid_lock(lock_file: str):
+    """获取进程锁，防止多个守护进程同时运行
+
+    Args:
+        lock_file: 锁文件路径
+
+    Returns:
+        锁文件句柄，获取失败返回None
+    """
+    os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+    # 以追加方式打开，获取锁失败时不会清空正在运行的守护进程写入的pid
+    handle = open(lock_file, 'a+')
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+def add_arguments(parser):
+    """注册守护进程的命令行参数
+
+    Args:
+        parser: 命令行参数解析器
+    """
+    parser.add_argument('--max-pages', type=int, default=None,
+                        help='每次抓取的最大页数，默认为不限制')
+    parser.add_argument('--use-proxy', action='store_true',
+                        help='是否使用代理')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='导出目录，默认为data/export')
+    parser.add_argument('--run-now', type=str, default='',
+                        help='启动后立即执行的任务，逗号分隔，如crawl,export')
+
+def run(args):
+    """运行守护进程
+
+    Args:
+        args: 解析后的命令行参数
+    """
+    # 初始化日志
+    setup_logging()
+    logger.info("守护进程启动：%s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    lock_handle = _acquire_pid_lock(os.path.join(os.getcwd(), 'data', 'daemon', 'daemon.lock'))
+    if lock_handle is None:
+        logger.error("已有守护进程在运行，退出")
+        return
+
+    try:
+        daemon = ScraperDaemon(
+            output_dir=args.output_dir,
+            max_pages=args.max_pages,
+            use_proxy=True if args.use_proxy else None
+        )
+        signal.signal(signal.SIGTERM, daemon.stop)
+        signal.signal(signal.SIGINT, daemon.stop)
+        daemon.run(run_now=[name.strip() for name in args.run_now.split(',') if name.strip()])
+    except Exception as e:
+        logger.error("守护进程运行出错: %s", e)
+    finally:
+        lock_handle.close()
+        logger.info("守护进程已退出")
+
+def main(argv=None):
+    """守护进程入口函数"""
+    parser = argparse.ArgumentParser(description='理财产品抓取守护进程')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # 数据库模块 
 
 from src.database.db_manager import DatabaseManager
+from src.database.engine import create_db_engine, snapshot_connection
 
-__all__ = ['DatabaseManager'] 
\ No newline at end of file
+__all__ = ['DatabaseManager', 'create_db_engine', 'snapshot_connection'] 
\ No newline at end of file
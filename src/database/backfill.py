@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+历史数据批量回填
+
+记录逐块写入与目标表列相同的临时表，再用一条INSERT ... SELECT ... WHERE NOT EXISTS
+把目标表中还没有的记录插入目标表。每块只有两次批量语句，不经过ORM逐行查询和写入；
+已有的记录保持不变，重复回填同一批文件不会产生重复数据。
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, MetaData, Table, text
+
+from ..models.product import Product, ProductNav
+from .partitions import ALL_VIEW
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillLoader:
+    """经临时表把不存在的产品和净值批量插入数据库"""
+
+    def __init__(self, engine):
+        """
+        初始化回填
+
+        Args:
+            engine: SQLAlchemy引擎
+        """
+        self.engine = engine
+        self._metadata = MetaData()
+
+    def _stage_table(self, target: Table) -> Table:
+        """与目标表列相同(不含自增主键)的临时表"""
+        name = f'backfill_{target.name}'
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+        columns = [Column(column.name, column.type) for column in target.columns if column.name != 'id']
+        return Table(name, self._metadata, *columns, prefixes=['TEMPORARY'])
+
+    def _insert_missing(self, target: Table, existing: str, keys: Sequence[str], chunks: Iterable[List[Dict]],
+                        on_chunk=None) -> int:
+        """逐块把existing中不存在的记录插入目标表，每块一个事务
+
+        Args:
+            target: 目标表
+            existing: 判断记录是否已存在时查询的表或视图
+            keys: 唯一标识记录的列
+            chunks: 已去重的记录块，记录的键为目标表的列名，同一块中每条记录的键相同
+            on_chunk: 每块插入后调用，参数为(本块记录, 插入行数)
+
+        Returns:
+            插入的行数
+        """
+        stage = self._stage_table(target)
+        match = ' AND '.join(f"e.{key} = s.{key}" for key in keys)
+        inserted = 0
+        with self.engine.connect() as conn:
+            stage.create(conn, checkfirst=True)
+            conn.commit()
+            try:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    columns = [name for name in stage.columns.keys() if name in chunk[0]]
+                    statement = text(
+                        f"INSERT INTO {target.name} ({', '.join(columns)}) "
+                        f"SELECT {', '.join(f's.{name}' for name in columns)} FROM {stage.name} s "
+                        f"WHERE NOT EXISTS (SELECT 1 FROM {existing} e WHERE {match})"
+                    )
+                    with conn.begin():
+                        conn.execute(stage.delete())
+                        conn.execute(stage.insert(), chunk)
+                        count = conn.execute(statement).rowcount
+                    inserted += count
+                    if on_chunk is not None:
+                        on_chunk(chunk, count)
+            finally:
+                stage.drop(conn, checkfirst=True)
+                conn.commit()
+        return inserted
+
+    def load_products(self, chunks: Iterable[List[Dict]]) -> int:
+        """插入数据库中还没有的产品
+
+        Args:
+            chunks: 按product_code去重的产品记录块
+
+        Returns:
+            插入的产品数
+        """
+        inserted = self._insert_missing(Product.__table__, Product.__tablename__, ['product_code'], chunks)
+        logger.info("回填产品完成，新增 %s 条", inserted)
+        return inserted
+
+    def load_navs(self, chunks: Iterable[List[Dict]],
+                  table: Table = None) -> Tuple[int, Optional[date], Optional[date]]:
+        """插入数据库中还没有的净值
+
+        新净值写入table，是否已存在按汇总全部月分区的视图判断。
+
+        Args:
+            chunks: 按(product_code, nav_date)去重的净值记录块
+            table: 目标表，默认为热表；SQLite上已结束月份的净值直接写入对应的月表
+
+        Returns:
+            (插入的净值数, 有新增净值的最早日期, 最晚日期)
+        """
+        span = []
+
+        def track(chunk, count):
+            if count:
+                dates = [row['nav_date'] for row in chunk]
+                span.extend((min(dates), max(dates)))
+            logger.info("回填净值: 本块 %s 条，新增 %s 条", len(chunk), count)
+
+        table = ProductNav.__table__ if table is None else table
+        inserted = self._insert_missing(table, ALL_VIEW, ['product_code', 'nav_date'], chunks, on_chunk=track)
+        logger.info("回填净值到 %s 完成，新增 %s 条", table.name, inserted)
+        return inserted, (min(span) if span else None), (max(span) if span else None)
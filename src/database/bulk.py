@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+MySQL多行批量写入
+
+逐行的ORM flush在MySQL上每条记录都是一次网络往返。这里先用一次批量查询取出已有记录，
+在内存中比较出新增和有变化的记录，再把它们拼成多行INSERT ... ON DUPLICATE KEY UPDATE。
+每条语句的大小按服务端max_allowed_packet估算切分，一页数据通常只需要一两条语句。
+"""
+
+import logging
+from typing import Callable, Dict, Iterator, List, Sequence
+
+from sqlalchemy import bindparam, select, text
+
+logger = logging.getLogger(__name__)
+
+# 批量查询时IN列表每次的键数量
+_LOOKUP_CHUNK = 1000
+
+# 语句只使用包大小上限的一部分，为转义字符和语句本身留出余量
+_PACKET_USAGE = 0.75
+
+# 每个值在VALUES中的固定开销(引号、逗号等)和非字符串值的估算长度
+_VALUE_OVERHEAD = 4
+_SCALAR_BYTES = 24
+
+
+def estimate_row_bytes(row: Dict) -> int:
+    """估算一行记录在多行VALUES中占用的字节数"""
+    size = 2
+    for value in row.values():
+        if isinstance(value, str):
+            size += len(value.encode('utf-8')) + _VALUE_OVERHEAD
+        else:
+            size += _SCALAR_BYTES + _VALUE_OVERHEAD
+    return size
+
+
+class MySQLBulkWriter:
+    """按max_allowed_packet切分的多行INSERT ... ON DUPLICATE KEY UPDATE"""
+
+    def __init__(self, max_packet_bytes: int = 0):
+        """
+        初始化批量写入
+
+        Args:
+            max_packet_bytes: 单条语句的包大小上限，0表示首次写入时读取服务端的max_allowed_packet
+        """
+        self.max_packet_bytes = max_packet_bytes
+        self.statements = 0
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> 'MySQLBulkWriter':
+        """根据配置创建批量写入，配置关闭批量写入时返回None
+
+        Args:
+            config: get_mysql_config()返回的配置字典，默认读取环境变量
+        """
+        if config is None:
+            from ..config.config import get_mysql_config
+            config = get_mysql_config()
+        if not config['bulk_write']:
+            return None
+        return cls(max_packet_bytes=int(config['max_packet_mb'] * 1024 * 1024))
+
+    def packet_bytes(self, conn) -> int:
+        """单条语句的包大小上限，首次调用时读取服务端配置"""
+        if not self.max_packet_bytes:
+            self.max_packet_bytes = int(conn.execute(text("SELECT @@max_allowed_packet")).scalar())
+            logger.info("MySQL max_allowed_packet: %.1f MB", self.max_packet_bytes / 1024 / 1024)
+        return self.max_packet_bytes
+
+    def fetch_existing(self, conn, table, key_column: str, keys: Sequence, columns: Sequence[str],
+                       where=None) -> List:
+        """按键分批查询已有记录
+
+        Args:
+            conn: 数据库连接或会话
+            table: 表对象
+            key_column: IN查询使用的列名
+            keys: 键的取值
+            columns: 返回的列名
+            where: 附加的查询条件
+
+        Returns:
+            查询结果行列表
+        """
+        query = select(*(table.c[name] for name in columns)).where(
+            table.c[key_column].in_(bindparam('keys', expanding=True)))
+        if where is not None:
+            query = query.where(where)
+        rows = []
+        keys = list(keys)
+        for offset in range(0, len(keys), _LOOKUP_CHUNK):
+            rows.extend(conn.execute(query, {'keys': keys[offset:offset + _LOOKUP_CHUNK]}).all())
+        return rows
+
+    def split(self, rows: Sequence[Dict], limit: int) -> Iterator[List[Dict]]:
+        """将记录按估算大小切分为不超过limit字节的批次"""
+        budget = int(limit * _PACKET_USAGE)
+        batch, size = [], 0
+        for row in rows:
+            row_bytes = estimate_row_bytes(row)
+            if batch and size + row_bytes > budget:
+                yield batch
+                batch, size = [], 0
+            batch.append(row)
+            size += row_bytes
+        if batch:
+            yield batch
+
+    def upsert(self, conn, table, rows: Sequence[Dict], update: Callable) -> int:
+        """写入记录，唯一键冲突时按update给出的表达式更新已有记录
+
+        所有记录的键必须相同。
+
+        Args:
+            conn: 数据库连接或会话
+            table: 表对象
+            rows: 记录字典列表
+            update: 接收stmt.inserted，返回{列名: 更新表达式}
+
+        Returns:
+            执行的语句数
+        """
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        if not rows:
+            return 0
+        count = 0
+        for batch in self.split(rows, self.packet_bytes(conn)):
+            stmt = mysql_insert(table).values(batch)
+            conn.execute(stmt.on_duplicate_key_update(update(stmt.inserted)))
+            count += 1
+        self.statements += count
+        return count
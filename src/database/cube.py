@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+净值聚合立方
+
+按净值日期 × 维度(发行机构、风险等级、产品类型、币种以及全部产品)预先计算
+产品数、净值均值、最值、分位数和分布，保存在nav_aggregates表中。
+
+入库时只标记受影响的部分：新增或变化的净值标记所在日期，该日期的全部单元格重新计算；
+维度取值发生变化的产品只标记其有净值的日期上原取值和新取值两个单元格，产品从原单元格
+移出、加入新单元格，'all'和取值未变的维度不受影响。中位数和分布无法按差量累加，因此
+受影响的单元格按当日数据重新计算(按(nav_date, product_code)索引只读取当日的净值)，
+其他单元格和未受影响的日期不会重新计算。批量写入期间(batch)只标记，结束时统一计算。
+"""
+
+import json
+import bisect
+import logging
+import statistics
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, bindparam, column, delete, insert, select, text
+
+from ..models.aggregate import NavAggregate
+from .partitions import ALL_VIEW
+
+logger = logging.getLogger(__name__)
+
+# 聚合维度，对应products表的列
+DIMENSIONS = ('issuer', 'risk_level', 'product_type', 'currency')
+ALL_DIMENSION = 'all'
+
+# 净值分布的区间边界
+DISTRIBUTION_EDGES = (0.9, 0.95, 1.0, 1.02, 1.05, 1.1, 1.2)
+DISTRIBUTION_LABELS = (
+    [f'<{DISTRIBUTION_EDGES[0]}']
+    + [f'{low}-{high}' for low, high in zip(DISTRIBUTION_EDGES, DISTRIBUTION_EDGES[1:])]
+    + [f'>={DISTRIBUTION_EDGES[-1]}']
+)
+
+# 单元格统计输出的字段
+AGGREGATE_FIELDS = ['nav_date', 'dimension', 'dim_value', 'product_count', 'nav_count', 'avg_nav',
+                    'min_nav', 'p25_nav', 'median_nav', 'p75_nav', 'max_nav', 'distribution']
+
+
+def summarize(codes: List[str], navs: List[float]) -> Dict:
+    """计算一个单元格的统计值
+
+    Args:
+        codes: 单元格内的产品登记编码(每条净值记录一个)
+        navs: 单元格内非空的当前净值
+
+    Returns:
+        统计字段字典
+    """
+    result = {'product_count': len(set(codes)), 'nav_count': len(navs)}
+    if not navs:
+        result.update(avg_nav=None, min_nav=None, p25_nav=None, median_nav=None, p75_nav=None, max_nav=None,
+                      distribution=json.dumps({}))
+        return result
+    navs = sorted(navs)
+    if len(navs) > 1:
+        p25, median, p75 = statistics.quantiles(navs, n=4, method='inclusive')
+    else:
+        p25 = median = p75 = navs[0]
+    counts = [0] * len(DISTRIBUTION_LABELS)
+    for value in navs:
+        counts[bisect.bisect_right(DISTRIBUTION_EDGES, value)] += 1
+    result.update(
+        avg_nav=sum(navs) / len(navs), min_nav=navs[0], p25_nav=p25, median_nav=median, p75_nav=p75,
+        max_nav=navs[-1],
+        distribution=json.dumps({label: count for label, count in zip(DISTRIBUTION_LABELS, counts) if count},
+                                ensure_ascii=False)
+    )
+    return result
+
+
+class AggregateCube:
+    """净值聚合立方的维护和查询"""
+
+    def __init__(self, engine, write_lock=None):
+        """
+        初始化聚合立方
+
+        Args:
+            engine: SQLAlchemy引擎
+            write_lock: 与其他写入共用的锁，避免SQLite写事务互相冲突
+        """
+        self.engine = engine
+        self.write_lock = write_lock or threading.RLock()
+        self._dirty = set()
+        # 净值日期 -> 需要重新计算的(维度, 取值)单元格，日期已整体标记时不再单独计算
+        self._dirty_cells: Dict[date, Set[Tuple[str, str]]] = defaultdict(set)
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        """聚合表为空而数据库中已有净值时，按已有数据建立聚合"""
+        with self.engine.connect() as conn:
+            if conn.execute(select(NavAggregate.id).limit(1)).first() is not None:
+                return
+            if conn.execute(text(f"SELECT 1 FROM {ALL_VIEW} LIMIT 1")).first() is None:
+                return
+        count = self.rebuild()
+        logger.info("已为 %s 个净值日期建立聚合", count)
+
+    @contextmanager
+    def batch(self):
+        """批量写入期间只标记受影响的日期，最外层结束时统一重新计算"""
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                outermost = self._depth == 0
+            if outermost:
+                self.refresh()
+
+    def mark_dates(self, dates: Iterable[date]):
+        """标记需要重新计算的净值日期，不在批量写入中时立即计算
+
+        Args:
+            dates: 净值日期
+        """
+        with self._lock:
+            self._dirty.update(dates)
+            deferred = self._depth > 0
+        if not deferred:
+            self.refresh()
+
+    def mark_products(self, changes: Dict[str, List[Tuple[str, Optional[str], Optional[str]]]]):
+        """产品的维度取值变化后，标记这些产品有净值的日期上原取值和新取值的单元格
+
+        Args:
+            changes: {产品登记编码: [(维度, 原取值, 新取值)]}
+        """
+        if not changes:
+            return
+        query = text(f"SELECT product_code, nav_date FROM {ALL_VIEW} WHERE product_code IN :codes").bindparams(
+            bindparam('codes', expanding=True)).columns(column('product_code'), column('nav_date', Date))
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, {'codes': list(changes)}).all()
+        with self._lock:
+            for product_code, day in rows:
+                cells = self._dirty_cells[day]
+                for dimension, old, new in changes[product_code]:
+                    cells.add((dimension, (old or '')[:100]))
+                    cells.add((dimension, (new or '')[:100]))
+            deferred = self._depth > 0
+        if not deferred:
+            self.refresh()
+
+    def refresh(self) -> int:
+        """重新计算所有已标记的日期
+
+        Returns:
+            重新计算的日期数
+        """
+        with self._lock:
+            dirty, self._dirty = sorted(self._dirty), set()
+            dirty_cells, self._dirty_cells = self._dirty_cells, defaultdict(set)
+        for day in dirty:
+            dirty_cells.pop(day, None)
+        if not dirty and not dirty_cells:
+            return 0
+        try:
+            with self.write_lock, self.engine.begin() as conn:
+                for day in dirty:
+                    self._rebuild_date(conn, day)
+                for day, cells in sorted(dirty_cells.items()):
+                    self._rebuild_date(conn, day, cells)
+        except Exception as e:
+            # 计算失败的日期和单元格保留标记，下次写入时重试
+            with self._lock:
+                self._dirty.update(dirty)
+                for day, cells in dirty_cells.items():
+                    self._dirty_cells[day].update(cells)
+            logger.error("更新净值聚合失败: %s", e)
+            return 0
+        logger.debug("已更新 %d 个净值日期的聚合，%d 个日期的部分单元格", len(dirty), len(dirty_cells))
+        return len(dirty) + len(dirty_cells)
+
+    def rebuild(self, start_date: date = None, end_date: date = None) -> int:
+        """按数据库中的净值重新计算指定日期范围内的全部聚合
+
+        Args:
+            start_date: 起始净值日期(含)，为None表示不限制
+            end_date: 结束净值日期(含)，为None表示不限制
+
+        Returns:
+            重新计算的日期数
+        """
+        conditions, params = [], {}
+        if start_date is not None:
+            conditions.append("nav_date >= :start_date")
+            params['start_date'] = start_date.isoformat()
+        if end_date is not None:
+            conditions.append("nav_date <= :end_date")
+            params['end_date'] = end_date.isoformat()
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self.engine.connect() as conn:
+            dates = conn.execute(text(f"SELECT DISTINCT nav_date FROM {ALL_VIEW}{where}").columns(
+                column('nav_date', Date)), params).scalars().all()
+        with self.write_lock, self.engine.begin() as conn:
+            for day in dates:
+                self._rebuild_date(conn, day)
+        return len(dates)
+
+    def _rebuild_date(self, conn, day: date, only: Set[Tuple[str, str]] = None):
+        """按当日的净值重新计算该日期的单元格
+
+        Args:
+            conn: 数据库连接
+            day: 净值日期
+            only: 只重新计算的(维度, 取值)单元格，为None时计算全部单元格
+        """
+        where, params = "n.nav_date = :day", {'day': day.isoformat()}
+        if only is not None and (ALL_DIMENSION, '') not in only:
+            # 只读取属于这些单元格的净值
+            conditions = []
+            for name in DIMENSIONS:
+                values = sorted(value for dimension, value in only if dimension == name)
+                if values:
+                    conditions.append(f"COALESCE(substr(p.{name}, 1, 100), '') IN :v_{name}")
+                    params[f'v_{name}'] = values
+            where += f" AND ({' OR '.join(conditions)})"
+        query = text(
+            f"SELECT n.product_code, n.current_nav, {', '.join(f'p.{name}' for name in DIMENSIONS)} "
+            f"FROM {ALL_VIEW} n LEFT JOIN products p ON n.product_code = p.product_code "
+            f"WHERE {where}"
+        ).bindparams(*[bindparam(key, expanding=True) for key in params if key != 'day'])
+        rows = conn.execute(query, params).all()
+
+        cells = defaultdict(lambda: ([], []))
+        for row in rows:
+            code, nav = row[0], row[1]
+            keys = [(ALL_DIMENSION, '')] + [(name, (value or '')[:100]) for name, value in zip(DIMENSIONS, row[2:])]
+            for key in keys:
+                if only is not None and key not in only:
+                    continue
+                codes, navs = cells[key]
+                codes.append(code)
+                if nav is not None:
+                    navs.append(nav)
+
+        if only is None:
+            conn.execute(delete(NavAggregate).where(NavAggregate.nav_date == day))
+        else:
+            # 产品移出后没有成员的单元格只删除
+            conn.execute(delete(NavAggregate).where(
+                NavAggregate.nav_date == day, NavAggregate.dimension == bindparam('b_dimension'),
+                NavAggregate.dim_value == bindparam('b_value')),
+                [{'b_dimension': dimension, 'b_value': value} for dimension, value in only])
+        if cells:
+            conn.execute(insert(NavAggregate), [
+                dict(nav_date=day, dimension=dimension, dim_value=value, **summarize(codes, navs))
+                for (dimension, value), (codes, navs) in cells.items()
+            ])
+
+    def query(self, dimension: str = ALL_DIMENSION, dim_value: Optional[str] = None,
+              start_date: date = None, end_date: date = None) -> List[Dict]:
+        """查询聚合结果
+
+        Args:
+            dimension: 维度名称，issuer/risk_level/product_type/currency/all
+            dim_value: 维度取值，为None表示该维度的全部取值
+            start_date: 起始净值日期(含)
+            end_date: 结束净值日期(含)
+
+        Returns:
+            聚合记录字典列表，按净值日期、维度取值排序，distribution已解析为字典
+        """
+        if dimension != ALL_DIMENSION and dimension not in DIMENSIONS:
+            raise ValueError(f"未知的聚合维度: {dimension}，可用的维度: {', '.join((ALL_DIMENSION,) + DIMENSIONS)}")
+        query = select(*[getattr(NavAggregate, field) for field in AGGREGATE_FIELDS]).where(
+            NavAggregate.dimension == dimension)
+        if dim_value is not None:
+            query = query.where(NavAggregate.dim_value == dim_value)
+        if start_date is not None:
+            query = query.where(NavAggregate.nav_date >= start_date)
+        if end_date is not None:
+            query = query.where(NavAggregate.nav_date <= end_date)
+        query = query.order_by(NavAggregate.nav_date, NavAggregate.dim_value)
+        with self.engine.connect() as conn:
+            records = [dict(row) for row in conn.execute(query).mappings()]
+        for record in records:
+            record['distribution'] = json.loads(record['distribution'] or '{}')
+        return records
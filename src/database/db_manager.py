@@ -1,14 +1,42 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, date
 import logging
 import os
+import time
+import threading
 from typing import List, Dict, Optional, Any
+from sqlalchemy import bindparam, insert, text, func
 from ..models.product import Base, Product, ProductNav
+from ..models.run import RunRecord
+from ..models.anomaly import NavAnomaly
+from ..models.listing import ProductChange
+from ..utils.metrics import get_metrics
+from .engine import create_db_engine, add_missing_columns
+from .partitions import NavPartitionManager, ALL_VIEW, NAV_COLUMNS
+from .search import ProductSearchIndex
+from .cube import AggregateCube, DIMENSIONS as CUBE_DIMENSIONS
+from .validation import NavValidator, ACTION_QUARANTINE, ACTION_RELEASED
+from .bulk import MySQLBulkWriter
+from .listing import ListingTracker
 
 logger = logging.getLogger(__name__)
 
+
+def record_run(engine, run_info: Dict) -> None:
+    """直接用引擎写入一条运行记录，不创建DatabaseManager(不建表、不维护索引和聚合)
+
+    Args:
+        engine: SQLAlchemy引擎
+        run_info: 运行汇总信息，字段与RunRecord一致
+    """
+    table = RunRecord.__table__
+    row = {key: value for key, value in run_info.items() if key in table.columns}
+    with engine.begin() as conn:
+        table.create(conn, checkfirst=True)
+        conn.execute(insert(table), [row])
+
+
 class DatabaseManager:
     """数据库管理类
     
@@ -16,25 +44,56 @@ class DatabaseManager:
     支持SQLite和MySQL数据库。
     """
     
-    def __init__(self, db_url: str = None):
+    def __init__(self, db_url: str = None, engine=None, archive_dir: str = None,
+                 nav_validator: NavValidator = None):
         """初始化数据库连接
         
         Args:
             db_url: 数据库连接URL，如为None则使用默认的SQLite数据库
+            engine: 已有的数据库引擎，传入时复用该引擎
+            archive_dir: 净值归档文件目录，默认为'data/archive/navs'
+            nav_validator: 净值入库校验器，默认按get_nav_validation_config()创建
         """
-        if db_url is None:
+        if engine is not None:
+            db_url = str(engine.url)
+        elif db_url is None:
             # 默认使用SQLite数据库
             db_dir = os.path.join(os.getcwd(), 'data', 'db')
             os.makedirs(db_dir, exist_ok=True)
             db_url = f"sqlite:///{os.path.join(db_dir, 'financial_products.db')}"
             
-        self.engine = create_engine(db_url)
+        # SQLite使用WAL等性能配置，抓取写入时导出仍可并发读取
+        self.engine = engine if engine is not None else create_db_engine(db_url)
         self.session_factory = sessionmaker(bind=self.engine)
         self.Session = scoped_session(self.session_factory)
+        self.write_lock = threading.RLock()
         
-        # 创建表
+        # 创建表，并为旧数据库补齐新增的列
         Base.metadata.create_all(self.engine)
-        logger.info(f"数据库初始化完成，使用: {db_url}")
+        with self.engine.begin() as conn:
+            add_missing_columns(conn, Product.__tablename__, Product.__table__.columns)
+        
+        # 产品全文检索索引，由save_products在同一事务中维护
+        self.search_index = ProductSearchIndex(self.engine)
+        self.search_index.ensure()
+        
+        # 净值按月分区，product_navs只保留热数据
+        self.partitions = NavPartitionManager(self.engine, archive_dir)
+        self.partitions.ensure()
+        
+        # 按日期和维度预先计算的净值聚合，由入库方法增量维护
+        self.cube = AggregateCube(self.engine, self.write_lock)
+        self.cube.ensure()
+        
+        # 净值入库前的批量校验，异常净值写入nav_anomalies表
+        self.nav_validator = nav_validator or NavValidator.from_config(self.engine)
+        
+        # MySQL上以多行INSERT ... ON DUPLICATE KEY UPDATE代替逐行ORM写入
+        self.bulk_writer = MySQLBulkWriter.from_config() if self.engine.dialect.name == 'mysql' else None
+        
+        # 每次抓取写入的产品成员集合，抓取结束时与上次的快照比较
+        self.listings = ListingTracker.from_config(self.engine)
+        logger.info("数据库初始化完成，使用: %s", db_url)
         
     def get_session(self):
         """获取数据库会话
@@ -48,130 +107,323 @@ class DatabaseManager:
         """关闭数据库连接"""
         self.Session.remove()
         
-    def save_products(self, products: List[Dict]) -> int:
+    def save_products(self, products: List[Dict], source: str = None) -> int:
         """
         保存产品基本信息
         
         Args:
             products: 产品信息列表
+            source: 数据来源，为None时使用记录中的值或默认来源
             
         Returns:
             保存的产品数量
         """
-        session = self.get_session()
-        try:
-            saved_count = 0
-            for product_info in products:
-                product_code = product_info.get('product_code')
-                if not product_code:
-                    logger.warning(f"产品信息缺少product_code: {product_info}")
-                    continue
-                    
-                # 查找是否已存在(使用product_code作为唯一标识)
-                product = session.query(Product).filter_by(product_code=product_code).first()
-                
-                if product:
-                    # 更新已有产品信息
-                    for key, value in product_info.items():
-                        if hasattr(product, key) and key != 'product_code':
-                            setattr(product, key, value)
+        # 多个数据源并行抓取时串行化写入，避免SQLite写事务互相冲突
+        with self.write_lock:
+            start_time = time.perf_counter()
+            session = self.get_session()
+            try:
+                if self.bulk_writer is not None:
+                    saved_count, regrouped = self._save_products_bulk(session, products, source)
                 else:
-                    # 创建新产品
-                    product = Product(**product_info)
-                    session.add(product)
-                
-                saved_count += 1
+                    saved_count, regrouped = self._save_products_orm(session, products, source)
+                session.commit()
+                self.cube.mark_products(regrouped)
+                self.listings.observe(products, source)
+                get_metrics().inc('db_rows_written_total', saved_count, table='products')
+                logger.info("成功保存 %s 条产品信息", saved_count)
+                return saved_count
+            except Exception as e:
+                session.rollback()
+                self.listings.invalidate(source)
+                logger.error("保存产品信息失败: %s", e)
+                raise
+            finally:
+                session.close()
+                get_metrics().observe('db_write_duration_seconds', time.perf_counter() - start_time, table='products')
+    
+    def _save_products_orm(self, session, products: List[Dict], source: str = None):
+        """逐条查询并通过ORM写入产品信息
+        
+        Returns:
+            (保存的产品数量, {聚合维度取值变化的产品编码: [(维度, 原取值, 新取值)]})
+        """
+        saved_count = 0
+        saved = {}
+        regrouped = {}
+        for product_info in products:
+            product_code = product_info.get('product_code')
+            if not product_code:
+                logger.warning("产品信息缺少product_code: %s", product_info)
+                continue
             
-            session.commit()
-            logger.info(f"成功保存 {saved_count} 条产品信息")
-            return saved_count
-        except Exception as e:
-            session.rollback()
-            logger.error(f"保存产品信息失败: {str(e)}")
-            raise
-        finally:
-            session.close()
+            # 查找是否已存在(使用product_code作为唯一标识)
+            product = session.query(Product).filter_by(product_code=product_code).first()
+        
+            if product:
+                # 聚合维度取值变化的产品，其净值所在日期上原取值和新取值的单元格需要重新计算
+                moved = [(key, getattr(product, key), product_info[key]) for key in CUBE_DIMENSIONS
+                         if key in product_info and getattr(product, key) != product_info[key]]
+                if moved:
+                    regrouped.setdefault(product_code, []).extend(moved)
+                # 更新已有产品信息
+                for key, value in product_info.items():
+                    if hasattr(product, key) and key != 'product_code':
+                        setattr(product, key, value)
+            else:
+                # 创建新产品
+                product = Product(**product_info)
+                session.add(product)
+            if source:
+                product.source = source
+            saved[product_code] = product
+        
+            saved_count += 1
             
-    def save_product_navs(self, navs: List[Dict]) -> int:
+        # 新产品需要先分配ID，检索索引按产品ID更新
+        session.flush()
+        self.search_index.update(session, [
+            (product.id, code, product.product_name, product.issuer, product.sale_regions)
+            for code, product in saved.items()
+        ])
+        return saved_count, regrouped
+    
+    def _save_products_bulk(self, session, products: List[Dict], source: str = None):
+        """MySQL: 一次查询取出已有产品，新增和有变化的产品以多行INSERT ... ON DUPLICATE KEY UPDATE写入
+        
+        MySQL的检索索引是products表上的FULLTEXT索引，随表自动更新。
+        
+        Returns:
+            (保存的产品数量, {聚合维度取值变化的产品编码: [(维度, 原取值, 新取值)]})
+        """
+        table = Product.__table__
+        columns = [name for name in table.columns.keys() if name not in ('id', 'created_at', 'updated_at')]
+        saved_count = 0
+        rows = {}
+        for product_info in products:
+            product_code = product_info.get('product_code')
+            if not product_code:
+                logger.warning("产品信息缺少product_code: %s", product_info)
+                continue
+            row = rows.setdefault(product_code, {})
+            row.update((key, value) for key, value in product_info.items() if key in columns)
+            if source:
+                row['source'] = source
+            saved_count += 1
+        
+        existing = {record.product_code: record for record in self.bulk_writer.fetch_existing(
+            session, table, 'product_code', list(rows), columns)}
+        regrouped = {}
+        changed = []
+        for product_code, row in rows.items():
+            record = existing.get(product_code)
+            if record is None:
+                changed.append(row)
+                continue
+            # 聚合维度取值变化的产品，其净值所在日期上原取值和新取值的单元格需要重新计算
+            moved = [(key, getattr(record, key), row[key]) for key in CUBE_DIMENSIONS
+                     if key in row and getattr(record, key) != row[key]]
+            if moved:
+                regrouped[product_code] = moved
+            if any(getattr(record, key) != value for key, value in row.items()):
+                changed.append(row)
+        
+        # 多行VALUES要求每行的列相同，按列分组写入；唯一键冲突时只更新记录中给出的列
+        now = datetime.now()
+        groups = {}
+        for row in changed:
+            groups.setdefault(tuple(sorted(row)), []).append(dict(row, created_at=now, updated_at=now))
+        for keys, group in groups.items():
+            self.bulk_writer.upsert(session, table, group, lambda inserted, keys=keys: dict(
+                {key: inserted[key] for key in keys if key != 'product_code'}, updated_at=inserted.updated_at))
+        return saved_count, regrouped
+    
+    def save_product_navs(self, navs: List[Dict], source: str = None) -> int:
         """
         保存产品净值信息，并检查更新状态
         
+        入库前整批校验，未通过校验的净值写入nav_anomalies表，隔离模式下不写入净值表。
+        
         Args:
             navs: 净值信息列表
+            source: 数据来源，为None时使用默认来源
             
         Returns:
             保存的净值记录数量
         """
-        session = self.get_session()
-        try:
-            saved_count = 0
-            updated_count = 0
-            new_count = 0
-            
-            for nav_info in navs:
-                product_code = nav_info.get('product_code')
-                nav_date_str = nav_info.get('nav_date')
+        # 多个数据源并行抓取时串行化写入，避免SQLite写事务互相冲突
+        with self.write_lock:
+            start_time = time.perf_counter()
+            session = self.get_session()
+            try:
+                navs, anomalies = self.nav_validator.check(session, navs, source=source)
+                if anomalies:
+                    session.execute(insert(NavAnomaly), anomalies)
                 
-                if not product_code or not nav_date_str:
-                    logger.warning(f"净值信息缺少必要字段: {nav_info}")
-                    continue
-                
-                # 转换日期格式
-                try:
-                    nav_date = datetime.strptime(nav_date_str, "%Y-%m-%d").date()
-                except ValueError:
-                    logger.warning(f"净值日期格式错误: {nav_date_str}")
-                    continue
-                    
-                # 查找是否已存在该日期的净值记录(使用product_code和nav_date作为组合唯一标识)
-                existing_nav = session.query(ProductNav).filter_by(
-                    product_code=product_code, 
-                    nav_date=nav_date
-                ).first()
-                
-                if existing_nav:
-                    # 检查净值是否有更新
-                    is_updated = False
-                    for nav_type in ['initial_nav', 'accumulated_nav', 'current_nav']:
-                        old_value = getattr(existing_nav, nav_type)
-                        new_value = nav_info.get(nav_type)
-                        
-                        if new_value is not None and old_value != new_value:
-                            setattr(existing_nav, nav_type, new_value)
-                            is_updated = True
-                    
-                    if is_updated:
-                        existing_nav.is_updated = 1
-                        existing_nav.last_update_date = date.today()
-                        updated_count += 1
+                if self.bulk_writer is not None:
+                    saved_count, new_count, updated_count, touched_dates = self._save_navs_bulk(session, navs, source)
                 else:
-                    # 创建新净值记录
-                    nav_record = ProductNav(
-                        product_id=nav_info.get('product_id'),
-                        product_code=product_code,
-                        nav_date=nav_date,
-                        initial_nav=nav_info.get('initial_nav'),
-                        accumulated_nav=nav_info.get('accumulated_nav'),
-                        current_nav=nav_info.get('current_nav'),
-                        is_updated=0,  # 新记录默认为未更新
-                        last_update_date=None,
-                        crawl_time=nav_info.get('crawl_time')
-                    )
-                    session.add(nav_record)
-                    new_count += 1
+                    saved_count, new_count, updated_count, touched_dates = self._save_navs_orm(session, navs, source)
                 
-                saved_count += 1
+                session.commit()
+                self.cube.mark_dates(touched_dates)
+                get_metrics().inc('db_rows_written_total', saved_count, table='product_navs')
+                logger.info("成功保存 %s 条净值信息(新增: %s, 更新: %s, 异常: %s)",
+                            saved_count, new_count, updated_count, len(anomalies))
+                return saved_count
+            except Exception as e:
+                session.rollback()
+                logger.error("保存净值信息失败: %s", e)
+                raise
+            finally:
+                session.close()
+                get_metrics().observe('db_write_duration_seconds', time.perf_counter() - start_time, table='product_navs')
+            
+    def _save_navs_orm(self, session, navs: List[Dict], source: str = None):
+        """逐条查询并通过ORM写入净值信息
+        
+        Returns:
+            (保存的净值数量, 新增数量, 更新数量, 新增或更新的净值日期集合)
+        """
+        saved_count = 0
+        updated_count = 0
+        new_count = 0
+        touched_dates = set()
+        for nav_info in navs:
+            product_code = nav_info.get('product_code')
+            nav_date_str = nav_info.get('nav_date')
+        
+            if not product_code or not nav_date_str:
+                logger.warning("净值信息缺少必要字段: %s", nav_info)
+                continue
+        
+            # 转换日期格式
+            try:
+                nav_date = datetime.strptime(nav_date_str, "%Y-%m-%d").date()
+            except ValueError:
+                logger.warning("净值日期格式错误: %s", nav_date_str, extra={'product_code': product_code})
+                continue
+            
+            # 查找是否已存在该日期的净值记录(使用product_code和nav_date作为组合唯一标识)
+            existing_nav = session.query(ProductNav).filter_by(
+                product_code=product_code, 
+                nav_date=nav_date
+            ).first()
+        
+            if existing_nav:
+                # 检查净值是否有更新
+                is_updated = False
+                for nav_type in ['initial_nav', 'accumulated_nav', 'current_nav']:
+                    old_value = getattr(existing_nav, nav_type)
+                    new_value = nav_info.get(nav_type)
                 
-            session.commit()
-            logger.info(f"成功保存 {saved_count} 条净值信息(新增: {new_count}, 更新: {updated_count})")
-            return saved_count
-        except Exception as e:
-            session.rollback()
-            logger.error(f"保存净值信息失败: {str(e)}")
-            raise
-        finally:
-            session.close()
+                    if new_value is not None and old_value != new_value:
+                        setattr(existing_nav, nav_type, new_value)
+                        is_updated = True
             
+                if is_updated:
+                    existing_nav.is_updated = 1
+                    if source:
+                        existing_nav.source = source
+                    existing_nav.last_update_date = date.today()
+                    touched_dates.add(nav_date)
+                    updated_count += 1
+            else:
+                # 创建新净值记录
+                nav_record = ProductNav(
+                    product_id=nav_info.get('product_id'),
+                    product_code=product_code,
+                    nav_date=nav_date,
+                    initial_nav=nav_info.get('initial_nav'),
+                    accumulated_nav=nav_info.get('accumulated_nav'),
+                    current_nav=nav_info.get('current_nav'),
+                    is_updated=0,  # 新记录默认为未更新
+                    last_update_date=None,
+                    crawl_time=nav_info.get('crawl_time'),
+                    source=source or nav_info.get('source') or 'chinawealth'
+                )
+                session.add(nav_record)
+                touched_dates.add(nav_date)
+                new_count += 1
+        
+            saved_count += 1
+        
+        return saved_count, new_count, updated_count, touched_dates
+    
+    def _save_navs_bulk(self, session, navs: List[Dict], source: str = None):
+        """MySQL: 一次查询取出已有净值，新增和有变化的净值以多行INSERT ... ON DUPLICATE KEY UPDATE写入
+        
+        依赖product_navs上(product_code, nav_date)的唯一键，见NavPartitionManager.ensure()。
+        
+        Returns:
+            (保存的净值数量, 新增数量, 更新数量, 新增或更新的净值日期集合)
+        """
+        table = ProductNav.__table__
+        nav_types = ['initial_nav', 'accumulated_nav', 'current_nav']
+        saved_count = 0
+        parsed = {}
+        for nav_info in navs:
+            product_code = nav_info.get('product_code')
+            nav_date_str = nav_info.get('nav_date')
+            
+            if not product_code or not nav_date_str:
+                logger.warning("净值信息缺少必要字段: %s", nav_info)
+                continue
+            
+            try:
+                nav_date = datetime.strptime(nav_date_str, "%Y-%m-%d").date()
+            except ValueError:
+                logger.warning("净值日期格式错误: %s", nav_date_str, extra={'product_code': product_code})
+                continue
+            parsed[(product_code, nav_date)] = nav_info
+            saved_count += 1
+        if not parsed:
+            return saved_count, 0, 0, set()
+        
+        dates = [nav_date for _, nav_date in parsed]
+        existing = {(record.product_code, record.nav_date): record for record in self.bulk_writer.fetch_existing(
+            session, table, 'product_code', list({code for code, _ in parsed}),
+            ['product_code', 'nav_date', 'source'] + nav_types,
+            where=table.c.nav_date.between(min(dates), max(dates)))}
+        
+        now = datetime.now()
+        today = date.today()
+        rows = []
+        new_count = 0
+        updated_count = 0
+        touched_dates = set()
+        for (product_code, nav_date), nav_info in parsed.items():
+            record = existing.get((product_code, nav_date))
+            if record is None:
+                values = {nav_type: nav_info.get(nav_type) for nav_type in nav_types}
+                new_count += 1
+                is_updated, last_update_date = 0, None
+                nav_source = source or nav_info.get('source') or 'chinawealth'
+            else:
+                # 只有给出的净值与已有值不同时才更新，与逐条写入的判断一致
+                values = {nav_type: getattr(record, nav_type) if nav_info.get(nav_type) is None
+                          else nav_info.get(nav_type) for nav_type in nav_types}
+                if all(values[nav_type] == getattr(record, nav_type) for nav_type in nav_types):
+                    continue
+                updated_count += 1
+                is_updated, last_update_date = 1, today
+                nav_source = source or record.source
+            touched_dates.add(nav_date)
+            rows.append(dict(values, product_id=nav_info.get('product_id'), product_code=product_code,
+                             nav_date=nav_date, is_updated=is_updated, last_update_date=last_update_date,
+                             crawl_time=nav_info.get('crawl_time'), source=nav_source,
+                             created_at=now, updated_at=now))
+        
+        # 查询之后其他进程写入的同一净值也按更新处理，产品ID和抓取时间保留首次写入的值
+        self.bulk_writer.upsert(session, table, rows, lambda inserted: {
+            **{nav_type: func.coalesce(inserted[nav_type], table.c[nav_type]) for nav_type in nav_types},
+            'is_updated': 1,
+            'last_update_date': today,
+            'source': inserted.source,
+            'updated_at': inserted.updated_at,
+        })
+        return saved_count, new_count, updated_count, touched_dates
+    
     def get_products_count(self) -> int:
         """获取产品总数
         
@@ -188,13 +440,10 @@ class DatabaseManager:
         """获取净值记录总数
         
         Returns:
-            数据库中净值记录的总数
+            数据库中净值记录的总数(含各月分区，不含已归档的数据)
         """
-        session = self.get_session()
-        try:
-            return session.query(ProductNav).count()
-        finally:
-            session.close()
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {ALL_VIEW}")).scalar()
             
     def get_product_by_code(self, product_code: str) -> Optional[Product]:
         """根据产品登记编码获取产品信息
@@ -211,6 +460,31 @@ class DatabaseManager:
         finally:
             session.close()
             
+    def search_products(self, query: str, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """按产品名称、发行机构或销售区域的片段检索产品
+        
+        Args:
+            query: 检索文本，中文片段也可以命中
+            page: 页码，从1开始
+            page_size: 每页条数
+            
+        Returns:
+            {'total': 匹配总数, 'page': 页码, 'page_size': 每页条数,
+             'items': [{'product': 产品信息对象, 'score': 相关度得分}]}，按相关度降序
+        """
+        page = max(1, page)
+        total, ranked = self.search_index.search(query, limit=page_size, offset=(page - 1) * page_size)
+        items = []
+        if ranked:
+            session = self.get_session()
+            try:
+                products = {product.product_code: product for product in session.query(Product).filter(
+                    Product.product_code.in_([code for code, _ in ranked]))}
+            finally:
+                session.close()
+            items = [{'product': products[code], 'score': score} for code, score in ranked if code in products]
+        return {'total': total, 'page': page, 'page_size': page_size, 'items': items}
+            
     def get_latest_nav_by_code(self, product_code: str) -> Optional[ProductNav]:
         """获取产品最新的净值信息
         
@@ -222,8 +496,318 @@ class DatabaseManager:
         """
         session = self.get_session()
         try:
-            return session.query(ProductNav).filter_by(
+            # 优先查询热表，只有近期没有净值的产品才查询历史分区
+            nav = session.query(ProductNav).filter_by(
                 product_code=product_code
             ).order_by(ProductNav.nav_date.desc()).first()
+            if nav is None:
+                nav = session.query(ProductNav).from_statement(text(
+                    f"SELECT {', '.join(NAV_COLUMNS)} FROM {ALL_VIEW} WHERE product_code = :code "
+                    f"ORDER BY nav_date DESC LIMIT 1"
+                )).params(code=product_code).first()
+            return nav
         finally:
-            session.close() 
\ No newline at end of file
+            session.close()
+            
+    def get_nav_history(self, product_code: str, start_date: date = None, end_date: date = None,
+                        include_archive: bool = True) -> List[Dict]:
+        """查询产品的净值历史
+        
+        依次读取热表、各月分区和归档文件，结果按净值日期升序排列。
+        
+        Args:
+            product_code: 产品登记编码
+            start_date: 起始净值日期(含)
+            end_date: 结束净值日期(含)
+            include_archive: 是否包含已归档的数据
+            
+        Returns:
+            净值记录字典列表
+        """
+        conditions = ["product_code = :code"]
+        params = {'code': product_code}
+        if start_date is not None:
+            conditions.append("nav_date >= :start_date")
+            params['start_date'] = start_date.isoformat()
+        if end_date is not None:
+            conditions.append("nav_date <= :end_date")
+            params['end_date'] = end_date.isoformat()
+        
+        with self.engine.connect() as conn:
+            # 按模型列类型转换结果，SQLite中以字符串保存的日期也返回date/datetime
+            query = text(
+                f"SELECT {', '.join(NAV_COLUMNS)} FROM {ALL_VIEW} WHERE {' AND '.join(conditions)}"
+            ).columns(*ProductNav.__table__.columns)
+            records = {}
+            for row in conn.execute(query, params).mappings():
+                records[row['nav_date']] = dict(row)
+        
+        if include_archive:
+            for record in self.partitions.read_archives(product_code, start_date, end_date):
+                # 数据库中的记录优先
+                records.setdefault(record['nav_date'], record)
+        
+        return [records[nav_date] for nav_date in sorted(records)]
+    
+    def get_recently_active_codes(self, since: date, limit: int = 1000) -> List[str]:
+        """近期有净值的发行机构的产品，最可能有新净值的在前
+        
+        按发行机构在统计期内的净值条数降序，同一机构内按产品最新净值日期降序。
+        
+        Args:
+            since: 统计的起始净值日期(含)
+            limit: 最多返回的产品数
+            
+        Returns:
+            产品登记编码列表
+        """
+        query = text(
+            f"SELECT p.product_code FROM products p "
+            f"JOIN (SELECT p2.issuer, COUNT(*) AS activity FROM {ALL_VIEW} n "
+            f"      JOIN products p2 ON p2.product_code = n.product_code "
+            f"      WHERE n.nav_date >= :since GROUP BY p2.issuer) a ON a.issuer = p.issuer "
+            f"LEFT JOIN (SELECT product_code, MAX(nav_date) AS latest FROM {ALL_VIEW} "
+            f"           WHERE nav_date >= :since GROUP BY product_code) l ON l.product_code = p.product_code "
+            f"ORDER BY a.activity DESC, l.latest DESC, p.product_code LIMIT :limit"
+        )
+        with self.engine.connect() as conn:
+            return conn.execute(query, {'since': since.isoformat(), 'limit': limit}).scalars().all()
+    
+    def get_change_fingerprints(self, product_codes: List[str], since: date = None) -> Dict[str, tuple]:
+        """查询已入库产品的销售状态和最新净值，用于增量抓取判断产品是否有变化
+        
+        最新净值经汇总视图在热表和最近的月表中查找，默认查找热表保留期及其前一个月
+        (刚轮转出热表的净值仍然可见)，期间没有净值的产品视为有变化。
+        
+        Args:
+            product_codes: 产品登记编码列表
+            since: 查找净值的最早日期，默认为热表保留期的前一个月月初
+            
+        Returns:
+            {产品登记编码: (销售状态, 初始净值, 累计净值, 当前净值)}，未入库的产品不在结果中
+        """
+        if not product_codes:
+            return {}
+        if since is None:
+            from ..config.config import get_partition_config
+            since = self.partitions.hot_cutoff(get_partition_config()['hot_months'] + 1)
+        codes = list(product_codes)
+        products = text("SELECT product_code, sale_status FROM products WHERE product_code IN :codes").bindparams(
+            bindparam('codes', expanding=True))
+        navs = text(
+            f"SELECT product_code, initial_nav, accumulated_nav, current_nav FROM {ALL_VIEW} "
+            f"WHERE product_code IN :codes AND nav_date >= :since ORDER BY nav_date"
+        ).bindparams(bindparam('codes', expanding=True))
+        with self.engine.connect() as conn:
+            statuses = dict(conn.execute(products, {'codes': codes}).all())
+            # 按日期升序，每个产品保留最后一条即最新净值
+            latest = {row[0]: tuple(row[1:]) for row in conn.execute(
+                navs, {'codes': codes, 'since': since.isoformat()})}
+        return {code: (status,) + latest.get(code, (None, None, None)) for code, status in statuses.items()}
+            
+    def begin_listing(self, source: str = None):
+        """开始记录本次抓取写入的产品，用于结束时比较产品列表的变化
+        
+        Args:
+            source: 数据源名称
+        """
+        self.listings.begin(source)
+    
+    def finish_listing(self, source: str = None, complete: bool = False) -> Optional[Dict]:
+        """结束本次抓取，与上次的产品列表快照比较，变化写入product_changes表并导出文件
+        
+        Args:
+            source: 数据源名称
+            complete: 本次抓取是否覆盖了完整的产品列表，只有完整抓取才判断下架
+            
+        Returns:
+            {'listed', 'delisted', 'changed', 'file'}，没有进行比较时返回None
+        """
+        with self.write_lock:
+            try:
+                return self.listings.finish(source, complete)
+            except Exception as e:
+                logger.error("比较产品列表失败: %s", e)
+                return None
+    
+    def get_product_changes(self, source: str = None, run_at: datetime = None, change: str = None,
+                            limit: int = 1000) -> List[ProductChange]:
+        """查询产品列表变化
+        
+        Args:
+            source: 数据源名称，为None表示全部数据源
+            run_at: 比较的时间，为None表示最近一次有变化的比较
+            change: 变化类型(listed/delisted/changed)，为None表示全部
+            limit: 最多返回的条数
+            
+        Returns:
+            变化记录列表，按变化类型和产品编码排序
+        """
+        session = self.get_session()
+        try:
+            query = session.query(ProductChange)
+            if source:
+                query = query.filter(ProductChange.source == source)
+            if run_at is None:
+                latest = session.query(func.max(ProductChange.run_at))
+                if source:
+                    latest = latest.filter(ProductChange.source == source)
+                run_at = latest.scalar()
+            query = query.filter(ProductChange.run_at == run_at)
+            if change:
+                query = query.filter(ProductChange.change == change)
+            return query.order_by(ProductChange.change, ProductChange.product_code).limit(limit).all()
+        finally:
+            session.close()
+            
+    def get_nav_anomalies(self, product_code: str = None, start_date: date = None, end_date: date = None,
+                          limit: int = 100) -> List[NavAnomaly]:
+        """查询入库校验发现的异常净值
+        
+        Args:
+            product_code: 产品登记编码，为None表示全部产品
+            start_date: 起始净值日期(含)
+            end_date: 结束净值日期(含)
+            limit: 最多返回的条数
+            
+        Returns:
+            异常记录列表，最近记录的在前
+        """
+        session = self.get_session()
+        try:
+            query = session.query(NavAnomaly)
+            if product_code:
+                query = query.filter(NavAnomaly.product_code == product_code)
+            if start_date:
+                query = query.filter(NavAnomaly.nav_date >= start_date)
+            if end_date:
+                query = query.filter(NavAnomaly.nav_date <= end_date)
+            return query.order_by(NavAnomaly.id.desc()).limit(limit).all()
+        finally:
+            session.close()
+    
+    def release_nav_anomalies(self, anomaly_ids: List[int]) -> int:
+        """放行隔离的异常净值
+        
+        人工确认无误的净值不再校验，直接写入净值表，异常记录的处理方式改为released。
+        已入库(flag)或已放行的记录跳过。
+        
+        Args:
+            anomaly_ids: 异常记录的id
+            
+        Returns:
+            放行的净值数量
+        """
+        if not anomaly_ids:
+            return 0
+        with self.write_lock:
+            session = self.get_session()
+            try:
+                anomalies = session.query(NavAnomaly).filter(
+                    NavAnomaly.id.in_(anomaly_ids), NavAnomaly.action == ACTION_QUARANTINE
+                ).order_by(NavAnomaly.id).all()
+                by_source = {}
+                for anomaly in anomalies:
+                    by_source.setdefault(anomaly.source, []).append({
+                        'product_code': anomaly.product_code,
+                        'nav_date': anomaly.nav_date.isoformat(),
+                        'initial_nav': anomaly.initial_nav,
+                        'accumulated_nav': anomaly.accumulated_nav,
+                        'current_nav': anomaly.current_nav,
+                        'crawl_time': anomaly.crawl_time,
+                    })
+                    anomaly.action = ACTION_RELEASED
+                
+                touched_dates = set()
+                save = self._save_navs_bulk if self.bulk_writer is not None else self._save_navs_orm
+                for source, navs in by_source.items():
+                    touched_dates |= save(session, navs, source)[3]
+                session.commit()
+                self.cube.mark_dates(touched_dates)
+                return len(anomalies)
+            except Exception as e:
+                session.rollback()
+                logger.error("放行异常净值失败: %s", e)
+                raise
+            finally:
+                session.close()
+    
+    def rotate_nav_partitions(self, keep_months: int = 1) -> Dict[str, int]:
+        """将已结束月份的净值移出热表
+        
+        Args:
+            keep_months: 热表保留的月数(含当月)
+            
+        Returns:
+            {分区(YYYYMM): 移动的行数}
+        """
+        return self.partitions.rotate(keep_months=keep_months)
+    
+    def archive_nav_partitions(self, after_months: int = 12) -> List[str]:
+        """将早于保留期限的净值分区归档为压缩列式文件
+        
+        Args:
+            after_months: 保留在数据库中的月数
+            
+        Returns:
+            归档文件路径列表
+        """
+        return self.partitions.archive(after_months=after_months)
+    
+    def get_nav_aggregates(self, dimension: str = 'all', dim_value: str = None,
+                           start_date: date = None, end_date: date = None) -> List[Dict]:
+        """查询预先计算的净值聚合
+        
+        Args:
+            dimension: 维度，issuer/risk_level/product_type/currency/all
+            dim_value: 维度取值，为None表示该维度的全部取值
+            start_date: 起始净值日期(含)
+            end_date: 结束净值日期(含)
+            
+        Returns:
+            聚合记录字典列表，包含产品数、净值均值、最值、分位数和分布
+        """
+        return self.cube.query(dimension, dim_value, start_date, end_date)
+    
+    def rebuild_nav_aggregates(self, start_date: date = None, end_date: date = None) -> int:
+        """按数据库中的净值重新计算净值聚合
+        
+        Args:
+            start_date: 起始净值日期(含)，为None表示不限制
+            end_date: 结束净值日期(含)，为None表示不限制
+            
+        Returns:
+            重新计算的日期数
+        """
+        return self.cube.rebuild(start_date, end_date)
+            
+    def record_run(self, run_info: Dict) -> None:
+        """写入一条运行记录
+        
+        Args:
+            run_info: 运行汇总信息，字段与RunRecord一致
+        """
+        try:
+            record_run(self.engine, run_info)
+        except Exception as e:
+            logger.error("保存运行记录失败: %s", e)
+            raise
+            
+    def get_recent_runs(self, command: str = None, limit: int = 30) -> List[RunRecord]:
+        """获取最近的运行记录
+        
+        Args:
+            command: 命令名称，为None表示全部
+            limit: 返回的最大条数
+            
+        Returns:
+            按开始时间倒序排列的运行记录列表
+        """
+        session = self.get_session()
+        try:
+            query = session.query(RunRecord)
+            if command:
+                query = query.filter_by(command=command)
+            return query.order_by(RunRecord.started_at.desc()).limit(limit).all()
+        finally:
+            session.close()
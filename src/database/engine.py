@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库引擎创建与一致性快照读取
+
+SQLite引擎在每个连接建立时应用性能配置：WAL日志模式让读取和写入互不阻塞，
+synchronous=NORMAL在WAL模式下仍能保证数据库不损坏，同时调整页缓存、内存映射和忙等待超时。
+MySQL引擎使用显式大小的连接池，取出连接前先检测(pre-ping)，并定期回收长时间存活的连接，
+避免服务端wait_timeout或中间代理断开空闲连接后出现"MySQL server has gone away"。
+导出等只读任务通过snapshot_connection()在同一个读事务中完成所有查询，
+抓取在此期间继续写入也不会影响导出结果的一致性。
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Dict, List
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, options: Dict):
+    """在新建的SQLite连接上设置PRAGMA
+
+    Args:
+        dbapi_connection: sqlite3连接对象
+        options: get_sqlite_config()返回的配置字典
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        # 先设置忙等待，后续切换日志模式时如遇锁也会等待
+        cursor.execute(f"PRAGMA busy_timeout = {int(options['busy_timeout'] * 1000)}")
+        cursor.execute(f"PRAGMA journal_mode = {options['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {options['synchronous']}")
+        # 负数表示以KiB为单位
+        cursor.execute(f"PRAGMA cache_size = -{int(options['cache_size_mb'] * 1024)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(options['mmap_size_mb'] * 1024 * 1024)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
+
+
+def _create_mysql_engine(db_url: str, options: Dict, **kwargs):
+    """按连接池配置创建MySQL引擎
+
+    Args:
+        db_url: 数据库连接URL
+        options: get_mysql_config()返回的配置字典
+        **kwargs: 传递给create_engine的其他参数，优先于配置
+    """
+    url = make_url(db_url)
+    if 'charset' not in url.query:
+        url = url.update_query_dict({'charset': options['charset']})
+    kwargs.setdefault('pool_size', options['pool_size'])
+    kwargs.setdefault('max_overflow', options['max_overflow'])
+    kwargs.setdefault('pool_timeout', options['pool_timeout'])
+    kwargs.setdefault('pool_recycle', options['pool_recycle'])
+    kwargs.setdefault('pool_pre_ping', options['pool_pre_ping'])
+    return create_engine(url, **kwargs)
+
+
+def create_db_engine(db_url: str, sqlite_options: Dict = None, mysql_options: Dict = None, **kwargs):
+    """创建数据库引擎，SQLite数据库应用性能配置，MySQL数据库应用连接池配置
+
+    Args:
+        db_url: 数据库连接URL
+        sqlite_options: SQLite配置，默认使用get_sqlite_config()
+        mysql_options: MySQL配置，默认使用get_mysql_config()
+        **kwargs: 传递给create_engine的其他参数
+
+    Returns:
+        SQLAlchemy引擎
+    """
+    if db_url.startswith('mysql'):
+        if mysql_options is None:
+            from ..config.config import get_mysql_config
+            mysql_options = get_mysql_config()
+        return _create_mysql_engine(db_url, mysql_options, **kwargs)
+
+    if not db_url.startswith('sqlite'):
+        return create_engine(db_url, **kwargs)
+
+    if sqlite_options is None:
+        from ..config.config import get_sqlite_config
+        sqlite_options = get_sqlite_config()
+
+    connect_args = dict(kwargs.pop('connect_args', {}))
+    # sqlite3模块自身的锁等待(秒)，与PRAGMA busy_timeout保持一致
+    connect_args.setdefault('timeout', sqlite_options['busy_timeout'])
+    engine = create_engine(db_url, connect_args=connect_args, **kwargs)
+
+    # 内存数据库不支持WAL
+    if ':memory:' in db_url or db_url.rstrip('/') == 'sqlite:':
+        return engine
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, sqlite_options)
+
+    return engine
+
+
+@contextmanager
+def snapshot_connection(engine):
+    """在一个只读事务中执行多条查询，所有查询看到同一份数据快照
+
+    SQLite(WAL模式)在事务的第一条查询时确定快照，写入方提交的新数据对本事务不可见；
+    MySQL使用START TRANSACTION WITH CONSISTENT SNAPSHOT。退出时回滚事务。
+
+    Args:
+        engine: SQLAlchemy引擎
+
+    Yields:
+        处于读事务中的连接
+    """
+    with engine.connect() as conn:
+        dialect = engine.dialect.name
+        if dialect == 'sqlite':
+            conn.exec_driver_sql("BEGIN")
+        elif dialect == 'mysql':
+            conn.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+def add_missing_columns(conn, table_name: str, columns) -> List[str]:
+    """为已有的表补充模型中新增的列(轻量迁移)
+
+    create_all()不会修改已存在的表，模型新增列后旧数据库需要用ALTER TABLE补齐。
+    新列必须可为空或带有server_default。
+
+    Args:
+        conn: 数据库连接
+        table_name: 表名
+        columns: 模型中的列(Column对象)
+
+    Returns:
+        新增的列名列表
+    """
+    existing = {column['name'] for column in inspect(conn).get_columns(table_name)}
+    added = []
+    for column in columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT '{column.server_default.arg}'"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        conn.exec_driver_sql(ddl)
+        added.append(column.name)
+        logger.info("表 %s 新增列 %s", table_name, column.name)
+    return added
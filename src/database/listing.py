@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+产品列表变化
+
+抓取过程中每次成功写入产品后，记录本次抓取到的产品编码及其内容指纹(成员集合)。抓取结束时
+按数据源读出上一次的快照(编码 -> 指纹)，在内存中按product_code做哈希连接：
+- 本次有、上次没有的产品为新上架
+- 两次都有但指纹不同的产品为属性变化，指纹按字段分段，可以知道哪些字段变了
+- 上次有、本次没有的产品为下架，只有本次抓取覆盖了完整的产品列表时才判断
+
+比较的耗时与产品数成正比，数据库只做一次按数据源的顺序读取，写入量与变化的产品数成正比：
+变化记录写入product_changes表并导出为CSV文件，快照只插入、更新或删除有变化的产品。
+还没有快照时，第一次完整抓取只建立基线，不输出变化。
+"""
+
+import os
+import csv
+import zlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, delete, insert, select, text, update
+
+from ..models.listing import ListingSnapshot, ProductChange
+from ..utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# 参与比较的产品字段，每个字段占指纹中的LANE_BITS位，调整字段后已有快照中的产品都会被视为属性变化
+TRACKED_FIELDS = ('sale_status', 'risk_level_code', 'sale_regions')
+LANE_BITS = 21
+LANE_MASK = (1 << LANE_BITS) - 1
+
+DEFAULT_SOURCE = 'chinawealth'
+
+CHANGE_LISTED = 'listed'
+CHANGE_DELISTED = 'delisted'
+CHANGE_CHANGED = 'changed'
+
+# 导出文件中附带的产品信息
+EXPORT_COLUMNS = ('product_name', 'issuer', 'sale_status', 'risk_level', 'sale_regions')
+
+# 按编码批量读写时每批的编码数
+_BATCH_SIZE = 500
+
+
+def fingerprint(product) -> int:
+    """产品的内容指纹，每个参与比较的字段的CRC32取低LANE_BITS位后依次拼接
+
+    Args:
+        product: 产品记录(字典或ProductRecord)
+
+    Returns:
+        非负整数，不超过63位
+    """
+    value = 0
+    for field in TRACKED_FIELDS:
+        value = (value << LANE_BITS) | (zlib.crc32(str(product.get(field) or '').encode('utf-8')) & LANE_MASK)
+    return value
+
+
+def changed_fields(old: int, new: int) -> List[str]:
+    """比较两个指纹，返回发生变化的字段"""
+    diff = old ^ new
+    last = len(TRACKED_FIELDS) - 1
+    return [field for index, field in enumerate(TRACKED_FIELDS)
+            if (diff >> (LANE_BITS * (last - index))) & LANE_MASK]
+
+
+class ListingTracker:
+    """记录每次抓取的产品成员集合，并与上一次的快照比较"""
+
+    def __init__(self, engine, export_dir: str = None, enabled: bool = True):
+        """
+        初始化产品列表变化跟踪
+
+        Args:
+            engine: SQLAlchemy引擎
+            export_dir: 变化文件的输出目录，为None时不导出文件
+            enabled: 是否跟踪
+        """
+        self.engine = engine
+        self.export_dir = export_dir
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # 数据源 -> {产品编码: 指纹}，为None表示本次有产品写入失败，成员集合不完整
+        self._members: Dict[str, Optional[Dict[str, int]]] = {}
+
+    @classmethod
+    def from_config(cls, engine, config: Dict = None) -> 'ListingTracker':
+        """根据配置创建
+
+        Args:
+            engine: SQLAlchemy引擎
+            config: get_listing_config()返回的配置字典，默认读取环境变量
+        """
+        if config is None:
+            from ..config.config import get_listing_config
+            config = get_listing_config()
+        return cls(engine, export_dir=config['export_dir'], enabled=config['enabled'])
+
+    # ---- 抓取过程 ----
+
+    def begin(self, source: str = None):
+        """开始记录一次抓取的成员集合，覆盖该数据源上次未结束的记录"""
+        if self.enabled:
+            with self._lock:
+                self._members[source or DEFAULT_SOURCE] = {}
+
+    def observe(self, products: Iterable, source: str = None):
+        """记录成功写入的产品，未开始记录的数据源忽略"""
+        key = source or DEFAULT_SOURCE
+        with self._lock:
+            members = self._members.get(key)
+            if members is None:
+                return
+            for product in products:
+                product_code = product.get('product_code')
+                if product_code:
+                    members[product_code] = fingerprint(product)
+
+    def invalidate(self, source: str = None):
+        """有产品写入失败，本次成员集合不完整，结束时不做比较"""
+        key = source or DEFAULT_SOURCE
+        with self._lock:
+            if key in self._members:
+                self._members[key] = None
+
+    def finish(self, source: str = None, complete: bool = False) -> Optional[Dict]:
+        """结束本次抓取，与上次的快照比较并保存变化
+
+        Args:
+            source: 数据源名称
+            complete: 本次抓取是否覆盖了完整的产品列表，只有完整抓取才判断下架
+
+        Returns:
+            {'listed', 'delisted', 'changed', 'file'}，没有进行比较时返回None
+        """
+        key = source or DEFAULT_SOURCE
+        with self._lock:
+            if key not in self._members:
+                return None
+            members = self._members.pop(key)
+        if not members:
+            logger.warning("数据源 %s 本次%s，不比较产品列表", key, '有产品写入失败' if members is None else '没有写入产品')
+            return None
+
+        run_at = datetime.now().replace(microsecond=0)
+        with self.engine.begin() as conn:
+            previous = dict(conn.execute(
+                select(ListingSnapshot.product_code, ListingSnapshot.fingerprint)
+                .where(ListingSnapshot.source == key)
+            ).all())
+            if not previous:
+                if not complete:
+                    logger.info("数据源 %s 还没有产品列表基线，本次抓取不完整，不比较", key)
+                    return None
+                self._insert_snapshot(conn, key, members, list(members), run_at)
+                logger.info("数据源 %s 建立产品列表基线，共 %s 个产品", key, len(members))
+                return None
+
+            # 以产品编码做哈希连接
+            listed, changed, changes = [], [], []
+            for product_code, value in members.items():
+                old = previous.get(product_code)
+                if old is None:
+                    listed.append(product_code)
+                    changes.append((product_code, CHANGE_LISTED, None))
+                elif old != value:
+                    changed.append(product_code)
+                    changes.append((product_code, CHANGE_CHANGED, ','.join(changed_fields(old, value))))
+            delisted = [product_code for product_code in previous if product_code not in members] if complete else []
+            changes.extend((product_code, CHANGE_DELISTED, None) for product_code in delisted)
+
+            if changes:
+                conn.execute(insert(ProductChange), [
+                    {'source': key, 'run_at': run_at, 'product_code': product_code, 'change': change,
+                     'fields': fields}
+                    for product_code, change, fields in changes
+                ])
+            self._insert_snapshot(conn, key, members, listed, run_at)
+            if changed:
+                table = ListingSnapshot.__table__
+                conn.execute(
+                    update(table)
+                    .where(table.c.source == bindparam('b_source'), table.c.product_code == bindparam('b_code'))
+                    .values(fingerprint=bindparam('b_fingerprint'), seen_at=bindparam('b_seen_at')),
+                    [{'b_source': key, 'b_code': product_code, 'b_fingerprint': members[product_code],
+                      'b_seen_at': run_at} for product_code in changed]
+                )
+            for start in range(0, len(delisted), _BATCH_SIZE):
+                conn.execute(delete(ListingSnapshot).where(
+                    ListingSnapshot.source == key,
+                    ListingSnapshot.product_code.in_(delisted[start:start + _BATCH_SIZE])))
+
+        metrics = get_metrics()
+        for change, count in ((CHANGE_LISTED, len(listed)), (CHANGE_DELISTED, len(delisted)),
+                              (CHANGE_CHANGED, len(changed))):
+            metrics.inc('listing_changes_total', count, source=key, change=change)
+        logger.info("数据源 %s 产品列表变化: 新上架 %s 个，下架 %s 个，属性变化 %s 个%s", key, len(listed),
+                    len(delisted), len(changed), "" if complete else "(本次抓取不完整，未判断下架)")
+        export_file = self._export(key, run_at, changes) if changes else None
+        return {'listed': len(listed), 'delisted': len(delisted), 'changed': len(changed), 'file': export_file}
+
+    def _insert_snapshot(self, conn, source: str, members: Dict[str, int], codes: List[str], seen_at: datetime):
+        if codes:
+            conn.execute(insert(ListingSnapshot), [
+                {'source': source, 'product_code': product_code, 'fingerprint': members[product_code],
+                 'seen_at': seen_at} for product_code in codes
+            ])
+
+    # ---- 导出 ----
+
+    def _export(self, source: str, run_at: datetime, changes: List[tuple]) -> Optional[str]:
+        """将变化写入CSV文件，附带产品当前的名称、发行机构和参与比较的字段
+
+        Returns:
+            文件路径，未配置输出目录或写入失败时返回None
+        """
+        if not self.export_dir:
+            return None
+        path = os.path.join(self.export_dir, f"product_changes_{source}_{run_at:%Y%m%d_%H%M%S}.csv")
+        try:
+            codes = [product_code for product_code, _, _ in changes]
+            details = {}
+            query = text(
+                f"SELECT product_code, {', '.join(EXPORT_COLUMNS)} FROM products WHERE product_code IN :codes"
+            ).bindparams(bindparam('codes', expanding=True))
+            with self.engine.connect() as conn:
+                for start in range(0, len(codes), _BATCH_SIZE):
+                    for row in conn.execute(query, {'codes': codes[start:start + _BATCH_SIZE]}):
+                        details[row[0]] = row[1:]
+            os.makedirs(self.export_dir, exist_ok=True)
+            empty = (None,) * len(EXPORT_COLUMNS)
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('product_code', 'change', 'fields') + EXPORT_COLUMNS)
+                for product_code, change, fields in changes:
+                    writer.writerow((product_code, change, fields) + tuple(details.get(product_code, empty)))
+        except Exception as e:
+            logger.warning("导出产品列表变化失败: %s", e)
+            return None
+        logger.info("产品列表变化已导出到 %s", path)
+        return path
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+净值历史按月分区与冷数据归档
+
+SQLite: product_navs只保留最近的热数据，已结束的月份移入product_navs_YYYYMM月表；
+MySQL: product_navs按nav_date做RANGE COLUMNS原生分区，每月一个分区。
+两种数据库都提供product_navs_all视图汇总数据库中的全部净值历史。
+
+超过保留期限的月分区导出为压缩的列式文件(numpy .npz，每列一个数组)后从数据库删除，
+归档文件仍可以通过DatabaseManager.get_nav_history()查询。
+"""
+
+import os
+import re
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, Date, DateTime, Float, Index, Integer, MetaData, Table, inspect, text
+
+from ..models.product import ProductNav
+from .engine import add_missing_columns
+
+logger = logging.getLogger(__name__)
+
+HOT_TABLE = 'product_navs'
+ALL_VIEW = 'product_navs_all'
+
+# MySQL热表的(product_code, nav_date)唯一键，批量写入的ON DUPLICATE KEY UPDATE依赖该唯一键
+MYSQL_UNIQUE_KEY = 'ux_product_navs_code_date'
+
+# 净值表的全部列，月表、视图和归档文件保持相同的列顺序
+NAV_COLUMNS = [column.name for column in ProductNav.__table__.columns]
+
+_PARTITION_RE = re.compile(r'^product_navs_(\d{6})$')
+_ARCHIVE_RE = re.compile(r'^product_navs_(\d{6})\.npz$')
+
+
+def add_months(day: date, months: int) -> date:
+    """返回day所在月份加months个月后的月初日期"""
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+
+def _month_of(label: str) -> date:
+    """将YYYYMM转换为月初日期"""
+    return date(int(label[:4]), int(label[4:]), 1)
+
+
+class NavPartitionManager:
+    """净值分区管理"""
+
+    def __init__(self, engine, archive_dir: str = None):
+        """
+        初始化分区管理
+
+        Args:
+            engine: SQLAlchemy引擎
+            archive_dir: 归档文件目录，默认为'data/archive/navs'
+        """
+        self.engine = engine
+        self.archive_dir = archive_dir or os.path.join(os.getcwd(), 'data', 'archive', 'navs')
+        self.dialect = engine.dialect.name
+
+    def ensure(self):
+        """创建热表和月表的索引以及汇总视图(如不存在)
+
+        MySQL上该索引为唯一键。热表和SQLite月表缺少模型新增的列时先补齐，并重建视图。
+        """
+        with self.engine.begin() as conn:
+            if self.dialect == 'mysql':
+                self._ensure_mysql_unique_key(conn)
+            else:
+                for index in ProductNav.__table__.indexes:
+                    index.create(conn, checkfirst=True)
+            tables = [HOT_TABLE]
+            if self.dialect == 'sqlite':
+                labels = self._partitions(conn)
+                tables += [f'{HOT_TABLE}_{label}' for label in labels]
+                for label in labels:
+                    for index in self._partition_table(label).indexes:
+                        index.create(conn, checkfirst=True)
+            added = [name for table in tables
+                     for name in add_missing_columns(conn, table, ProductNav.__table__.columns)]
+            if self.dialect == 'sqlite' and not added:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = :name"), {'name': ALL_VIEW}
+                ).first()
+                if exists:
+                    return
+            self._refresh_view(conn)
+
+    def _ensure_mysql_unique_key(self, conn):
+        """MySQL: 以(product_code, nav_date)唯一键代替模型中的普通索引
+
+        唯一键包含分区列nav_date，分区表同样适用。建立前删除重复的净值，只保留最后写入的一条。
+        """
+        indexes = {index['name'] for index in inspect(conn).get_indexes(HOT_TABLE)}
+        if MYSQL_UNIQUE_KEY not in indexes:
+            removed = conn.execute(text(
+                f"DELETE older FROM {HOT_TABLE} older JOIN {HOT_TABLE} newer "
+                f"ON older.product_code = newer.product_code AND older.nav_date = newer.nav_date "
+                f"AND older.id < newer.id"
+            )).rowcount
+            if removed:
+                logger.warning("建立净值唯一键前删除了 %s 条重复净值", removed)
+            conn.exec_driver_sql(
+                f"ALTER TABLE {HOT_TABLE} ADD UNIQUE KEY {MYSQL_UNIQUE_KEY} (product_code, nav_date)")
+            logger.info("%s已建立(product_code, nav_date)唯一键", HOT_TABLE)
+        for index in ProductNav.__table__.indexes:
+            if index.name in indexes and list(index.columns.keys()) == ['product_code', 'nav_date']:
+                conn.exec_driver_sql(f"ALTER TABLE {HOT_TABLE} DROP INDEX {index.name}")
+            elif index.name not in indexes and list(index.columns.keys()) != ['product_code', 'nav_date']:
+                index.create(conn)
+
+    # ---- 分区列表 ----
+
+    def list_partitions(self) -> List[str]:
+        """数据库中已结束月份的分区(YYYYMM)，按时间升序"""
+        with self.engine.connect() as conn:
+            return self._partitions(conn)
+
+    def _partitions(self, conn) -> List[str]:
+        if self.dialect == 'mysql':
+            names = conn.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+            ), {'table': HOT_TABLE}).scalars()
+            return sorted(name[1:] for name in names if re.match(r'^p\d{6}$', name))
+        return sorted(match.group(1) for match in map(_PARTITION_RE.match, inspect(conn).get_table_names()) if match)
+
+    def _partition_table(self, label: str) -> Table:
+        """SQLite月表定义，列与product_navs相同，(product_code, nav_date)唯一，另有(nav_date, product_code)索引"""
+        name = f'{HOT_TABLE}_{label}'
+        columns = [Column(column.name, column.type, primary_key=column.primary_key)
+                   for column in ProductNav.__table__.columns]
+        return Table(name, MetaData(), *columns,
+                     Index(f'ux_{name}_code_date', 'product_code', 'nav_date', unique=True),
+                     Index(f'ix_{name}_date_code', 'nav_date', 'product_code'))
+
+    def hot_cutoff(self, keep_months: int = 1, today: date = None) -> date:
+        """热表保留的最早月份的月初日期，更早的净值属于月表
+
+        Args:
+            keep_months: 热表保留的月数(含当月)
+            today: 当前日期，默认为今天
+        """
+        return add_months(today or date.today(), -(max(1, keep_months) - 1))
+
+    def month_table(self, label: str) -> Table:
+        """SQLite: 返回月份的月表，不存在时创建并加入汇总视图
+
+        Args:
+            label: 月份(YYYYMM)
+        """
+        table = self._partition_table(label)
+        with self.engine.begin() as conn:
+            if not inspect(conn).has_table(table.name):
+                table.create(conn)
+                self._refresh_view(conn)
+                logger.info("新建净值月表 %s", table.name)
+        return table
+
+    def _refresh_view(self, conn):
+        """重建product_navs_all视图"""
+        columns = ', '.join(NAV_COLUMNS)
+        if self.dialect == 'mysql':
+            conn.exec_driver_sql(f"CREATE OR REPLACE VIEW {ALL_VIEW} AS SELECT {columns} FROM {HOT_TABLE}")
+            return
+        selects = [f"SELECT {columns} FROM {HOT_TABLE}"]
+        selects += [f"SELECT {columns} FROM {HOT_TABLE}_{label}" for label in self._partitions(conn)]
+        conn.exec_driver_sql(f"DROP VIEW IF EXISTS {ALL_VIEW}")
+        conn.exec_driver_sql(f"CREATE VIEW {ALL_VIEW} AS " + " UNION ALL ".join(selects))
+
+    # ---- 分区轮转 ----
+
+    def rotate(self, keep_months: int = 1, today: date = None) -> Dict[str, int]:
+        """将已结束的月份移出热数据
+
+        Args:
+            keep_months: 热表保留的月数(含当月)
+            today: 当前日期，默认为今天
+
+        Returns:
+            {分区(YYYYMM): 移动的行数}，MySQL返回新建的分区
+        """
+        today = today or date.today()
+        cutoff = self.hot_cutoff(keep_months, today)
+        if self.dialect == 'mysql':
+            return self._rotate_mysql(today)
+
+        moved = {}
+        # 月表的id由月表自行分配：热表没有AUTOINCREMENT，行删除后id会被重新使用，
+        # 复制热表的id会与月表中已有的行冲突。同一产品同一天的净值以热表为准更新月表
+        copied = [name for name in NAV_COLUMNS if name != 'id']
+        columns = ', '.join(copied)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in copied
+                            if name not in ('product_code', 'nav_date', 'created_at'))
+        with self.engine.begin() as conn:
+            months = conn.execute(text(
+                f"SELECT DISTINCT substr(nav_date, 1, 7) FROM {HOT_TABLE} WHERE nav_date < :cutoff"
+            ), {'cutoff': cutoff.isoformat()}).scalars().all()
+            for month in months:
+                start = date(int(month[:4]), int(month[5:7]), 1)
+                label = start.strftime('%Y%m')
+                table = self._partition_table(label)
+                table.create(conn, checkfirst=True)
+                params = {'start': start.isoformat(), 'end': add_months(start, 1).isoformat()}
+                conn.execute(text(
+                    f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {HOT_TABLE} "
+                    f"WHERE nav_date >= :start AND nav_date < :end "
+                    f"ON CONFLICT (product_code, nav_date) DO UPDATE SET {updates}"
+                ), params)
+                result = conn.execute(text(
+                    f"DELETE FROM {HOT_TABLE} WHERE nav_date >= :start AND nav_date < :end"), params)
+                moved[label] = result.rowcount
+            if moved:
+                self._refresh_view(conn)
+
+        for label, count in moved.items():
+            logger.info("净值分区 %s: 从热表移出 %s 行", label, count)
+        return moved
+
+    def _rotate_mysql(self, today: date) -> Dict[str, int]:
+        """MySQL: 首次运行时转换为按月分区表，之后预建当月和下月分区"""
+        created = {}
+        with self.engine.begin() as conn:
+            existing = self._partitions(conn)
+            if not existing:
+                self._partition_mysql_table(conn, today)
+                return {label: 0 for label in self._partitions(conn)}
+
+            for month in (add_months(today, 0), add_months(today, 1)):
+                label = month.strftime('%Y%m')
+                if label in existing or label < existing[-1]:
+                    continue
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {HOT_TABLE} REORGANIZE PARTITION pmax INTO ("
+                    f"PARTITION p{label} VALUES LESS THAN ('{add_months(month, 1).isoformat()}'), "
+                    f"PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                )
+                existing.append(label)
+                created[label] = 0
+                logger.info("新建净值分区 p%s", label)
+        return created
+
+    def _partition_mysql_table(self, conn, today: date):
+        """将product_navs转换为按nav_date分区的表
+
+        MySQL分区表不支持外键，且所有唯一键(含主键)必须包含分区列，
+        因此先删除外键并将主键改为(id, nav_date)。
+        """
+        inspector = inspect(conn)
+        for foreign_key in inspector.get_foreign_keys(HOT_TABLE):
+            conn.exec_driver_sql(f"ALTER TABLE {HOT_TABLE} DROP FOREIGN KEY `{foreign_key['name']}`")
+        primary_key = inspector.get_pk_constraint(HOT_TABLE)['constrained_columns']
+        if 'nav_date' not in primary_key:
+            conn.exec_driver_sql(f"ALTER TABLE {HOT_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, nav_date)")
+
+        first = conn.execute(text(f"SELECT MIN(nav_date) FROM {HOT_TABLE}")).scalar() or today
+        month, last = add_months(first, 0), add_months(today, 1)
+        definitions = []
+        while month <= last:
+            definitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{add_months(month, 1).isoformat()}')")
+            month = add_months(month, 1)
+        definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+        conn.exec_driver_sql(
+            f"ALTER TABLE {HOT_TABLE} PARTITION BY RANGE COLUMNS(nav_date) ({', '.join(definitions)})")
+        logger.info("product_navs已转换为按月分区表，共 %s 个月分区", len(definitions) - 1)
+
+    # ---- 冷数据归档 ----
+
+    def archive(self, after_months: int = 12, today: date = None) -> List[str]:
+        """将早于保留期限的月分区导出为压缩列式文件并从数据库删除
+
+        Args:
+            after_months: 保留在数据库中的月数，更早的分区被归档
+            today: 当前日期，默认为今天
+
+        Returns:
+            写入的归档文件路径列表
+        """
+        today = today or date.today()
+        cutoff = add_months(today, -after_months).strftime('%Y%m')
+        paths = []
+        columns = ', '.join(NAV_COLUMNS)
+        with self.engine.begin() as conn:
+            labels = [label for label in self._partitions(conn) if label < cutoff]
+            for label in labels:
+                start = _month_of(label)
+                if self.dialect == 'mysql':
+                    rows = conn.execute(text(
+                        f"SELECT {columns} FROM {HOT_TABLE} WHERE nav_date >= :start AND nav_date < :end"
+                    ), {'start': start, 'end': add_months(start, 1)}).all()
+                else:
+                    rows = conn.execute(text(f"SELECT {columns} FROM {HOT_TABLE}_{label}")).all()
+
+                path = self._write_archive(label, rows)
+                if self.dialect == 'mysql':
+                    conn.exec_driver_sql(f"ALTER TABLE {HOT_TABLE} DROP PARTITION p{label}")
+                else:
+                    conn.exec_driver_sql(f"DROP TABLE {HOT_TABLE}_{label}")
+                paths.append(path)
+                logger.info("净值分区 %s 已归档 %s 行: %s", label, len(rows), path)
+            if labels and self.dialect != 'mysql':
+                self._refresh_view(conn)
+        return paths
+
+    def _archive_path(self, label: str) -> str:
+        return os.path.join(self.archive_dir, f'{HOT_TABLE}_{label}.npz')
+
+    def archived_months(self) -> List[str]:
+        """已归档的月份(YYYYMM)，按时间升序"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(match.group(1) for match in map(_ARCHIVE_RE.match, os.listdir(self.archive_dir)) if match)
+
+    def _write_archive(self, label: str, rows) -> str:
+        """将一个月的净值行写为压缩列式文件，已存在的归档按(product_code, nav_date)合并"""
+        import numpy as np
+
+        records = {}
+        path = self._archive_path(label)
+        if os.path.exists(path):
+            for record in self._load_archive(path):
+                records[(record['product_code'], record['nav_date'])] = record
+        for row in rows:
+            record = dict(zip(NAV_COLUMNS, row))
+            record['nav_date'] = _to_date(record['nav_date'])
+            records[(record['product_code'], record['nav_date'])] = record
+        ordered = [records[key] for key in sorted(records)]
+
+        arrays = {}
+        for column in ProductNav.__table__.columns:
+            values = [record.get(column.name) for record in ordered]
+            if isinstance(column.type, Integer):
+                arrays[column.name] = np.array([value or 0 for value in values], dtype=np.int64)
+            elif isinstance(column.type, Float):
+                arrays[column.name] = np.array([np.nan if value is None else value for value in values],
+                                               dtype=np.float64)
+            elif isinstance(column.type, DateTime):
+                arrays[column.name] = np.array([_to_iso(value, 19) for value in values], dtype='datetime64[s]')
+            elif isinstance(column.type, Date):
+                arrays[column.name] = np.array([_to_iso(value, 10) for value in values], dtype='datetime64[D]')
+            else:
+                arrays[column.name] = np.array(['' if value is None else str(value) for value in values], dtype=str)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    def _load_archive(self, path: str, product_code: str = None,
+                      start_date: date = None, end_date: date = None) -> List[Dict]:
+        """读取归档文件中符合条件的净值记录"""
+        import numpy as np
+
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        mask = np.ones(len(arrays['nav_date']), dtype=bool)
+        if product_code is not None:
+            mask &= arrays['product_code'] == product_code
+        if start_date is not None:
+            mask &= arrays['nav_date'] >= np.datetime64(start_date, 'D')
+        if end_date is not None:
+            mask &= arrays['nav_date'] <= np.datetime64(end_date, 'D')
+
+        columns = {}
+        for name, values in arrays.items():
+            values = values[mask]
+            if values.dtype.kind == 'M':
+                columns[name] = [None if np.isnat(value) else value.item() for value in values]
+            elif values.dtype.kind == 'f':
+                columns[name] = [None if np.isnan(value) else float(value) for value in values]
+            elif values.dtype.kind == 'U':
+                columns[name] = [str(value) or None for value in values]
+            else:
+                columns[name] = values.tolist()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def read_archives(self, product_code: str = None, start_date: date = None,
+                      end_date: date = None) -> List[Dict]:
+        """查询归档文件中的净值记录
+
+        只读取与日期范围重叠的月份文件。
+
+        Args:
+            product_code: 产品登记编码，为None表示全部产品
+            start_date: 起始净值日期(含)
+            end_date: 结束净值日期(含)
+
+        Returns:
+            净值记录字典列表
+        """
+        records = []
+        for label in self.archived_months():
+            month = _month_of(label)
+            if start_date is not None and add_months(month, 1) <= start_date:
+                continue
+            if end_date is not None and month > end_date:
+                continue
+            records.extend(self._load_archive(self._archive_path(label), product_code, start_date, end_date))
+        return records
+
+
+def _to_date(value) -> Optional[date]:
+    """将数据库返回的日期(date或字符串)统一为date"""
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _to_iso(value, length: int) -> str:
+    """将日期时间转换为numpy可解析的ISO字符串，空值返回NaT"""
+    if value is None or value == '':
+        return 'NaT'
+    return str(value).replace(' ', 'T')[:length]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+产品全文检索
+
+SQLite: 使用FTS5虚拟表products_fts。中文没有空格分词，入库时将连续的中日韩字符
+切分为相邻两字(bigram)，每段末尾再补一个单字，英文和数字按单词保留，
+查询时同样切分并按短语匹配，产品名称、发行机构中的任意片段都能命中。
+MySQL: 在products表上建立WITH PARSER ngram的FULLTEXT索引，由数据库自行维护。
+两者都不可用时退化为LIKE查询。
+"""
+
+import re
+import logging
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'products_fts'
+MYSQL_INDEX = 'ft_products_search'
+
+# 参与检索的列及其排序权重
+SEARCH_COLUMNS = ('product_name', 'issuer', 'sale_regions')
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+_CJK_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+_WORD_RE = re.compile(r'[0-9A-Za-z]+')
+_TOKEN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[0-9A-Za-z]+')
+
+
+def bigram_text(value: str) -> str:
+    """将文本切分为用空格分隔的检索词
+
+    连续的中日韩字符切分为相邻两字，每段末尾补一个单字，使单字查询也能按前缀命中；
+    英文和数字按单词保留(小写)。
+
+    Args:
+        value: 原始文本
+
+    Returns:
+        空格分隔的检索词
+    """
+    if not value:
+        return ''
+    tokens = []
+    for segment in _TOKEN_RE.findall(value):
+        if _CJK_RE.match(segment):
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+            tokens.append(segment[-1])
+        else:
+            tokens.append(segment.lower())
+    return ' '.join(tokens)
+
+
+def fts_query(query: str) -> str:
+    """将用户输入转换为FTS5查询表达式
+
+    以空白分隔的每个检索词转换为一个短语，短语中的检索词与入库时的切分方式一致，
+    因此检索词须在原文中连续出现；结尾的单个汉字或英文数字按前缀匹配。各检索词之间为AND关系。
+
+    Args:
+        query: 用户输入的检索文本
+
+    Returns:
+        FTS5查询表达式，没有可检索的内容时返回空字符串
+    """
+    phrases = []
+    for term in (query or '').split():
+        segments = _TOKEN_RE.findall(term)
+        tokens = []
+        prefix = False
+        for position, segment in enumerate(segments):
+            last = position == len(segments) - 1
+            if _CJK_RE.match(segment) and len(segment) > 1:
+                tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+                # 后面还有其他片段时，原文中该段也在此结束，入库时补了单字
+                if not last:
+                    tokens.append(segment[-1])
+            else:
+                tokens.append(segment.lower())
+                prefix = last
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"' + ('*' if prefix else ''))
+    return ' '.join(phrases)
+
+
+def mysql_query(query: str) -> str:
+    """将用户输入转换为MySQL布尔模式的全文检索表达式，各段均为必须匹配的短语"""
+    return ' '.join(f'+"{segment}"' for segment in _TOKEN_RE.findall(query or ''))
+
+
+class ProductSearchIndex:
+    """产品全文检索索引"""
+
+    def __init__(self, engine):
+        """
+        初始化检索索引
+
+        Args:
+            engine: SQLAlchemy引擎
+        """
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.mode = 'like'
+
+    def ensure(self):
+        """创建检索索引(如不存在)，SQLite首次创建时为已有产品建立索引"""
+        if self.dialect == 'sqlite':
+            with self.engine.begin() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': FTS_TABLE}).first()
+                if exists:
+                    self.mode = 'fts5'
+                    return
+                try:
+                    conn.exec_driver_sql(
+                        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                        f"product_code UNINDEXED, {', '.join(SEARCH_COLUMNS)}, tokenize='unicode61')"
+                    )
+                except Exception as e:
+                    logger.warning("SQLite不支持FTS5，产品检索使用LIKE查询: %s", e)
+                    return
+                self.mode = 'fts5'
+                rows = conn.execute(text(
+                    f"SELECT id, product_code, {', '.join(SEARCH_COLUMNS)} FROM products")).all()
+                self.update(conn, rows)
+                if rows:
+                    logger.info("已为 %s 个产品建立全文检索索引", len(rows))
+        elif self.dialect == 'mysql':
+            with self.engine.begin() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                    "AND TABLE_NAME = 'products' AND INDEX_NAME = :name LIMIT 1"), {'name': MYSQL_INDEX}).first()
+                if not exists:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE products ADD FULLTEXT INDEX {MYSQL_INDEX} "
+                        f"({', '.join(SEARCH_COLUMNS)}) WITH PARSER ngram"
+                    )
+            self.mode = 'mysql'
+
+    def update(self, conn, rows: Iterable[Tuple]):
+        """更新产品的检索索引，在写入产品的同一事务中调用
+
+        索引行号与products.id一致，按行号删除旧条目，不需要扫描整个索引。
+
+        Args:
+            conn: 数据库连接或会话
+            rows: (id, product_code, product_name, issuer, sale_regions)序列
+        """
+        if self.mode != 'fts5':
+            return
+        rows = list(rows)
+        if not rows:
+            return
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{'id': row[0]} for row in rows])
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, product_code, {', '.join(SEARCH_COLUMNS)}) "
+                 f"VALUES (:id, :code, :name, :issuer, :regions)"),
+            [{'id': row[0], 'code': row[1], 'name': bigram_text(row[2]), 'issuer': bigram_text(row[3]),
+              'regions': bigram_text(row[4])} for row in rows]
+        )
+
+    def rebuild(self):
+        """按products表重建全部检索索引"""
+        if self.mode != 'fts5':
+            return
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+            self.update(conn, conn.execute(text(
+                f"SELECT id, product_code, {', '.join(SEARCH_COLUMNS)} FROM products")).all())
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Tuple[str, float]]]:
+        """检索产品
+
+        Args:
+            query: 检索文本，可以是产品名称、发行机构或销售区域的片段
+            limit: 每页条数
+            offset: 跳过的条数
+
+        Returns:
+            (匹配总数, [(产品登记编码, 相关度得分)])，得分越大越相关
+        """
+        with self.engine.connect() as conn:
+            if self.mode == 'fts5':
+                expression = fts_query(query)
+                if not expression:
+                    return 0, []
+                total = conn.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"),
+                                     {'q': expression}).scalar()
+                weights = ', '.join(str(weight) for weight in (0.0,) + COLUMN_WEIGHTS)
+                rows = conn.execute(text(
+                    f"SELECT product_code, -bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH :q ORDER BY score DESC, product_code LIMIT :limit OFFSET :offset"
+                ), {'q': expression, 'limit': limit, 'offset': offset}).all()
+            elif self.mode == 'mysql':
+                expression = mysql_query(query)
+                if not expression:
+                    return 0, []
+                match = f"MATCH ({', '.join(SEARCH_COLUMNS)}) AGAINST (:q IN BOOLEAN MODE)"
+                total = conn.execute(text(f"SELECT COUNT(*) FROM products WHERE {match}"),
+                                     {'q': expression}).scalar()
+                rows = conn.execute(text(
+                    f"SELECT product_code, {match} AS score FROM products WHERE {match} "
+                    f"ORDER BY score DESC, product_code LIMIT :limit OFFSET :offset"
+                ), {'q': expression, 'limit': limit, 'offset': offset}).all()
+            else:
+                return self._search_like(conn, query, limit, offset)
+        return total, [(code, float(score)) for code, score in rows]
+
+    def _search_like(self, conn, query: str, limit: int, offset: int) -> Tuple[int, List[Tuple[str, float]]]:
+        """没有全文索引时的LIKE查询，名称命中的产品排在前面"""
+        query = (query or '').strip()
+        if not query:
+            return 0, []
+        params = {'q': f'%{query}%', 'limit': limit, 'offset': offset}
+        condition = ' OR '.join(f"{column} LIKE :q" for column in SEARCH_COLUMNS)
+        score = ' + '.join(f"(CASE WHEN {column} LIKE :q THEN {weight} ELSE 0 END)"
+                           for column, weight in zip(SEARCH_COLUMNS, COLUMN_WEIGHTS))
+        total = conn.execute(text(f"SELECT COUNT(*) FROM products WHERE {condition}"), params).scalar()
+        rows = conn.execute(text(
+            f"SELECT product_code, {score} AS score FROM products WHERE {condition} "
+            f"ORDER BY score DESC, product_code LIMIT :limit OFFSET :offset"
+        ), params).all()
+        return total, [(code, float(value)) for code, value in rows]
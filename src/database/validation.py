@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+净值入库校验
+
+每批净值入库前，用一次批量查询取出这些产品在回看期内的已有净值，按产品和日期
+对齐到每条新净值之前最近的一条(pandas.merge_asof)，再用向量化规则检查：
+
+- out_of_range: 净值不大于0或超过上限
+- jump: 当前净值或累计净值相对上一条的涨跌幅超过阈值
+- accumulated_below_current: 累计净值低于当前净值
+- swapped_fields: 当前净值与累计净值互换后才与上一条吻合
+- initial_changed: 初始净值与上一条不同
+
+命中规则的净值写入nav_anomalies表并注明原因；隔离模式(quarantine)下不写入净值表，
+标记模式(flag)下照常入库。人工确认无误的隔离净值可以放行(released)写入净值表。
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+
+from ..utils.metrics import get_metrics
+from .partitions import ALL_VIEW
+
+logger = logging.getLogger(__name__)
+
+# 规则名称
+REASON_OUT_OF_RANGE = 'out_of_range'
+REASON_JUMP = 'jump'
+REASON_ACCUMULATED_BELOW_CURRENT = 'accumulated_below_current'
+REASON_SWAPPED_FIELDS = 'swapped_fields'
+REASON_INITIAL_CHANGED = 'initial_changed'
+
+# 异常净值的处理方式
+ACTION_QUARANTINE = 'quarantine'
+ACTION_FLAG = 'flag'
+ACTION_RELEASED = 'released'  # 隔离后经人工确认放行入库
+
+_VALUE_COLUMNS = ['initial_nav', 'accumulated_nav', 'current_nav']
+
+# 批量查询时IN列表每次的编码数，避免超出SQLite的参数个数限制
+_LOOKUP_CHUNK = 500
+
+
+class NavValidator:
+    """按上一条净值批量校验新净值"""
+
+    def __init__(self, engine, enabled: bool = True, action: str = ACTION_QUARANTINE,
+                 max_change: float = 0.2, max_nav: float = 50.0, lookback_days: int = 31,
+                 tolerance: float = 1e-4):
+        """
+        初始化校验器
+
+        Args:
+            engine: SQLAlchemy引擎
+            enabled: 是否启用校验
+            action: 异常净值的处理方式，quarantine不入库，flag仍入库
+            max_change: 相对上一条净值允许的最大涨跌幅
+            max_nav: 净值上限
+            lookback_days: 查找上一条净值的天数，更早的净值不参与对比
+            tolerance: 比较净值时的容差
+        """
+        if action not in (ACTION_QUARANTINE, ACTION_FLAG):
+            raise ValueError(f"未知的异常净值处理方式: {action}")
+        self.engine = engine
+        self.enabled = enabled
+        self.action = action
+        self.max_change = max_change
+        self.max_nav = max_nav
+        self.lookback_days = lookback_days
+        self.tolerance = tolerance
+
+    @classmethod
+    def from_config(cls, engine, config: Dict = None) -> 'NavValidator':
+        """根据配置创建校验器
+
+        Args:
+            engine: SQLAlchemy引擎
+            config: get_nav_validation_config()返回的配置字典，默认读取环境变量
+        """
+        if config is None:
+            from ..config.config import get_nav_validation_config
+            config = get_nav_validation_config()
+        return cls(engine, enabled=config['enabled'], action=config['action'],
+                   max_change=config['max_change'], max_nav=config['max_nav'],
+                   lookback_days=config['lookback_days'])
+
+    def load_previous(self, conn, product_codes: Sequence[str], start_date, end_date):
+        """批量取出产品在日期范围内的已有净值
+
+        Args:
+            conn: 数据库连接或会话
+            product_codes: 产品登记编码
+            start_date: 起始日期(含)
+            end_date: 结束日期(不含)
+
+        Returns:
+            DataFrame，列为product_code、nav_date及三种净值
+        """
+        import pandas as pd
+
+        query = text(
+            f"SELECT product_code, nav_date, {', '.join(_VALUE_COLUMNS)} FROM {ALL_VIEW} "
+            f"WHERE product_code IN :codes AND nav_date >= :start_date AND nav_date < :end_date"
+        ).bindparams(bindparam('codes', expanding=True))
+        rows = []
+        codes = list(product_codes)
+        for offset in range(0, len(codes), _LOOKUP_CHUNK):
+            rows.extend(conn.execute(query, {
+                'codes': codes[offset:offset + _LOOKUP_CHUNK],
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+            }).all())
+        frame = pd.DataFrame.from_records(rows, columns=['product_code', 'nav_date'] + _VALUE_COLUMNS)
+        frame['nav_date'] = pd.to_datetime(frame['nav_date'].astype(str), format='%Y-%m-%d', errors='coerce')
+        for column in _VALUE_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        return frame
+
+    def check(self, conn, navs: Sequence, source: str = None) -> Tuple[List, List[Dict]]:
+        """校验一批净值
+
+        Args:
+            conn: 数据库连接或会话，用于批量查询已有净值
+            navs: 净值记录(字典或NavRecord)
+            source: 数据来源，记录到异常记录中
+
+        Returns:
+            (应入库的净值列表, 异常记录字典列表)，异常记录字段与NavAnomaly一致
+        """
+        navs = list(navs)
+        if not self.enabled or not navs:
+            return navs, []
+        try:
+            return self._check(conn, navs, source)
+        except Exception as e:
+            # 校验本身出错时不阻塞入库
+            logger.error("净值校验失败，本批按未校验入库: %s", e)
+            return navs, []
+
+    def _check(self, conn, navs: List, source: str) -> Tuple[List, List[Dict]]:
+        """校验一批净值的实现，见check()"""
+        import numpy as np
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(
+            [(nav.get('product_code'), nav.get('nav_date')) + tuple(nav.get(column) for column in _VALUE_COLUMNS)
+             for nav in navs],
+            columns=['product_code', 'nav_date'] + _VALUE_COLUMNS,
+        )
+        frame['row'] = np.arange(len(frame))
+        frame['nav_date'] = pd.to_datetime(frame['nav_date'], format='%Y-%m-%d', errors='coerce')
+        for column in _VALUE_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        # 缺少编码或日期的记录由入库方法跳过，不参与校验
+        frame = frame.dropna(subset=['product_code', 'nav_date'])
+        if frame.empty:
+            return navs, []
+
+        start_date = (frame['nav_date'].min() - timedelta(days=self.lookback_days)).date()
+        end_date = frame['nav_date'].max().date()
+        previous = self.load_previous(conn, frame['product_code'].unique().tolist(), start_date, end_date)
+
+        # 批内较早日期的净值也作为后续日期的对比基准，同一日期以本批为准
+        reference = pd.concat([previous, frame[previous.columns]], ignore_index=True)
+        reference = reference.dropna(subset=['nav_date']).drop_duplicates(['product_code', 'nav_date'], keep='last')
+        reference['product_code'] = reference['product_code'].astype(frame['product_code'].dtype)
+        reference = reference.rename(columns={column: f'prev_{column}' for column in reference.columns
+                                              if column != 'product_code'})
+        merged = pd.merge_asof(
+            frame.sort_values('nav_date'), reference.sort_values('prev_nav_date'),
+            left_on='nav_date', right_on='prev_nav_date', by='product_code',
+            allow_exact_matches=False, tolerance=pd.Timedelta(days=self.lookback_days),
+        )
+
+        names, matrix = self._apply_rules(merged)
+        flagged = matrix.any(axis=1)
+        if not flagged.any():
+            return navs, []
+
+        anomalies = []
+        bad_rows = set()
+        names = np.array(names)
+        for position in np.flatnonzero(flagged):
+            record = merged.iloc[position]
+            row = int(record['row'])
+            bad_rows.add(row)
+            nav = navs[row]
+            anomalies.append({
+                'product_code': record['product_code'],
+                'nav_date': record['nav_date'].date(),
+                'initial_nav': _to_float(record['initial_nav']),
+                'accumulated_nav': _to_float(record['accumulated_nav']),
+                'current_nav': _to_float(record['current_nav']),
+                'prev_nav_date': record['prev_nav_date'].date() if not pd.isna(record['prev_nav_date']) else None,
+                'prev_accumulated_nav': _to_float(record['prev_accumulated_nav']),
+                'prev_current_nav': _to_float(record['prev_current_nav']),
+                'reasons': ','.join(names[matrix[position]]),
+                'action': self.action,
+                'source': source or nav.get('source'),
+                'crawl_time': nav.get('crawl_time'),
+            })
+
+        metrics = get_metrics()
+        for name, count in zip(names, matrix.sum(axis=0)):
+            if count:
+                metrics.inc('nav_anomalies_total', int(count), reason=str(name), action=self.action)
+        logger.warning("本批 %s 条净值中有 %s 条未通过校验(%s)",
+                       len(navs), len(anomalies), '已隔离' if self.action == ACTION_QUARANTINE else '已标记')
+
+        if self.action == ACTION_FLAG:
+            return navs, anomalies
+        return [nav for row, nav in enumerate(navs) if row not in bad_rows], anomalies
+
+    def _apply_rules(self, merged):
+        """对齐后的净值按列向量化计算各条规则
+
+        Returns:
+            (规则名称元组, 布尔矩阵)，矩阵的行对应merged，列对应规则
+        """
+        import numpy as np
+
+        def column(name):
+            return merged[name].to_numpy(dtype=float, na_value=np.nan)
+
+        initial, accumulated, current = (column(name) for name in _VALUE_COLUMNS)
+        prev_initial, prev_accumulated, prev_current = (column(f'prev_{name}') for name in _VALUE_COLUMNS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 历史数据中的0或负数不能作为对比基准
+            prev_current = np.where(prev_current > 0, prev_current, np.nan)
+            prev_accumulated = np.where(prev_accumulated > 0, prev_accumulated, np.nan)
+            direct = np.fmax(np.abs(current / prev_current - 1), np.abs(accumulated / prev_accumulated - 1))
+            crossed = np.fmax(np.abs(current / prev_accumulated - 1), np.abs(accumulated / prev_current - 1))
+            values = np.stack([current, accumulated, initial])
+            rules = {
+                REASON_OUT_OF_RANGE: ((values <= 0) | (values > self.max_nav)).any(axis=0),
+                REASON_JUMP: direct > self.max_change,
+                REASON_ACCUMULATED_BELOW_CURRENT: accumulated < current - self.tolerance,
+                # 直接对比变化明显，交叉对比(当前对上一条累计、累计对上一条当前)明显更接近
+                REASON_SWAPPED_FIELDS: (direct > self.max_change / 10) & (crossed < direct / 2),
+                REASON_INITIAL_CHANGED: np.abs(initial - prev_initial) > self.tolerance,
+            }
+        return tuple(rules), np.column_stack(list(rules.values()))
+
+def _to_float(value):
+    """NaN转换为None，其余转换为float"""
+    return None if value != value else float(value)
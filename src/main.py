@@ -1,35 +1,187 @@
 import logging
 import argparse
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
 
-from src import setup_logging, get_database_url, get_scraper_config, ChinaWealthScraper
-from src.database import DatabaseManager
+from src.config.config import (
+    setup_logging, get_database_url, get_scraper_config, get_scheduler_config, get_metrics_config
+)
+from src.utils.metrics import RunTracker
+from src.utils.profiler import get_profiler, enable_profiling, disable_profiling
+
+# 爬虫和数据库模块依赖较重，仅在执行抓取时导入
+if TYPE_CHECKING:
+    from src.scrapers.base_scraper import BaseScraper
+    from src.database.db_manager import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
-def main():
-    """主程序入口
+def save_scraped_data(db_manager: 'DatabaseManager', products: list, navs: list, source: str = None):
+    """保存抓取结果到数据库
     
-    负责解析命令行参数、初始化组件、执行爬虫任务并保存数据。
-    支持设置最大抓取页数和是否使用代理。
+    Args:
+        db_manager: 数据库管理器
+        products: 产品基本信息列表
+        navs: 产品净值信息列表
+        source: 数据来源标记
+    """
+    # 产品和净值都写入后统一更新净值聚合
+    with db_manager.cube.batch():
+        if products:
+            db_manager.save_products(products, source=source)
+            logger.info("成功保存 %s 条产品基本信息", len(products))
+        
+        if navs:
+            db_manager.save_product_navs(navs, source=source)
+            logger.info("成功保存 %s 条产品净值数据", len(navs))
+
+def run_crawl(scraper: 'BaseScraper', db_manager: 'DatabaseManager',
+              max_pages: int = None, product_codes: list = None,
+              session_max_age: float = None, pipeline: dict = None):
+    """执行一次抓取并保存数据
+    
+    Args:
+        scraper: 爬虫实例
+        db_manager: 数据库管理器
+        max_pages: 最大抓取页数，为None或0表示不限制
+        product_codes: 指定抓取的产品登记编码列表，为空表示批量抓取
+        session_max_age: 会话有效期(秒)，有效期内复用已有会话
+        pipeline: 流水线参数(queue_size/write_batch_pages)，传入时批量抓取边抓取边入库
+    """
+    delta = getattr(scraper, 'delta', None)
+    if delta is not None:
+        # 增量抓取按数据库中已有的产品和净值判断页面是否有变化
+        delta.bind(db_manager.get_change_fingerprints)
+    
+    # 整页抓取记录写入的产品，结束时与上次的产品列表比较
+    source = scraper.SOURCE or None
+    if not product_codes:
+        db_manager.begin_listing(source)
+    
+    if product_codes:
+        # 单个产品抓取模式，所有产品共享一次抓取的重试预算
+        scraper.begin_run()
+        products, navs = [], []
+        for product_code in product_codes:
+            logger.info("开始抓取指定产品的数据，产品登记编码: %s", product_code)
+            code_products, code_navs = scraper.scrape_product(product_code, session_max_age=session_max_age)
+            products.extend(code_products)
+            navs.extend(code_navs)
+        scraper.log_retry_summary()
+    elif pipeline is not None and hasattr(scraper, 'iter_pages'):
+        # 流水线模式，抓取、转换和入库在不同线程中并行，数据已在流水线中保存
+        from src.pipeline import IngestPipeline
+        logger.info("开始流水线抓取 %s 理财产品数据 (最大页数: %s)", scraper.SOURCE, max_pages if max_pages else '不限制')
+        IngestPipeline(scraper, db_manager, **pipeline).run(max_pages=max_pages, session_max_age=session_max_age)
+        products, navs = [], []
+    else:
+        # 批量抓取模式
+        logger.info("开始抓取 %s 理财产品数据 (最大页数: %s)", scraper.SOURCE, max_pages if max_pages else '不限制')
+        products, navs = scraper.scrape(max_pages=max_pages, session_max_age=session_max_age)
+    
+    planner = getattr(scraper, 'planner', None)
+    if not product_codes and planner is not None and planner.active:
+        # 来不及抓完全部页面时，用预留的时间刷新最可能有变化的产品
+        if planner.behind:
+            priority_products, priority_navs = refresh_priority_products(scraper, db_manager, session_max_age)
+            products.extend(priority_products)
+            navs.extend(priority_navs)
+        planner.finish(scraper.SOURCE)
+    
+    # 保存数据到数据库
+    with get_profiler().stage('persist'):
+        save_scraped_data(db_manager, products, navs, source=source)
+    
+    if not product_codes:
+        db_manager.finish_listing(source, complete=getattr(scraper, 'last_crawl_complete', False))
+
+def refresh_priority_products(scraper: 'BaseScraper', db_manager: 'DatabaseManager',
+                              session_max_age: float = None):
+    """截止前逐个刷新本次整页抓取未覆盖的重点产品
+    
+    依次为关注产品(WATCHLIST_CODES)和近期活跃发行机构的产品，截止前来不及再请求时停止。
+    
+    Args:
+        scraper: 带有抓取计划的爬虫实例
+        db_manager: 数据库管理器
+        session_max_age: 会话有效期(秒)
+        
+    Returns:
+        (产品基本信息列表, 产品净值信息列表)
+    """
+    planner = scraper.planner
+    since = date.today() - timedelta(days=planner.active_issuer_days)
+    # 本次已抓取的产品排除在外，按已抓取的数量放宽查询条数
+    candidates = get_scheduler_config()['watchlist_codes'] + db_manager.get_recently_active_codes(
+        since, limit=len(planner.seen_codes) + 1000)
+    codes = [code for code in dict.fromkeys(candidates) if code not in planner.seen_codes]
+    
+    products, navs = [], []
+    for code in codes:
+        if not planner.has_time():
+            break
+        start = time.time()
+        code_products, code_navs = scraper.scrape_product(code, session_max_age=session_max_age)
+        planner.record_product(time.time() - start)
+        products.extend(code_products)
+        navs.extend(code_navs)
+    logger.info("刷新重点产品 %s/%s 个", planner.products_done, len(codes))
+    return products, navs
+
+def add_arguments(parser):
+    """注册抓取命令的命令行参数
+    
+    Args:
+        parser: 命令行参数解析器
     """
-    # 命令行参数解析
-    parser = argparse.ArgumentParser(description='理财产品信息抓取工具')
     parser.add_argument('--max-pages', type=int, default=None, 
                         help='最大抓取页数，默认为不限制')
     parser.add_argument('--use-proxy', action='store_true', 
                         help='是否使用代理')
     parser.add_argument('--product-code', type=str, default=None,
                         help='指定抓取单个产品，使用产品登记编码')
-    args = parser.parse_args()
+    parser.add_argument('--profile', action='store_true',
+                        help='按阶段剖析CPU和内存，结果写入data/profiles目录')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流水线模式，抓取的同时由独立线程写入数据库')
+    parser.add_argument('--max-cache-age', type=float, default=None,
+                        help='可使用的响应缓存最大时长(秒)，0表示不使用缓存，默认按缓存有效期判断')
+    parser.add_argument('--sources', type=str, default=None,
+                        help='逗号分隔的数据源名称，多个数据源并行抓取，默认使用SCRAPER_SOURCES')
+    parser.add_argument('--deadline', type=str, default=None,
+                        help='截止时间("06:00"或"4h")，按截止时间调整请求间隔，来不及时优先刷新重点产品，默认使用CRAWL_DEADLINE')
+    parser.add_argument('--crawl-mode', choices=['full', 'delta'], default=None,
+                        help='full: 完整抓取；delta: 增量抓取，连续没有变化的页面之后停止，按FULL_SWEEP_DAYS周期完整抓取，默认使用CRAWL_MODE')
+
+def run(args):
+    """执行抓取命令
+    
+    负责初始化组件、执行爬虫任务并保存数据。
+    支持设置最大抓取页数和是否使用代理。
+    
+    Args:
+        args: 解析后的命令行参数
+    """
+    from src.scrapers.registry import create_scraper
+    from src.database.db_manager import DatabaseManager
+    from src.runner import run_sources
     
     # 初始化日志
     setup_logging()
     
     # 程序开始时间
     start_time = time.time()
-    logger.info(f"抓取程序开始运行：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("抓取程序开始运行：%s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    
+    # 本次运行的指标记录
+    metrics_config = get_metrics_config()
+    tracker = RunTracker('crawl', output_dir=metrics_config['output_dir'], enabled=metrics_config['enabled'])
+    status = 'success'
+    
+    # 按阶段剖析
+    if getattr(args, 'profile', False):
+        enable_profiling('crawl')
     
     try:
         # 获取配置
@@ -37,56 +189,67 @@ def main():
         
         # 命令行参数优先
         max_pages = args.max_pages if args.max_pages is not None else config['max_pages']
-        use_proxy = args.use_proxy if args.use_proxy else config['use_proxy']
         
         # 初始化数据库
         db_url = get_database_url()
         db_manager = DatabaseManager(db_url)
         
-        # 初始化爬虫
-        scraper = ChinaWealthScraper(
-            use_proxy=use_proxy, 
-            retry_times=config['retry_times'],
-            timeout=config['timeout'],
-            request_delay=config['request_delay']
-        )
+        # 初始化爬虫，每个数据源使用各自的配置、会话、速率限制和重试预算
+        sources = config['sources']
+        if getattr(args, 'sources', None):
+            sources = [name.strip() for name in args.sources.split(',') if name.strip()]
+        overrides = {}
+        if args.use_proxy:
+            overrides['use_proxy'] = True
+        if getattr(args, 'deadline', None):
+            overrides['deadline'] = args.deadline
+        if getattr(args, 'crawl_mode', None):
+            overrides['crawl_mode'] = args.crawl_mode
+        scrapers = {
+            name: create_scraper(name, max_cache_age=getattr(args, 'max_cache_age', None), **overrides)
+            for name in sources
+        }
         
-        # 执行爬取
+        # 执行爬取并保存
+        pipeline = None
+        if getattr(args, 'pipeline', False) or config['pipeline']:
+            pipeline = {'queue_size': config['pipeline_queue_size'],
+                        'write_batch_pages': config['pipeline_write_batch']}
         if args.product_code:
-            # 单个产品抓取模式
-            logger.info(f"开始抓取指定产品的数据，产品登记编码: {args.product_code}")
-            # 这里需要添加单个产品抓取的逻辑
-            logger.warning("单个产品抓取功能尚未实现")
-            products, navs = [], []
+            # 指定产品只从第一个数据源抓取
+            run_crawl(scrapers[sources[0]], db_manager, product_codes=[args.product_code])
         else:
-            # 批量抓取模式
-            logger.info(f"开始抓取中国财富网理财产品数据 (最大页数: {max_pages if max_pages else '不限制'})")
-            products, navs = scraper.scrape(max_pages=max_pages)
-        
-        # 保存数据到数据库
-        if products:
-            db_manager.save_products(products)
-            logger.info(f"成功保存 {len(products)} 条产品基本信息")
-        
-        if navs:
-            db_manager.save_product_navs(navs)
-            logger.info(f"成功保存 {len(navs)} 条产品净值数据")
+            run_sources(scrapers, db_manager, max_pages=max_pages, pipeline=pipeline)
         
         # 获取数据库统计
         products_count = db_manager.get_products_count()
         navs_count = db_manager.get_product_navs_count()
-        logger.info(f"数据库中共有 {products_count} 条产品信息，{navs_count} 条净值记录")
+        logger.info("数据库中共有 %s 条产品信息，%s 条净值记录", products_count, navs_count)
         
     except Exception as e:
-        logger.error(f"程序运行出错: {str(e)}")
+        status = 'failed'
+        logger.error("程序运行出错: %s", e)
     finally:
+        # 输出运行指标
+        tracker.finish(status, db_manager=locals().get('db_manager'))
+        
+        # 输出剖析结果
+        disable_profiling()
+        
         # 关闭数据库连接
         if 'db_manager' in locals():
             db_manager.close()
         
         # 计算运行时间
         elapsed_time = time.time() - start_time
-        logger.info(f"程序运行完成，耗时 {elapsed_time:.2f} 秒")
+        logger.info("程序运行完成，耗时 %.2f 秒", elapsed_time)
+
+def main(argv=None):
+    """主程序入口"""
+    # 命令行参数解析
+    parser = argparse.ArgumentParser(description='理财产品信息抓取工具')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
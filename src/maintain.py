@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库维护工具
+将已结束月份的净值移出热表，并把超过保留期限的月分区归档为压缩列式文件，
+也可按数据库中的净值重新计算净值聚合，或放行人工确认无误的隔离净值
+"""
+
+import argparse
+import logging
+from datetime import datetime
+
+from src.config.config import setup_logging, get_database_url, get_partition_config
+
+logger = logging.getLogger(__name__)
+
+def add_arguments(parser):
+    """注册维护命令的命令行参数
+
+    Args:
+        parser: 命令行参数解析器
+    """
+    parser.add_argument('--keep-months', type=int, default=None,
+                        help='热表保留的月数(含当月)，默认使用NAV_HOT_MONTHS')
+    parser.add_argument('--archive-after-months', type=int, default=None,
+                        help='数据库中保留的月数，更早的分区归档，0表示不归档，默认使用NAV_ARCHIVE_AFTER_MONTHS')
+    parser.add_argument('--list', action='store_true',
+                        help='只列出数据库中的月分区和已归档的月份')
+    parser.add_argument('--rebuild-aggregates', action='store_true',
+                        help='按数据库中的净值重新计算净值聚合，可用--start-date/--end-date限定日期')
+    parser.add_argument('--release-anomalies', type=int, nargs='+', default=None, metavar='ID',
+                        help='放行隔离的异常净值(query --anomalies中的编号)，不经校验写入净值表')
+    parser.add_argument('--start-date', type=str, default=None,
+                        help='重新计算聚合的起始净值日期，格式YYYY-MM-DD')
+    parser.add_argument('--end-date', type=str, default=None,
+                        help='重新计算聚合的结束净值日期，格式YYYY-MM-DD')
+
+def run_maintenance(db_manager, keep_months: int, archive_after_months: int):
+    """执行分区轮转和归档
+
+    Args:
+        db_manager: 数据库管理器
+        keep_months: 热表保留的月数(含当月)
+        archive_after_months: 数据库中保留的月数，0表示不归档
+    """
+    moved = db_manager.rotate_nav_partitions(keep_months=keep_months)
+    logger.info("净值分区轮转完成，涉及 %s 个分区", len(moved))
+    if archive_after_months > 0:
+        paths = db_manager.archive_nav_partitions(after_months=archive_after_months)
+        logger.info("净值分区归档完成，新增 %s 个归档文件", len(paths))
+
+def run(args):
+    """执行维护命令
+
+    Args:
+        args: 解析后的命令行参数
+    """
+    from src.database.db_manager import DatabaseManager
+
+    setup_logging()
+    config = get_partition_config()
+    db_manager = DatabaseManager(get_database_url(), archive_dir=config['archive_dir'])
+    try:
+        if args.list:
+            print(f"数据库分区: {', '.join(db_manager.partitions.list_partitions()) or '无'}")
+            print(f"已归档月份: {', '.join(db_manager.partitions.archived_months()) or '无'}")
+            return
+
+        if args.rebuild_aggregates:
+            start_date = datetime.strptime(args.start_date, '%Y-%m-%d').date() if args.start_date else None
+            end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+            count = db_manager.rebuild_nav_aggregates(start_date, end_date)
+            logger.info("净值聚合重新计算完成，涉及 %s 个净值日期", count)
+            return
+
+        if args.release_anomalies:
+            count = db_manager.release_nav_anomalies(args.release_anomalies)
+            logger.info("放行 %s 条隔离的异常净值", count)
+            return
+
+        keep_months = args.keep_months if args.keep_months is not None else config['hot_months']
+        archive_after_months = (args.archive_after_months if args.archive_after_months is not None
+                                else config['archive_after_months'])
+        run_maintenance(db_manager, keep_months, archive_after_months)
+    finally:
+        db_manager.close()
+
+def main(argv=None):
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='理财产品数据库维护工具')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main()
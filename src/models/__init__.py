@@ -1,5 +1,9 @@
 # 数据模型模块
 
 from src.models.product import Product, ProductNav, Base
+from src.models.run import RunRecord
+from src.models.aggregate import NavAggregate
+from src.models.anomaly import NavAnomaly
+from src.models.listing import ListingSnapshot, ProductChange
 
-__all__ = ['Product', 'ProductNav', 'Base']
\ No newline at end of file
+__all__ = ['Product', 'ProductNav', 'RunRecord', 'NavAggregate', 'NavAnomaly', 'ListingSnapshot', 'ProductChange', 'Base']
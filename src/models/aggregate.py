@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Float, DateTime, Integer, Text, Date, Index
+from datetime import datetime
+
+from .product import Base
+
+class NavAggregate(Base):
+    """净值聚合表
+    
+    按净值日期和维度(发行机构、风险等级、产品类型、币种)预先计算的产品数、
+    净值均值、分位数和分布，看板查询按索引直接读取，不再扫描产品与净值的联合数据。
+    dimension为'all'的行是当日全部产品的汇总。
+    """
+    __tablename__ = 'nav_aggregates'
+    __table_args__ = (
+        Index('ux_nav_aggregates_cell', 'nav_date', 'dimension', 'dim_value', unique=True),
+        Index('ix_nav_aggregates_lookup', 'dimension', 'dim_value', 'nav_date'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='自增主键')
+    nav_date = Column(Date, nullable=False, comment='净值日期')
+    dimension = Column(String(32), nullable=False, comment='维度(issuer/risk_level/product_type/currency/all)')
+    dim_value = Column(String(100), nullable=False, comment='维度取值，缺失时为空字符串')
+    product_count = Column(Integer, comment='当日有净值记录的产品数')
+    nav_count = Column(Integer, comment='当前净值非空的记录数')
+    avg_nav = Column(Float, comment='当前净值均值')
+    min_nav = Column(Float, comment='当前净值最小值')
+    p25_nav = Column(Float, comment='当前净值25%分位数')
+    median_nav = Column(Float, comment='当前净值中位数')
+    p75_nav = Column(Float, comment='当前净值75%分位数')
+    max_nav = Column(Float, comment='当前净值最大值')
+    distribution = Column(Text, comment='当前净值分布(JSON，区间 -> 产品数)')
+    
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<NavAggregate(nav_date='{self.nav_date}', dimension='{self.dimension}', dim_value='{self.dim_value}')>"
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Float, DateTime, Integer, Date, Index
+from datetime import datetime
+
+from .product import Base
+
+class NavAnomaly(Base):
+    """净值异常表
+
+    入库校验发现的可疑净值(隔夜大幅跳变、累计净值低于当前净值、字段错位等)，
+    记录原始取值、对比用的上一条净值和命中的规则。隔离模式下这些净值不写入净值表。
+    """
+    __tablename__ = 'nav_anomalies'
+    __table_args__ = (
+        Index('ix_nav_anomalies_product', 'product_code', 'nav_date'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='自增主键')
+    product_code = Column(String(50), nullable=False, comment='产品登记编码')
+    nav_date = Column(Date, nullable=False, comment='净值日期')
+    initial_nav = Column(Float, comment='初始净值')
+    accumulated_nav = Column(Float, comment='累计净值')
+    current_nav = Column(Float, comment='当前净值')
+    prev_nav_date = Column(Date, comment='对比的上一条净值日期')
+    prev_accumulated_nav = Column(Float, comment='上一条累计净值')
+    prev_current_nav = Column(Float, comment='上一条当前净值')
+    reasons = Column(String(200), nullable=False, comment='命中的规则，逗号分隔')
+    action = Column(String(16), nullable=False, comment='处理方式(quarantine:未入库/flag:已入库/released:放行入库)')
+    source = Column(String(32), comment='数据来源')
+    crawl_time = Column(String(50), comment='抓取时间')
+    created_at = Column(DateTime, default=datetime.now, index=True, comment='记录时间')
+
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<NavAnomaly(product_code='{self.product_code}', nav_date='{self.nav_date}', reasons='{self.reasons}')>"
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Index
+
+from .product import Base
+
+class ListingSnapshot(Base):
+    """产品列表快照表
+
+    每个数据源已抓取到且尚未下架的产品及其内容指纹，每次抓取结束时与本次抓取到的产品比较。
+    只保存编码和指纹，不重复保存产品信息。
+    """
+    __tablename__ = 'listing_snapshots'
+
+    source = Column(String(32), primary_key=True, comment='数据来源')
+    product_code = Column(String(50), primary_key=True, comment='产品登记编码')
+    fingerprint = Column(BigInteger, nullable=False, comment='销售状态、风险等级和销售区域的指纹')
+    seen_at = Column(DateTime, nullable=False, comment='指纹的记录时间(上架或属性变化时更新)')
+
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<ListingSnapshot(source='{self.source}', product_code='{self.product_code}')>"
+
+class ProductChange(Base):
+    """产品列表变化表
+
+    相邻两次抓取之间新上架、下架以及销售状态、风险等级或销售区域发生变化的产品，
+    同一次比较的记录具有相同的source和run_at。
+    """
+    __tablename__ = 'product_changes'
+    __table_args__ = (
+        Index('ix_product_changes_run', 'source', 'run_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='自增主键')
+    source = Column(String(32), nullable=False, comment='数据来源')
+    run_at = Column(DateTime, nullable=False, comment='比较的时间')
+    product_code = Column(String(50), nullable=False, index=True, comment='产品登记编码')
+    change = Column(String(16), nullable=False, comment='变化类型(listed:上架/delisted:下架/changed:属性变化)')
+    fields = Column(String(100), comment='发生变化的字段，逗号分隔')
+
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<ProductChange(product_code='{self.product_code}', change='{self.change}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Text, Date
+from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Text, Date, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -35,6 +35,8 @@ class Product(Base):
     income_type = Column(String(50), comment='收益类型')
     sale_method = Column(String(50), comment='销售方式')
     crawl_time = Column(String(20), comment='抓取时间')
+    source = Column(String(32), nullable=False, default='chinawealth', server_default='chinawealth',
+                    comment='数据来源')
     
     created_at = Column(DateTime, default=datetime.now, comment='创建时间')
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
@@ -54,6 +56,12 @@ class ProductNav(Base):
     通过product_code与产品基本信息表建立关联关系。
     """
     __tablename__ = 'product_navs'
+    __table_args__ = (
+        # 按产品和日期查找净值(入库时的更新检查、最新净值查询)
+        Index('ix_product_navs_code_date', 'product_code', 'nav_date'),
+        # 按日期读取当日净值(聚合立方的单元格计算)
+        Index('ix_product_navs_date_code', 'nav_date', 'product_code'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment='自增主键')
     product_id = Column(String(50), index=True, comment='产品ID(网站内部ID)')
@@ -66,6 +74,8 @@ class ProductNav(Base):
     is_updated = Column(Integer, default=0, comment='是否更新(0:未更新,1:已更新)')
     last_update_date = Column(Date, comment='最近更新日期')
     crawl_time = Column(String(20), comment='抓取时间')
+    source = Column(String(32), nullable=False, default='chinawealth', server_default='chinawealth',
+                    comment='数据来源')
     
     created_at = Column(DateTime, default=datetime.now, comment='创建时间')
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, Float, DateTime, Integer, Text
+from datetime import datetime
+
+from .product import Base
+
+class RunRecord(Base):
+    """运行记录表
+    
+    每次抓取或导出结束后记录一行汇总指标，用于追踪每晚任务的耗时构成和变化趋势。
+    """
+    __tablename__ = 'runs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='自增主键')
+    run_id = Column(String(64), unique=True, nullable=False, index=True, comment='运行标识')
+    command = Column(String(32), index=True, comment='运行的命令(crawl/export等)')
+    status = Column(String(16), comment='运行状态(success/failed)')
+    started_at = Column(DateTime, comment='开始时间')
+    finished_at = Column(DateTime, comment='结束时间')
+    duration_seconds = Column(Float, comment='总耗时(秒)')
+    pages = Column(Integer, comment='成功获取的页数')
+    failed_pages = Column(Integer, comment='获取失败的页数')
+    products_count = Column(Integer, comment='写入的产品记录数')
+    navs_count = Column(Integer, comment='写入的净值记录数')
+    rows_per_second = Column(Float, comment='写入速度(行/秒)')
+    http_requests = Column(Integer, comment='HTTP请求次数')
+    http_seconds = Column(Float, comment='HTTP请求累计耗时(秒)')
+    http_bytes = Column(Integer, comment='响应字节数')
+    retries = Column(Integer, comment='重试次数')
+    wait_seconds = Column(Float, comment='请求间隔等待累计耗时(秒)')
+    parse_seconds = Column(Float, comment='数据解析累计耗时(秒)')
+    db_seconds = Column(Float, comment='数据库写入累计耗时(秒)')
+    export_seconds = Column(Float, comment='数据导出累计耗时(秒)')
+    metrics_json = Column(Text, comment='完整指标快照(JSON)')
+    
+    created_at = Column(DateTime, default=datetime.now, comment='创建时间')
+    
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<RunRecord(run_id='{self.run_id}', status='{self.status}')>"
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+流水线抓取入库
+
+抓取、转换和数据库写入分别在独立的线程中运行，阶段之间用有界队列连接：
+写入线程提交前几批数据的同时，抓取线程继续请求后续页面；数据库写入跟不上时
+队列被填满，抓取线程在放入队列时阻塞，形成背压，内存占用保持在队列容量以内。
+总耗时接近网络耗时与数据库耗时中较大的一个，而不是两者之和。
+
+抓取线程只有一个：请求之间的礼貌等待和共享的会话决定了请求本身是串行的，
+流水线节省的是抓取与写入互相等待的时间。
+"""
+
+import queue
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict
+
+from src.utils.metrics import get_metrics
+from src.utils.profiler import get_profiler
+
+if TYPE_CHECKING:
+    from src.scrapers.chinawealth_scraper import ChinaWealthScraper
+    from src.database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """流水线中某个阶段失败，其他阶段提前结束"""
+
+
+class IngestPipeline:
+    """抓取-转换-写入流水线"""
+
+    def __init__(self, scraper: 'ChinaWealthScraper', db_manager: 'DatabaseManager',
+                 queue_size: int = 4, write_batch_pages: int = 5):
+        """
+        初始化流水线
+
+        Args:
+            scraper: 爬虫实例
+            db_manager: 数据库管理器
+            queue_size: 每个阶段间队列最多缓存的页数
+            write_batch_pages: 写入线程每次提交最多合并的页数
+        """
+        self.scraper = scraper
+        self.db_manager = db_manager
+        self.queue_size = max(1, queue_size)
+        self.write_batch_pages = max(1, write_batch_pages)
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _put(self, target: queue.Queue, item, stage: str):
+        """放入队列，队列已满时阻塞等待(背压)，流水线中止时放弃
+
+        Args:
+            target: 目标队列
+            item: 放入的数据
+            stage: 放入方所属阶段，用于统计背压等待时间
+
+        Raises:
+            PipelineAborted: 其他阶段已失败
+        """
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                target.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        waited = time.perf_counter() - start
+        if waited > 0.001:
+            get_metrics().inc('pipeline_backpressure_seconds_total', waited, stage=stage)
+            with self._lock:
+                self.stats['backpressure_seconds'] = self.stats.get('backpressure_seconds', 0.0) + waited
+
+    def _get(self, source: queue.Queue):
+        """从队列取出数据，流水线中止时放弃
+
+        Raises:
+            PipelineAborted: 其他阶段已失败
+        """
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _run_stage(self, name: str, func, *args):
+        """在线程中执行阶段函数，失败时中止整个流水线"""
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            logger.error("流水线%s阶段出错: %s", name, e)
+            with self._lock:
+                self._errors.append(e)
+            self._stop.set()
+        finally:
+            with self._lock:
+                self.stats[f'{name}_seconds'] = round(time.perf_counter() - start, 3)
+
+    def _fetch(self, raw_queue: queue.Queue, max_pages, session_max_age):
+        """抓取阶段：逐页请求并放入原始数据队列"""
+        pages = 0
+        try:
+            for products in self.scraper.iter_pages(max_pages=max_pages, session_max_age=session_max_age):
+                self._put(raw_queue, products, 'fetch')
+                pages += 1
+        finally:
+            with self._lock:
+                self.stats['pages'] = pages
+            if not self._stop.is_set():
+                self._put(raw_queue, _DONE, 'fetch')
+
+    def _transform(self, raw_queue: queue.Queue, record_queue: queue.Queue):
+        """转换阶段：将原始页转换为记录并放入写入队列"""
+        while True:
+            products = self._get(raw_queue)
+            if products is _DONE:
+                self._put(record_queue, _DONE, 'transform')
+                return
+            self._put(record_queue, self.scraper._process_page(products), 'transform')
+
+    def _write(self, record_queue: queue.Queue):
+        """写入阶段：合并若干页后提交到数据库，全部写入后统一更新净值聚合"""
+        with self.db_manager.cube.batch():
+            self._write_batches(record_queue)
+
+    def _write_batches(self, record_queue: queue.Queue):
+        """逐批写入队列中的页"""
+        products_total = 0
+        navs_total = 0
+        db_seconds = 0.0
+        source = self.scraper.SOURCE or None
+        done = False
+        while not done:
+            # 阻塞等待第一页，再取出队列中已就绪的页合并为一批
+            batch = [self._get(record_queue)]
+            while len(batch) < self.write_batch_pages:
+                try:
+                    batch.append(record_queue.get_nowait())
+                except queue.Empty:
+                    break
+            # 结束标记总是最后放入队列
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+
+            products = [record for page_products, _ in batch for record in page_products]
+            navs = [record for _, page_navs in batch for record in page_navs]
+            write_start = time.perf_counter()
+            with get_profiler().stage('persist'):
+                if products:
+                    self.db_manager.save_products(products, source=source)
+                if navs:
+                    self.db_manager.save_product_navs(navs, source=source)
+            db_seconds += time.perf_counter() - write_start
+            products_total += len(products)
+            navs_total += len(navs)
+
+        with self._lock:
+            self.stats['products'] = products_total
+            self.stats['navs'] = navs_total
+            self.stats['db_seconds'] = round(db_seconds, 3)
+
+    def run(self, max_pages: int = None, session_max_age: float = None) -> Dict:
+        """执行一次流水线抓取
+
+        Args:
+            max_pages: 最大抓取页数，为None或0表示不限制
+            session_max_age: 会话有效期(秒)，有效期内复用已有会话
+
+        Returns:
+            统计信息字典(页数、产品数、净值数、各阶段耗时、背压等待时间)
+
+        Raises:
+            Exception: 某个阶段失败时抛出该阶段的异常
+        """
+        raw_queue = queue.Queue(maxsize=self.queue_size)
+        record_queue = queue.Queue(maxsize=self.queue_size)
+        self._stop.clear()
+        self._errors = []
+        self.stats = {'pages': 0, 'products': 0, 'navs': 0, 'db_seconds': 0.0, 'backpressure_seconds': 0.0}
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_stage, name='pipeline-fetch',
+                             args=('fetch', self._fetch, raw_queue, max_pages, session_max_age)),
+            threading.Thread(target=self._run_stage, name='pipeline-transform',
+                             args=('transform', self._transform, raw_queue, record_queue)),
+            threading.Thread(target=self._run_stage, name='pipeline-write',
+                             args=('write', self._write, record_queue)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        self.stats['backpressure_seconds'] = round(self.stats['backpressure_seconds'], 3)
+
+        logger.info("流水线完成: %s 页，%s 条产品，%s 条净值，总耗时 %.2f 秒(抓取线程 %.2f 秒，数据库写入 %.2f 秒)，背压等待 %.2f 秒",
+                    self.stats['pages'], self.stats['products'], self.stats['navs'], self.stats['elapsed_seconds'],
+                    self.stats.get('fetch_seconds', 0), self.stats['db_seconds'], self.stats['backpressure_seconds'])
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据查询工具
+用于在命令行中快速查询单个产品的基本信息和最新净值
+"""
+
+import json
+import argparse
+import logging
+from datetime import datetime
+
+from src.config.config import setup_logging, get_database_url
+
+logger = logging.getLogger(__name__)
+
+# 查询结果中输出的产品字段
+PRODUCT_FIELDS = [
+    'product_code', 'product_name', 'issuer', 'risk_level', 'product_type',
+    'currency', 'investment_period', 'min_investment', 'sale_status',
+    'start_date', 'end_date', 'crawl_time'
+]
+
+# 查询结果中输出的净值字段
+NAV_FIELDS = ['nav_date', 'initial_nav', 'accumulated_nav', 'current_nav', 'is_updated', 'last_update_date']
+
+# 查询结果中输出的异常净值字段
+ANOMALY_FIELDS = ['id', 'product_code', 'nav_date', 'initial_nav', 'accumulated_nav', 'current_nav', 'prev_nav_date',
+                  'prev_accumulated_nav', 'prev_current_nav', 'reasons', 'action', 'source', 'created_at']
+
+# 查询结果中输出的产品列表变化字段
+CHANGE_FIELDS = ['source', 'run_at', 'product_code', 'change', 'fields']
+
+def add_arguments(parser):
+    """注册查询命令的命令行参数
+
+    Args:
+        parser: 命令行参数解析器
+    """
+    parser.add_argument('--product-code', type=str, default=None,
+                        help='按产品登记编码查询产品信息和最新净值')
+    parser.add_argument('--count', action='store_true',
+                        help='输出数据库中的产品数和净值记录数')
+    parser.add_argument('--history', action='store_true',
+                        help='输出--product-code指定产品的净值历史(含已归档的数据)')
+    parser.add_argument('--start-date', type=str, default=None,
+                        help='净值历史的起始日期，格式YYYY-MM-DD')
+    parser.add_argument('--end-date', type=str, default=None,
+                        help='净值历史的结束日期，格式YYYY-MM-DD')
+    parser.add_argument('--search', type=str, default=None,
+                        help='按产品名称、发行机构或销售区域的片段检索产品')
+    parser.add_argument('--page', type=int, default=1,
+                        help='检索结果的页码，默认1')
+    parser.add_argument('--page-size', type=int, default=20,
+                        help='检索结果每页条数，也是输出异常净值的最多条数，默认20')
+    parser.add_argument('--aggregates', type=str, default=None,
+                        choices=['all', 'issuer', 'risk_level', 'product_type', 'currency'],
+                        help='按维度输出每日的净值聚合(产品数、均值、分位数和分布)，可用--start-date/--end-date限定日期')
+    parser.add_argument('--dim-value', type=str, default=None,
+                        help='只输出--aggregates维度中该取值的聚合')
+    parser.add_argument('--anomalies', action='store_true',
+                        help='输出入库校验发现的异常净值，可用--product-code/--start-date/--end-date过滤')
+    parser.add_argument('--changes', nargs='?', const='all', default=None,
+                        choices=['all', 'listed', 'delisted', 'changed'],
+                        help='输出最近一次抓取与上一次相比新上架、下架和属性变化的产品，可指定变化类型')
+    parser.add_argument('--json', action='store_true',
+                        help='以JSON格式输出')
+
+def _to_dict(record, fields):
+    """将ORM对象转换为字典
+
+    Args:
+        record: ORM对象
+        fields: 需要输出的字段列表
+
+    Returns:
+        字段字典
+    """
+    return {field: getattr(record, field) for field in fields}
+
+def _round(value, digits: int = 4):
+    """保留小数位，空值原样返回"""
+    return round(value, digits) if value is not None else None
+
+def run(args):
+    """执行查询命令
+
+    Args:
+        args: 解析后的命令行参数
+    """
+    from src.database.db_manager import DatabaseManager
+
+    # 查询命令只输出结果，日志仅保留警告以上级别
+    setup_logging('WARNING')
+
+    db_manager = DatabaseManager(get_database_url())
+    try:
+        result = {}
+        if args.count:
+            result['products_count'] = db_manager.get_products_count()
+            result['navs_count'] = db_manager.get_product_navs_count()
+
+        if args.product_code:
+            product = db_manager.get_product_by_code(args.product_code)
+            nav = db_manager.get_latest_nav_by_code(args.product_code)
+            result['product'] = _to_dict(product, PRODUCT_FIELDS) if product else None
+            result['latest_nav'] = _to_dict(nav, NAV_FIELDS) if nav else None
+
+        start_date = datetime.strptime(args.start_date, '%Y-%m-%d').date() if args.start_date else None
+        end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+        if args.product_code and args.history:
+            history = db_manager.get_nav_history(args.product_code, start_date, end_date)
+            result['nav_history'] = [{field: record.get(field) for field in NAV_FIELDS} for record in history]
+
+        if args.search:
+            found = db_manager.search_products(args.search, page=args.page, page_size=args.page_size)
+            result['search'] = {
+                'total': found['total'], 'page': found['page'], 'page_size': found['page_size'],
+                'items': [dict(_to_dict(item['product'], PRODUCT_FIELDS), score=round(item['score'], 4))
+                          for item in found['items']],
+            }
+
+        if args.anomalies:
+            anomalies = db_manager.get_nav_anomalies(args.product_code, start_date, end_date,
+                                                     limit=args.page_size)
+            result['anomalies'] = [_to_dict(anomaly, ANOMALY_FIELDS) for anomaly in anomalies]
+
+        if args.changes:
+            changes = db_manager.get_product_changes(change=None if args.changes == 'all' else args.changes,
+                                                     limit=args.page_size)
+            result['changes'] = [_to_dict(change, CHANGE_FIELDS) for change in changes]
+
+        if args.aggregates:
+            result['aggregates'] = db_manager.get_nav_aggregates(args.aggregates, args.dim_value,
+                                                                 start_date, end_date)
+    finally:
+        db_manager.close()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, default=str, indent=2))
+        return
+
+    if 'products_count' in result:
+        print(f"产品数: {result['products_count']}，净值记录数: {result['navs_count']}")
+    if args.product_code:
+        if result['product'] is None:
+            print(f"未找到产品: {args.product_code}")
+            return
+        for field, value in result['product'].items():
+            print(f"{field}: {value}")
+        if result['latest_nav']:
+            for field, value in result['latest_nav'].items():
+                print(f"{field}: {value}")
+        else:
+            print("暂无净值数据")
+    if 'nav_history' in result:
+        print(f"净值历史({len(result['nav_history'])} 条):")
+        for record in result['nav_history']:
+            print(f"  {record['nav_date']}  当前净值 {record['current_nav']}  累计净值 {record['accumulated_nav']}")
+    if 'search' in result:
+        found = result['search']
+        print(f"检索 \"{args.search}\" 共 {found['total']} 个产品，第 {found['page']} 页:")
+        for item in found['items']:
+            print(f"  {item['product_code']}  {item['product_name']}  {item['issuer'] or ''}")
+    if 'anomalies' in result:
+        print(f"异常净值({len(result['anomalies'])} 条):")
+        for anomaly in result['anomalies']:
+            print(f"  #{anomaly['id']}  {anomaly['product_code']}  {anomaly['nav_date']}  当前净值 {anomaly['current_nav']} "
+                  f"(上一条 {anomaly['prev_current_nav']})  {anomaly['reasons']}  {anomaly['action']}")
+    if 'changes' in result:
+        labels = {'listed': '上架', 'delisted': '下架', 'changed': '变化'}
+        run_at = result['changes'][0]['run_at'] if result['changes'] else '-'
+        print(f"产品列表变化({run_at}，{len(result['changes'])} 条):")
+        for change in result['changes']:
+            print(f"  {change['product_code']}  {labels.get(change['change'], change['change'])}  "
+                  f"{change['fields'] or ''}  {change['source']}")
+    if 'aggregates' in result:
+        print(f"净值聚合({args.aggregates}，{len(result['aggregates'])} 条):")
+        for cell in result['aggregates']:
+            print(f"  {cell['nav_date']}  {cell['dim_value'] or '-'}  产品 {cell['product_count']}  "
+                  f"均值 {_round(cell['avg_nav'])}  中位数 {_round(cell['median_nav'])}  "
+                  f"区间 [{_round(cell['min_nav'])}, {_round(cell['max_nav'])}]")
+
+def main(argv=None):
+    """脚本入口函数"""
+    parser = argparse.ArgumentParser(description='理财产品数据查询工具')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main()
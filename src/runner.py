@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多数据源并行抓取
+
+每个数据源在独立的线程中运行，使用各自的会话连接池、速率限制和重试预算，
+抓取结果经同一个DatabaseManager入库并标记数据来源。数据源之间只在数据库写入时
+短暂串行，总耗时接近最慢的一个数据源，而不是各数据源耗时之和。
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict
+
+from src.main import run_crawl
+
+if TYPE_CHECKING:
+    from src.scrapers.base_scraper import BaseScraper
+    from src.database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+def _run_source(name: str, scraper: 'BaseScraper', db_manager: 'DatabaseManager', **kwargs) -> Dict:
+    """抓取单个数据源，异常记录在结果中而不向外抛出"""
+    start = time.perf_counter()
+    try:
+        run_crawl(scraper, db_manager, **kwargs)
+        status, error = 'success', None
+    except Exception as e:
+        logger.error("数据源 %s 抓取失败: %s", name, e)
+        status, error = 'failed', str(e)
+    elapsed = round(time.perf_counter() - start, 3)
+    logger.info("数据源 %s 抓取结束(%s)，耗时 %.2f 秒", name, status, elapsed)
+    return {'status': status, 'error': error, 'elapsed_seconds': elapsed}
+
+
+def run_sources(scrapers: Dict[str, 'BaseScraper'], db_manager: 'DatabaseManager',
+                max_pages: int = None, session_max_age: float = None, pipeline: dict = None) -> Dict[str, Dict]:
+    """并行抓取多个数据源并保存数据
+
+    Args:
+        scrapers: {数据源名称: 爬虫实例}
+        db_manager: 数据库管理器
+        max_pages: 每个数据源的最大抓取页数，为None或0表示不限制
+        session_max_age: 会话有效期(秒)，有效期内复用已有会话
+        pipeline: 流水线参数，传入时支持流水线的数据源边抓取边入库
+
+    Returns:
+        {数据源名称: {'status', 'error', 'elapsed_seconds'}}
+
+    Raises:
+        RuntimeError: 有数据源抓取失败(其他数据源的数据已保存)
+    """
+    if len(scrapers) == 1:
+        # 单个数据源直接在当前线程执行，异常原样抛出
+        name, scraper = next(iter(scrapers.items()))
+        start = time.perf_counter()
+        run_crawl(scraper, db_manager, max_pages=max_pages, session_max_age=session_max_age, pipeline=pipeline)
+        return {name: {'status': 'success', 'error': None,
+                       'elapsed_seconds': round(time.perf_counter() - start, 3)}}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(scrapers), thread_name_prefix='source') as executor:
+        futures = {
+            name: executor.submit(_run_source, name, scraper, db_manager, max_pages=max_pages,
+                                  session_max_age=session_max_age, pipeline=pipeline)
+            for name, scraper in scrapers.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    elapsed = time.perf_counter() - start
+
+    serial = sum(result['elapsed_seconds'] for result in results.values())
+    logger.info("%s 个数据源抓取完成，总耗时 %.2f 秒(各数据源耗时之和 %.2f 秒)", len(scrapers), elapsed, serial)
+    failed = [name for name, result in results.items() if result['status'] != 'success']
+    if failed:
+        raise RuntimeError(f"以下数据源抓取失败: {', '.join(failed)}")
+    return results
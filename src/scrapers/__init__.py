@@ -2,5 +2,9 @@
 
 from src.scrapers.chinawealth_scraper import ChinaWealthScraper
 from src.scrapers.base_scraper import BaseScraper
+from src.scrapers.records import ProductRecord, NavRecord, transform_page
+from src.scrapers.registry import register_scraper, get_scraper_class, create_scraper, available_sources
+from src.scrapers.rate_limiter import RateLimiter
 
-__all__ = ['ChinaWealthScraper', 'BaseScraper'] 
\ No newline at end of file
+__all__ = ['ChinaWealthScraper', 'BaseScraper', 'ProductRecord', 'NavRecord', 'transform_page',
+           'register_scraper', 'get_scraper_class', 'create_scraper', 'available_sources', 'RateLimiter'] 
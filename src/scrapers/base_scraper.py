@@ -1,49 +1,106 @@
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import logging
 import random
 import time
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Tuple, Any
 
+from .retry_policy import RetryPolicy
+from .rate_limiter import RateLimiter
+from .planner import CrawlPlanner
+from .delta import DeltaCrawl
+from .proxy_pool import ProxyPool, OUTCOME_OK, OUTCOME_ERROR, OUTCOME_THROTTLED
+from ..utils.metrics import get_metrics
+from ..utils.profiler import get_profiler
+
 logger = logging.getLogger(__name__)
 
 class BaseScraper(ABC):
     """爬虫基类"""
     
+    # 数据源名称，注册到爬虫注册表时使用，入库时作为数据来源标记
+    SOURCE = ''
+    
     def __init__(self, 
                  use_proxy: bool = False,
                  retry_times: int = 5,
                  timeout: int = 30,
-                 request_delay: float = 5.0):
+                 request_delay: float = 5.0,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 rate_limit: float = 0.0,
+                 rate_burst: int = 1,
+                 pool_size: int = 4,
+                 proxy_pool: Optional[ProxyPool] = None,
+                 planner: Optional[CrawlPlanner] = None,
+                 delta: Optional[DeltaCrawl] = None):
         """
         初始化爬虫基类
         
         Args:
             use_proxy: 是否使用代理
-            retry_times: 重试次数
+            retry_times: 单页最大尝试次数，未传入retry_policy时使用
             timeout: 请求超时时间(秒)
             request_delay: 请求延迟(秒)
+            retry_policy: 重试策略，默认按retry_times创建
+            rate_limit: 每秒最多请求数，0表示不限制
+            rate_burst: 速率限制允许的突发请求数
+            pool_size: 连接池大小
+            proxy_pool: 代理池，传入时请求轮流经由池中健康的代理发出
+            planner: 抓取计划，传入时整页抓取按截止时间调整请求间隔和页数
+            delta: 增量抓取，传入时整页抓取可以在没有变化的页面处提前停止
         """
         self.session = requests.Session()
         
-        # 设置重试策略
-        retry_strategy = Retry(
-            total=retry_times,
-            backoff_factor=2,
-            status_forcelist=[500, 502, 503, 504, 429],
-            allowed_methods=["GET", "POST"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # 重试统一由retry_policy负责，传输层不再自动重试，避免两层重试叠加
+        # 每个爬虫实例持有独立的会话和连接池，多个数据源并行时互不占用连接
+        adapter = HTTPAdapter(max_retries=0, pool_connections=pool_size, pool_maxsize=pool_size)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=retry_times)
+        self.rate_limiter = RateLimiter(rate_limit, rate_burst, name=self.SOURCE)
         
         # 基本配置
         self.timeout = timeout
         self.request_delay = request_delay
         self.use_proxy = use_proxy
-        self.proxies = self._get_proxy() if use_proxy else None
+        self.proxy_pool = proxy_pool
+        self.proxies = self._get_proxy() if use_proxy and proxy_pool is None else None
+        self.planner = planner
+        self.delta = delta
+        
+        # 最近一次整页抓取是否覆盖了完整的产品列表(没有页数限制、提前停止和失败页)，由子类设置
+        self.last_crawl_complete = False
+        
+    @classmethod
+    def from_config(cls, config: Dict, max_cache_age: Optional[float] = None, **kwargs) -> 'BaseScraper':
+        """根据爬虫配置创建爬虫实例
+        
+        Args:
+            config: get_scraper_config()或get_source_config()返回的配置字典
+            max_cache_age: 可使用的响应缓存最大时长(秒)，不使用响应缓存的爬虫忽略
+            **kwargs: 覆盖配置或传递给子类的其他参数，deadline覆盖配置的截止时间，crawl_mode覆盖配置的抓取模式
+            
+        Returns:
+            爬虫实例
+        """
+        deadline = kwargs.pop('deadline', None)
+        crawl_mode = kwargs.pop('crawl_mode', None)
+        options = {
+            'use_proxy': config['use_proxy'],
+            'retry_times': config['retry_times'],
+            'timeout': config['timeout'],
+            'request_delay': config['request_delay'],
+            'retry_policy': RetryPolicy.from_config(config),
+            'rate_limit': config['rate_limit'],
+            'rate_burst': config['rate_burst'],
+            'pool_size': config['pool_size'],
+            'proxy_pool': ProxyPool.from_config(config) if config['use_proxy'] else None,
+            'planner': CrawlPlanner.from_config(config, deadline=deadline),
+            'delta': DeltaCrawl.from_config(config, source=cls.SOURCE, mode=crawl_mode),
+        }
+        options.update(kwargs)
+        return cls(**options)
         
     def _get_random_user_agent(self) -> str:
         """获取随机User-Agent"""
@@ -62,11 +119,106 @@ class BaseScraper(ABC):
         return {}
     
     def _wait(self, retry_count: int = 0):
-        """请求等待，避免频繁请求"""
+        """请求等待，避免频繁请求
+        
+        Args:
+            retry_count: 已失败的次数，大于0时额外按重试策略退避
+        """
         base_delay = self.request_delay
-        delay = base_delay + (retry_count * 2) + random.uniform(1, 3)
-        logger.debug(f"等待 {delay:.1f} 秒后发起请求...")
+        if self.planner is not None:
+            # 按截止时间计划的请求间隔
+            base_delay = self.planner.current_delay(base_delay)
+        delay = base_delay + random.uniform(1, 3)
+        if retry_count > 0:
+            delay += self.retry_policy.backoff(retry_count)
+        if self.proxy_pool is not None:
+            # 请求延迟按代理出口分别计算，只需等到选中的代理可用
+            delay = self.proxy_pool.reserve(delay)
+        logger.debug("等待 %.1f 秒后发起请求...", delay)
         time.sleep(delay)
+        get_metrics().inc('wait_seconds_total', delay, reason='retry' if retry_count > 0 else 'politeness')
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发起HTTP请求并记录延迟、状态码和响应字节数
+        
+        配置了代理池时，请求使用选中代理的会话发出，结果计入该代理的健康统计。
+        
+        Args:
+            method: 请求方法
+            url: 请求地址
+            **kwargs: 传递给session.request的其他参数
+            
+        Returns:
+            响应对象
+        """
+        self.rate_limiter.acquire()
+        session = self.session
+        proxy = None
+        if self.proxy_pool is not None:
+            proxy = self.proxy_pool.acquire()
+            session = proxy.session
+            kwargs['proxies'] = proxy.proxies
+            if proxy.session_started_at is None:
+                proxy.session_started_at = time.monotonic()
+                self._start_proxy_session(method, url)
+        
+        metrics = get_metrics()
+        start_time = time.perf_counter()
+        with get_profiler().stage('fetch'):
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                metrics.observe('http_request_duration_seconds', time.perf_counter() - start_time,
+                                method=method, status=type(e).__name__)
+                if proxy is not None:
+                    self.proxy_pool.record(proxy, None, OUTCOME_ERROR)
+                raise
+            # 读取响应体，使下载耗时计入fetch阶段
+            content_length = len(response.content)
+        elapsed = time.perf_counter() - start_time
+        metrics.observe('http_request_duration_seconds', elapsed, method=method, status=response.status_code)
+        metrics.inc('http_response_bytes_total', content_length, method=method)
+        if proxy is not None:
+            if response.status_code == 429 or response.status_code == 403:
+                outcome = OUTCOME_THROTTLED
+            elif response.status_code >= 500:
+                outcome = OUTCOME_ERROR
+            else:
+                outcome = OUTCOME_OK
+            self.proxy_pool.record(proxy, elapsed, outcome)
+        return response
+    
+    def _start_proxy_session(self, method: str, url: str):
+        """代理的新会话发出第一个请求前调用，子类可在此为该代理获取Cookie
+        
+        Args:
+            method: 即将发出的请求方法
+            url: 即将发出的请求地址
+        """
+        pass
+    
+    def _report_throttled(self):
+        """响应内容表明请求被限流时，计入最近一次请求所用代理的限流统计"""
+        if self.proxy_pool is not None:
+            self.proxy_pool.mark_throttled(self.proxy_pool.acquire())
+    
+    def begin_run(self):
+        """开始一次新的抓取，重置重试预算、熔断器和统计"""
+        self.retry_policy.reset()
+    
+    def log_retry_summary(self):
+        """输出本次抓取的重试统计"""
+        summary = self.retry_policy.summary()
+        logger.info("重试统计: 共请求 %s 页，每页尝试次数分布 %s，重试 %s 次 %s，预算已用 %s/%s，熔断 %s 次",
+                    summary['pages'], summary['attempts_histogram'], summary['retries'], summary['retry_causes'],
+                    summary['budget_used'], summary['budget_total'] or '不限', summary['breaker_trips'])
+        if summary['failed_pages']:
+            logger.warning("以下页面最终获取失败: %s", summary['failed_pages'])
+        if self.proxy_pool is not None:
+            for stats in self.proxy_pool.stats():
+                logger.info("代理 %s: 请求 %s 次，错误 %s 次，限流 %s 次，平均延迟 %s 秒，隔离 %s 次",
+                            stats['proxy'], stats['requests'], stats['errors'], stats['throttled'], stats['latency'],
+                            stats['trips'])
         
     @abstractmethod
     def scrape(self, **kwargs) -> Tuple[List[Dict], List[Dict]]:
@@ -1,14 +1,28 @@
-import json
 import os
 import math
+import time
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+import requests
 
 from .base_scraper import BaseScraper
+from .registry import register_scraper
+from ..utils.metrics import get_metrics
+from ..utils.profiler import get_profiler
+from .retry_policy import (
+    CAUSE_NETWORK, CAUSE_THROTTLED, CAUSE_SERVER_ERROR, CAUSE_HTTP_ERROR,
+    CAUSE_API_ERROR, CAUSE_DECODE_ERROR, CAUSE_EMPTY, SESSION_RESET_CAUSES,
+    CircuitOpenError
+)
+from .records import PRODUCT_FIELDS, ProductRecord, NavRecord, transform_page
+from .decoding import decode_page, preview
+from .response_cache import ResponseCache, cache_key
 
 logger = logging.getLogger(__name__)
 
+@register_scraper('chinawealth')
 class ChinaWealthScraper(BaseScraper):
     """中国财富网理财产品爬虫
     
@@ -20,14 +34,25 @@ class ChinaWealthScraper(BaseScraper):
     BASE_URL = "https://www.chinawealth.com.cn/zzlc/jsp/lccp.jsp"
     API_URL = "https://www.chinawealth.com.cn/LcSolrSearch.go"
     
-    def __init__(self, use_proxy: bool = False, **kwargs):
+    # 每页数据量
+    PAGE_SIZE = 100
+    
+    def __init__(self, use_proxy: bool = False, base_url: str = None, api_url: str = None,
+                 response_cache: Optional[ResponseCache] = None, **kwargs):
         """初始化中国财富网爬虫
         
         Args:
             use_proxy: 是否使用代理
+            base_url: 覆盖会话初始化页面地址，用于离线替身服务
+            api_url: 覆盖查询接口地址，用于离线替身服务
+            response_cache: 分页查询的响应缓存，为None表示不缓存
             **kwargs: 传递给父类的其他参数
         """
         super().__init__(use_proxy=use_proxy, **kwargs)
+        if base_url:
+            self.BASE_URL = base_url
+        if api_url:
+            self.API_URL = api_url
         
         # 设置请求头
         self.headers = {
@@ -41,113 +66,47 @@ class ChinaWealthScraper(BaseScraper):
             "Referer": "https://www.chinawealth.com.cn/zzlc/jsp/lccp.jsp",
             "X-Requested-With": "XMLHttpRequest"
         }
-            
-    def _get_product_name(self, product_data: dict) -> str:
-        """获取产品名称
         
-        Args:
-            product_data: 原始产品数据
-            
-        Returns:
-            产品名称字符串
-        """
-        try:
-            copy_list = product_data.get("copy", [])
-            if isinstance(copy_list, list) and len(copy_list) > 2:
-                return copy_list[2]
-            return product_data.get("cpms", "")  # 尝试使用备选字段
-        except Exception:
-            return product_data.get("cpms", "")  # 出错时使用备选字段
-            
-    def _process_basic_info(self, product_data: dict) -> dict:
-        """处理产品基本信息
+        # 最近一次成功初始化会话的时间
+        self._session_initialized_at = None
         
-        Args:
-            product_data: 原始产品数据
-            
-        Returns:
-            处理后的产品信息字典
-        """
-        # 获取产品编码，确保不为空
-        product_code = product_data.get("cpdjbm", "")
-        if not product_code:
-            logger.warning("产品登记编码为空，使用默认值")
-            product_code = f"UNKNOWN_{product_data.get('id', '')}"
-            
-        return {
-            "product_id": product_data.get("id", ""),
-            "product_code": product_code,
-            "product_name": self._get_product_name(product_data),
-            "issuer": product_data.get("fxjgms", ""),
-            "issuer_code": product_data.get("fxjgdm", ""),
-            "risk_level": product_data.get("fxdjms", ""),
-            "risk_level_code": product_data.get("cpfxdj", ""),
-            "product_type": product_data.get("cptzxzms", ""),
-            "product_type_code": product_data.get("cptzxz", ""),
-            "currency": product_data.get("mjbz", ""),
-            "investment_period": product_data.get("qxms", ""),
-            "min_investment": product_data.get("qdxsjef", ""),
-            "sale_status": product_data.get("syztdm", ""),
-            "sale_regions": product_data.get("cpxsqy", ""),
-            "start_date": product_data.get("cpqsrq", ""),
-            "end_date": product_data.get("cpyjzzrq", ""),  # 结束日期
-            "product_category": product_data.get("cplx", ""),
-            "income_type": product_data.get("cpsylx", ""),
-            "sale_method": product_data.get("sfxcp", ""),
-            "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        self.response_cache = response_cache
         
-    def _clean_nav_value(self, value: str) -> float:
-        """清理并验证净值数据
+        # 解码时保留的产品字段，增量抓取检查排序的字段也需要保留
+        self.page_fields = PRODUCT_FIELDS
+        if self.delta is not None and self.delta.order_field:
+            self.page_fields = PRODUCT_FIELDS | {self.delta.order_field}
+    
+    @classmethod
+    def from_config(cls, config: Dict, max_cache_age: Optional[float] = None,
+                    **kwargs) -> 'ChinaWealthScraper':
+        """根据爬虫配置创建爬虫实例，并按配置启用响应缓存
         
         Args:
-            value: 原始净值字符串
-            
-        Returns:
-            处理后的净值浮点数，无效值返回0.0
+            config: 爬虫配置字典
+            max_cache_age: 可使用的响应缓存最大时长(秒)
+            **kwargs: 覆盖配置的其他参数
         """
-        try:
-            if not value or value == "--" or value == "null":
-                return 0.0
-            # 移除空格并转换为浮点数
-            cleaned_value = value.strip()
-            return float(cleaned_value)
-        except (ValueError, TypeError):
-            return 0.0
-        
-    def _process_nav_data(self, product_data: dict) -> Optional[dict]:
-        """处理产品净值数据
+        kwargs.setdefault('base_url', config['base_url'])
+        kwargs.setdefault('api_url', config['api_url'])
+        kwargs.setdefault('response_cache', ResponseCache.from_config(config, max_age=max_cache_age))
+        return super().from_config(config, **kwargs)
+            
+    def _process_page(self, products: List[dict]) -> Tuple[List[ProductRecord], List[NavRecord]]:
+        """批量处理一整页产品数据
         
         Args:
-            product_data: 原始产品数据
+            products: 接口返回的产品数据列表
             
         Returns:
-            处理后的净值信息字典，无有效净值时返回None
+            (产品记录列表, 净值记录列表)
         """
-        # 获取并清理净值数据
-        initial_nav = self._clean_nav_value(product_data.get("csjz", ""))
-        accumulated_nav = self._clean_nav_value(product_data.get("ljjz", ""))
-        current_nav = self._clean_nav_value(product_data.get("cpjz", ""))
-        
-        # 获取产品编码
-        product_code = product_data.get("cpdjbm", "")
-        if not product_code:
-            logger.warning("产品登记编码为空，跳过净值处理")
-            return None
-        
-        # 检查是否有任何有效的净值数据（大于0）
-        if not any([initial_nav > 0, accumulated_nav > 0, current_nav > 0]):
-            return None
-            
-        return {
-            "product_id": product_data.get("id", ""),
-            "product_code": product_code,
-            "initial_nav": initial_nav if initial_nav > 0 else None,  # 初始净值
-            "accumulated_nav": accumulated_nav if accumulated_nav > 0 else None,  # 累积净值
-            "current_nav": current_nav if current_nav > 0 else None,  # 产品净值
-            "nav_date": datetime.now().strftime("%Y-%m-%d"),  # 净值日期
-            "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        metrics = get_metrics()
+        with get_profiler().stage('parse'), metrics.timer('parse_duration_seconds'):
+            product_records, nav_records = transform_page(products)
+        metrics.inc('rows_parsed_total', len(product_records), kind='product')
+        metrics.inc('rows_parsed_total', len(nav_records), kind='nav')
+        return product_records, nav_records
 
     def _init_session(self) -> bool:
         """初始化会话，获取必要的Cookie
@@ -157,7 +116,8 @@ class ChinaWealthScraper(BaseScraper):
         """
         try:
             # 访问主页获取初始Cookie
-            response = self.session.get(
+            response = self._request(
+                "GET",
                 self.BASE_URL,
                 headers=self.headers,
                 timeout=self.timeout
@@ -171,113 +131,228 @@ class ChinaWealthScraper(BaseScraper):
             if 'Set-Cookie' in response.headers:
                 logger.info("成功获取新的Cookie")
             
+            self._session_initialized_at = time.monotonic()
             return True
         except Exception as e:
-            logger.error(f"初始化会话失败: {str(e)}")
+            logger.error("初始化会话失败: %s", e)
             return False
+    
+    def _start_proxy_session(self, method: str, url: str):
+        """代理的新会话先访问主页，获取该出口自己的Cookie
+        
+        Args:
+            method: 即将发出的请求方法
+            url: 即将发出的请求地址
+        """
+        if url == self.BASE_URL:
+            # 本身就是获取Cookie的请求
+            return
+        try:
+            self._request("GET", self.BASE_URL, headers=self.headers, timeout=self.timeout).raise_for_status()
+        except Exception as e:
+            logger.warning("代理会话初始化失败: %s", e)
+    
+    def _ensure_session(self, max_age: Optional[float] = None) -> bool:
+        """确保会话可用，会话未初始化或已超过有效期时重新初始化
+        
+        Args:
+            max_age: 会话有效期(秒)，为None表示每次都重新初始化
+            
+        Returns:
+            会话是否可用
+        """
+        if (max_age is not None and self._session_initialized_at is not None
+                and time.monotonic() - self._session_initialized_at < max_age):
+            return True
+        return self._init_session()
 
-    def _fetch_page(self, page: int) -> Tuple[List[dict], int]:
+    def _fetch_page(self, page: int, product_code: str = "",
+                    allow_empty: bool = False, orderby: str = "") -> Tuple[List[dict], int]:
         """获取指定页码的数据
         
+        重试次数、退避时长和熔断均由retry_policy统一控制。
+        
         Args:
             page: 页码
+            product_code: 产品登记编码，指定时只查询该产品
+            allow_empty: 是否将空数据视为正常结果而不重试
+            orderby: 排序参数，为空表示使用接口的默认顺序
             
         Returns:
             (产品数据列表, 总数)
+            
+        Raises:
+            CircuitOpenError: 熔断次数超过上限
         """
-        max_retries = 5
-        retry_count = 0
+        # 构建请求参数
+        params = {
+            "cpjglb": "",
+            "cpyzms": "01,03",  # 产品运作模式
+            "cptzxz": "",
+            "cpfxdj": "01,02",
+            "cpqx": "",
+            "mjbz": "",
+            "cpzt": "02,04",  # 产品状态
+            "mjfsdm": "01,NA",  # 募集方式代码
+            "cptssx": "",
+            "cpdjbm": product_code,
+            "cpmc": "",
+            "cpfxjg": "",
+            "yjbjjzStart": "",
+            "yjbjjzEnd": "",
+            "areacode": "",
+            "pagenum": str(page),  # 页码
+            "orderby": orderby,
+            "code": "",
+            "sySearch": -1,
+            "changeTableFlage": 0
+        }
+        
+        page_key = product_code or page
         
-        while retry_count < max_retries:
+        # 分页查询先查本地缓存，命中时不等待也不请求；单个产品查询用于刷新，始终请求最新数据
+        key = None
+        if self.response_cache is not None and not product_code:
+            key = cache_key("POST", self.API_URL, params)
+            cached = self._load_cached_page(page, key)
+            if cached is not None:
+                return cached
+        
+        attempt = 0
+        session_reset = False
+        
+        while True:
+            attempt += 1
+            
+            # 熔断器打开时在此暂停
+            self.retry_policy.before_request()
+            
+            # 请求等待，重试时额外退避
+            self._wait(attempt - 1)
+            
+            # 更新请求头
+            self.headers["User-Agent"] = self._get_random_user_agent()
+            
             try:
-                # 构建请求参数
-                params = {
-                    "cpjglb": "",
-                    "cpyzms": "01,03",  # 产品运作模式
-                    "cptzxz": "",
-                    "cpfxdj": "01,02",
-                    "cpqx": "",
-                    "mjbz": "",
-                    "cpzt": "02,04",  # 产品状态
-                    "mjfsdm": "01,NA",  # 募集方式代码
-                    "cptssx": "",
-                    "cpdjbm": "",
-                    "cpmc": "",
-                    "cpfxjg": "",
-                    "yjbjjzStart": "",
-                    "yjbjjzEnd": "",
-                    "areacode": "",
-                    "pagenum": str(page),  # 页码
-                    "orderby": "",
-                    "code": "",
-                    "sySearch": -1,
-                    "changeTableFlage": 0
-                }
-                
-                # 请求等待
-                self._wait(retry_count)
-                
-                # 更新请求头
-                self.headers["User-Agent"] = self._get_random_user_agent()
-                
                 # 发起请求
-                response = self.session.post(
+                response = self._request(
+                    "POST",
                     self.API_URL,
                     headers=self.headers,
                     data=params,
                     proxies=self.proxies,
                     timeout=self.timeout
                 )
-                
-                # 检查响应状态码
-                response.raise_for_status()
-                
-                # 保存响应内容
-                self._save_response(page, retry_count, response)
-                
-                # 检查是否返回错误码
-                try:
-                    data = response.json()
-                    if data.get("code") == "error":
-                        logger.warning(f"第 {page} 页返回错误码，可能触发了访问限制")
-                        retry_count += 1
-                        
-                        # 如果遇到错误，重新初始化会话并等待更长时间
-                        self._init_session()
-                        self._wait(retry_count * 2)
-                        continue
-                    
-                    products = data.get("List", [])
-                    total_count = data.get("Count", 0)
-                    
-                    if products:
-                        return products, total_count
-                    else:
-                        logger.warning(f"第 {page} 页返回空数据，尝试重试")
-                        retry_count += 1
-                        continue
-                    
-                except json.JSONDecodeError:
-                    logger.error(f"JSON解析错误，响应内容：{response.text[:200]}...")
-                    retry_count += 1
-                    continue
-                
-            except Exception as e:
-                logger.error(f"获取第 {page} 页数据时发生错误: {str(e)}")
-                retry_count += 1
-                self._wait(retry_count * 2)
-                continue
+            except requests.RequestException as e:
+                logger.error("获取第 %s 页数据时发生错误: %s", page, e, extra={'page': page, 'cause': CAUSE_NETWORK})
+                cause = CAUSE_NETWORK
+            else:
+                products, total_count, cause = self._parse_response(page, attempt, response, allow_empty)
+                if cause == CAUSE_API_ERROR:
+                    self._report_throttled()
+                if cause is None:
+                    if key is not None:
+                        self.response_cache.put(key, self.API_URL, response.content)
+                    self.retry_policy.record_success(page_key, attempt)
+                    get_metrics().inc('pages_total', result='success')
+                    return products, total_count
+            
+            if not self.retry_policy.record_failure(page_key, attempt, cause):
+                break
+            
+            # 疑似触发访问限制时重新初始化会话，每页最多一次
+            if cause in SESSION_RESET_CAUSES and not session_reset:
+                self._init_session()
+                session_reset = True
         
-        logger.error(f"获取第 {page} 页数据失败，已达到最大重试次数")
+        logger.error("获取第 %s 页数据失败，共尝试 %s 次", page, attempt, extra={'page': page})
+        get_metrics().inc('pages_total', result='failed')
         return [], 0
     
-    def _save_response(self, page: int, retry_count: int, response):
-        """保存响应内容用于调试
+    def _load_cached_page(self, page: int, key: str) -> Optional[Tuple[List[dict], int]]:
+        """从响应缓存读取一页数据
+        
+        Args:
+            page: 页码
+            key: 缓存键
+            
+        Returns:
+            (产品数据列表, 总数)，未命中或缓存内容无效时返回None
+        """
+        body = self.response_cache.get(key)
+        if body is None:
+            return None
+        try:
+            with get_profiler().stage('decode'):
+                data = decode_page(body, self.page_fields)
+        except ValueError:
+            logger.warning("第 %s 页缓存内容无效，重新请求", page, extra={'page': page})
+            return None
+        
+        products = data.get("List", [])
+        if not products:
+            return None
+        logger.debug("第 %s 页命中响应缓存", page, extra={'page': page})
+        get_metrics().inc('pages_total', result='success')
+        return products, data.get("Count", 0)
+    
+    def _parse_response(self, page: int, attempt: int, response,
+                        allow_empty: bool) -> Tuple[List[dict], int, Optional[str]]:
+        """检查响应并解析产品数据
+        
+        Args:
+            page: 页码
+            attempt: 本页第几次尝试
+            response: 响应对象
+            allow_empty: 是否将空数据视为正常结果
+            
+        Returns:
+            (产品数据列表, 总数, 失败原因)，成功时失败原因为None
+        """
+        # 检查响应状态码
+        if response.status_code == 429:
+            logger.warning("第 %s 页请求被限流(HTTP 429)", page, extra={'page': page, 'cause': CAUSE_THROTTLED})
+            return [], 0, CAUSE_THROTTLED
+        if response.status_code >= 500:
+            logger.warning("第 %s 页服务端错误(HTTP %s)", page, response.status_code,
+                           extra={'page': page, 'cause': CAUSE_SERVER_ERROR})
+            return [], 0, CAUSE_SERVER_ERROR
+        if response.status_code >= 400:
+            logger.warning("第 %s 页请求失败(HTTP %s)", page, response.status_code,
+                           extra={'page': page, 'cause': CAUSE_HTTP_ERROR})
+            return [], 0, CAUSE_HTTP_ERROR
+        
+        # 响应体已在请求时读取，调试文件、解码和响应缓存共用这一个bytes对象
+        body = response.content
+        self._save_response(page, attempt - 1, response, body)
+        
+        try:
+            with get_profiler().stage('decode'):
+                data = decode_page(body, self.page_fields, response.encoding)
+        except ValueError:
+            logger.error("JSON解析错误，响应内容：%s...", preview(body), extra={'page': page, 'cause': CAUSE_DECODE_ERROR})
+            return [], 0, CAUSE_DECODE_ERROR
+        
+        # 检查是否返回错误码
+        if data.get("code") == "error":
+            logger.warning("第 %s 页返回错误码，可能触发了访问限制", page, extra={'page': page, 'cause': CAUSE_API_ERROR})
+            return [], 0, CAUSE_API_ERROR
+        
+        products = data.get("List", [])
+        total_count = data.get("Count", 0)
+        if not products and not allow_empty:
+            logger.warning("第 %s 页返回空数据", page, extra={'page': page, 'cause': CAUSE_EMPTY})
+            return [], total_count, CAUSE_EMPTY
+        return products, total_count, None
+    
+    def _save_response(self, page: int, retry_count: int, response, body: bytes):
+        """保存响应内容用于调试，响应体按原始字节写入
         
         Args:
             page: 页码
             retry_count: 重试次数
             response: 响应对象
+            body: 响应体
         """
         try:
             debug_dir = os.path.join(os.getcwd(), 'data', 'debug')
@@ -288,87 +363,152 @@ class ChinaWealthScraper(BaseScraper):
                 f"api_response_page{page}_try{retry_count}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
             )
             
-            with open(debug_file, "w", encoding="utf-8") as f:
-                f.write(f"Status Code: {response.status_code}\n")
-                f.write(f"Headers: {dict(response.headers)}\n")
-                f.write(f"Response Text: {response.text}\n")
+            with open(debug_file, "wb") as f:
+                f.write(f"Status Code: {response.status_code}\n".encode("utf-8"))
+                f.write(f"Headers: {dict(response.headers)}\n".encode("utf-8"))
+                f.write(b"Response Text: ")
+                f.write(body)
+                f.write(b"\n")
         except Exception as e:
-            logger.warning(f"保存响应内容失败: {str(e)}")
+            logger.warning("保存响应内容失败: %s", e)
 
-    def scrape(self, max_pages: int = None) -> Tuple[List[Dict], List[Dict]]:
-        """执行爬取任务
+    def scrape_product(self, product_code: str,
+                       session_max_age: Optional[float] = None) -> Tuple[List[Dict], List[Dict]]:
+        """抓取单个产品的数据
         
         Args:
-            max_pages: 最大页数限制，为None表示不限制
+            product_code: 产品登记编码
+            session_max_age: 会话有效期(秒)，有效期内复用已有会话
             
         Returns:
             (产品基本信息列表, 产品净值信息列表)
         """
-        # 产品信息和净值数据列表
         basic_info_list = []
         nav_data_list = []
         
+        if not self._ensure_session(session_max_age):
+            logger.error("会话初始化失败，跳过产品抓取")
+            return basic_info_list, nav_data_list
+        
+        try:
+            products, _ = self._fetch_page(1, product_code=product_code, allow_empty=True)
+        except CircuitOpenError as e:
+            logger.error("产品 %s 抓取中止: %s", product_code, e, extra={'product_code': product_code})
+            return basic_info_list, nav_data_list
+        # 只保留编码完全一致的产品
+        matched = [product for product in products if product.get("cpdjbm") == product_code]
+        basic_info_list, nav_data_list = self._process_page(matched)
+        
+        if not basic_info_list:
+            logger.warning("未找到产品登记编码为 %s 的产品", product_code, extra={'product_code': product_code})
+        return basic_info_list, nav_data_list
+
+    def iter_pages(self, max_pages: int = None,
+                   session_max_age: Optional[float] = None) -> Iterator[List[dict]]:
+        """逐页获取原始产品数据
+        
+        调用方可以边抓取边处理，不必等待所有页面获取完成。
+        熔断或出错时结束迭代，已产出的页面不受影响。增量抓取时在连续没有变化的页面之后停止。
+        
+        Args:
+            max_pages: 最大页数限制，为None表示不限制
+            session_max_age: 会话有效期(秒)，有效期内复用已有会话
+            
+        Yields:
+            每页的产品数据列表
+        """
+        # 重置本次抓取的重试预算和熔断器
+        self.begin_run()
+        planner = self.planner
+        if planner is not None:
+            planner.begin()
+        delta = self.delta
+        orderby = delta.begin() if delta is not None else ""
+        total_pages = 0
+        complete = False
+        self.last_crawl_complete = False
+        
         try:
             # 初始化会话
-            if not self._init_session():
+            if not self._ensure_session(session_max_age):
                 logger.error("会话初始化失败，退出爬取")
-                return basic_info_list, nav_data_list
+                return
             
             # 获取第一页数据以获取总数
-            products, total_count = self._fetch_page(1)
+            page_start = time.time()
+            products, total_count = self._fetch_page(1, orderby=orderby)
             if not products:
                 logger.warning("未获取到产品数据")
-                return basic_info_list, nav_data_list
-            
-            logger.info(f"总共有 {total_count} 条产品数据")
+                return
             
-            # 处理第一页数据
-            for product in products:
-                try:
-                    basic_info = self._process_basic_info(product)
-                    if basic_info:
-                        basic_info_list.append(basic_info)
-                        
-                    nav_data = self._process_nav_data(product)
-                    if nav_data:
-                        nav_data_list.append(nav_data)
-                except Exception as e:
-                    logger.error(f"处理产品数据时出错: {str(e)}")
-                    continue
+            logger.info("总共有 %s 条产品数据", total_count)
+            yield products
             
             # 计算总页数
-            page_size = 100  # 每页数据量
-            total_pages = math.ceil(total_count / page_size)
-            if max_pages:
-                total_pages = min(total_pages, max_pages)
+            all_pages = math.ceil(total_count / self.PAGE_SIZE)
+            total_pages = min(all_pages, max_pages) if max_pages else all_pages
+            stop = delta is not None and delta.observe(products)
+            if planner is not None:
+                planner.plan(total_pages, time.time() - page_start)
+                planner.seen_codes.update(product.get("cpdjbm") for product in products)
             
             # 获取剩余页面数据
             for page in range(2, total_pages + 1):
-                logger.info(f"正在获取第 {page}/{total_pages} 页数据")
+                if stop:
+                    break
+                if planner is not None and not planner.should_fetch(page):
+                    logger.warning("按截止时间停止整页抓取，跳过第 %s-%s 页", page, total_pages)
+                    break
+                logger.info("正在获取第 %s/%s 页数据", page, total_pages, extra={'page': page})
                 
-                products, _ = self._fetch_page(page)
+                page_start = time.time()
+                products, _ = self._fetch_page(page, orderby=orderby)
                 
                 if products:
-                    for product in products:
-                        try:
-                            basic_info = self._process_basic_info(product)
-                            if basic_info:
-                                basic_info_list.append(basic_info)
-                                
-                            nav_data = self._process_nav_data(product)
-                            if nav_data:
-                                nav_data_list.append(nav_data)
-                        except Exception as e:
-                            logger.error(f"处理产品数据时出错: {str(e)}")
-                            continue
+                    stop = delta is not None and delta.observe(products)
+                    yield products
                 else:
-                    logger.error(f"第 {page} 页数据获取失败")
-                    continue
-            
-            logger.info(f"成功处理 {len(basic_info_list)} 条产品数据")
-            logger.info(f"成功处理 {len(nav_data_list)} 条净值数据")
+                    logger.error("第 %s 页数据获取失败", page, extra={'page': page})
+                if planner is not None:
+                    # 本页耗时包含调用方处理本页(如流水线写入背压)的时间
+                    planner.record_page(time.time() - page_start,
+                                        (product.get("cpdjbm") for product in products))
+            else:
+                # 没有提前停止，且所有页面都已获取
+                complete = total_pages == all_pages and not self.retry_policy.failed_pages
             
+        except CircuitOpenError as e:
+            # 熔断后保留已抓取的数据，快速结束本次抓取
+            logger.error("抓取中止: %s", e)
         except Exception as e:
-            logger.error(f"爬取过程中出错: {str(e)}")
+            logger.error("爬取过程中出错: %s", e)
+        finally:
+            self.last_crawl_complete = complete
+            if delta is not None:
+                delta.finish(total_pages, complete)
+            self.log_retry_summary()
+    
+    def scrape(self, max_pages: int = None,
+               session_max_age: Optional[float] = None) -> Tuple[List[Dict], List[Dict]]:
+        """执行爬取任务
+        
+        Args:
+            max_pages: 最大页数限制，为None表示不限制
+            session_max_age: 会话有效期(秒)，有效期内复用已有会话
+            
+        Returns:
+            (产品基本信息列表, 产品净值信息列表)
+        """
+        # 产品信息和净值数据列表
+        basic_info_list = []
+        nav_data_list = []
+        
+        for products in self.iter_pages(max_pages=max_pages, session_max_age=session_max_age):
+            page_products, page_navs = self._process_page(products)
+            basic_info_list.extend(page_products)
+            nav_data_list.extend(page_navs)
+        
+        logger.info("成功处理 %s 条产品数据", len(basic_info_list))
+        logger.info("成功处理 %s 条净值数据", len(nav_data_list))
         
         return basic_info_list, nav_data_list 
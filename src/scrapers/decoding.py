@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+接口响应解码
+
+响应体只读取一次(requests缓存的bytes)，直接按UTF-8字节解析，不再经response.text生成整页字符串
+再由response.json()解析。安装了orjson时使用orjson，否则使用标准库json。
+解析后每条产品只保留整页转换和增量比较用到的字段，流水线中等待写入的页面占用更少内存。
+调试文件和响应缓存使用同一个bytes对象，不再复制响应体。
+"""
+
+import json
+import codecs
+from typing import AbstractSet, Optional
+
+from .records import PRODUCT_FIELDS
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库
+    orjson = None
+
+
+def loads(body: bytes):
+    """解析UTF-8编码的JSON字节串
+
+    Raises:
+        ValueError: 不是有效的JSON
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _is_utf8(encoding: Optional[str]) -> bool:
+    try:
+        return not encoding or codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return True
+
+
+def decode_page(body: bytes, fields: AbstractSet[str] = PRODUCT_FIELDS, encoding: Optional[str] = None) -> dict:
+    """解码一页查询结果
+
+    Args:
+        body: 响应体
+        fields: 每条产品保留的字段
+        encoding: 响应头声明的编码，按UTF-8解析失败且声明了其他编码时按该编码重新解码
+
+    Returns:
+        响应的顶层字典，其中List只含保留字段
+
+    Raises:
+        ValueError: 响应体不是JSON对象
+    """
+    try:
+        data = loads(body)
+    except ValueError:
+        if _is_utf8(encoding):
+            raise
+        data = json.loads(body.decode(encoding))
+    if not isinstance(data, dict):
+        raise ValueError(f"响应不是JSON对象: {type(data).__name__}")
+
+    products = data.get("List")
+    if products:
+        data["List"] = [{name: value for name, value in product.items() if name in fields}
+                        for product in products if isinstance(product, dict)]
+    return data
+
+
+def preview(body: bytes, limit: int = 200) -> str:
+    """响应体开头的文本，用于日志，只解码前limit个字节"""
+    return body[:limit].decode('utf-8', errors='replace')
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+增量抓取
+
+增量模式下分页查询按变化相关的字段排序(默认产品起始日期降序，新产品排在前面)，
+每抓取一页就与数据库中已有的产品和最新净值比较。连续若干整页的产品都已入库且
+销售状态和净值没有变化时，认为之后的页面也没有变化，停止翻页。
+
+只看前几页会漏掉排序靠后的产品的变化，因此每隔FULL_SWEEP_DAYS天仍做一次完整抓取，
+完整抓取的时间按数据源记录在状态文件中。服务端没有按请求排序时(返回结果不满足排序)
+本次退回完整抓取。
+"""
+
+import os
+import json
+import math
+import logging
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .records import parse_nav
+from ..utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+MODE_FULL = 'full'
+MODE_DELTA = 'delta'
+
+# 产品的变化指纹: (销售状态, 初始净值, 累计净值, 当前净值)
+Fingerprint = Tuple[str, Optional[float], Optional[float], Optional[float]]
+
+
+def fingerprint(product_data: dict) -> Fingerprint:
+    """接口返回的单条产品数据的变化指纹"""
+    get = product_data.get
+    return (get("syztdm", "") or "", parse_nav(get("csjz")), parse_nav(get("ljjz")), parse_nav(get("cpjz")))
+
+
+def _same(a: Fingerprint, b: Fingerprint) -> bool:
+    """比较指纹，净值按相对误差比较(MySQL的FLOAT列只有单精度)"""
+    if (a[0] or "") != (b[0] or ""):
+        return False
+    for x, y in zip(a[1:], b[1:]):
+        if x is None or y is None:
+            if x is not y:
+                return False
+        elif not math.isclose(x, y, rel_tol=1e-6):
+            return False
+    return True
+
+
+class DeltaCrawl:
+    """按排序提前结束翻页的增量抓取"""
+
+    def __init__(self, mode: str = MODE_FULL, orderby: str = 'cpqsrq desc', stop_pages: int = 1,
+                 full_sweep_days: int = 7, state_file: str = None, source: str = ''):
+        """
+        初始化增量抓取
+
+        Args:
+            mode: full表示每次完整抓取，delta表示按周期完整抓取、其余时间增量抓取
+            orderby: 增量抓取时接口orderby参数的取值，"字段 asc/desc"
+            stop_pages: 连续多少整页没有变化时停止翻页
+            full_sweep_days: 完整抓取的间隔天数
+            state_file: 记录上次完整抓取时间的文件，为None时每次都完整抓取
+            source: 数据源名称
+        """
+        self.mode = mode
+        self.orderby = orderby
+        parts = orderby.split()
+        self.order_field = parts[0] if parts else ''
+        self.descending = len(parts) > 1 and parts[1].lower() == 'desc'
+        self.stop_pages = max(1, stop_pages)
+        self.full_sweep_days = full_sweep_days
+        self.state_file = state_file
+        self.source = source
+        self.lookup: Optional[Callable[[List[str]], Dict[str, Fingerprint]]] = None
+        self.active = False
+        self._reset()
+
+    @classmethod
+    def from_config(cls, config: Dict, source: str = '', mode: str = None) -> 'DeltaCrawl':
+        """根据爬虫配置创建增量抓取
+
+        Args:
+            config: get_scraper_config()或get_source_config()返回的配置字典
+            source: 数据源名称
+            mode: 覆盖配置的抓取模式
+        """
+        return cls(mode=mode or config['crawl_mode'], orderby=config['delta_orderby'],
+                   stop_pages=config['delta_stop_pages'], full_sweep_days=config['full_sweep_days'],
+                   state_file=config['crawl_state_file'], source=source)
+
+    def _reset(self):
+        self.stale_pages = 0
+        self.pages = 0
+        self.stopped = False
+        self._last_key = None
+
+    def bind(self, lookup: Callable[[List[str]], Dict[str, Fingerprint]]):
+        """设置查询已入库产品指纹的函数，如DatabaseManager.get_change_fingerprints"""
+        self.lookup = lookup
+
+    # ---- 状态文件 ----
+
+    def _load_state(self) -> Dict:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取抓取状态失败: %s", e)
+            return {}
+
+    def last_full_sweep(self) -> Optional[datetime]:
+        """上次完整抓取的完成时间"""
+        value = self._load_state().get(self.source, {}).get('last_full_sweep')
+        return datetime.fromisoformat(value) if value else None
+
+    def _save_full_sweep(self, finished: datetime):
+        if not self.state_file:
+            return
+        try:
+            state = self._load_state()
+            state.setdefault(self.source, {})['last_full_sweep'] = finished.isoformat(timespec='seconds')
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning("写入抓取状态失败: %s", e)
+
+    # ---- 抓取过程 ----
+
+    def begin(self) -> str:
+        """开始一次整页抓取，决定本次是否增量抓取
+
+        Returns:
+            本次使用的orderby参数，完整抓取时为空字符串
+        """
+        self._reset()
+        self.active = False
+        if self.mode != MODE_DELTA:
+            return ""
+        if self.lookup is None:
+            logger.info("未连接数据库，本次完整抓取")
+            return ""
+        last = self.last_full_sweep()
+        # 按日期比较，每晚开始时间的早晚不影响完整抓取的周期
+        if last is None or (date.today() - last.date()).days >= self.full_sweep_days:
+            logger.info("距上次完整抓取(%s)已有 %s 天以上，本次完整抓取", last or '无记录', self.full_sweep_days)
+            return ""
+        self.active = True
+        logger.info("增量抓取，按 %s 排序，连续 %s 页没有变化时停止(上次完整抓取: %s)", self.orderby, self.stop_pages, last)
+        return self.orderby
+
+    def observe(self, products: List[dict]) -> bool:
+        """检查一页数据，返回是否应当停止翻页
+
+        Args:
+            products: 本页接口返回的产品数据
+        """
+        if not self.active or not products:
+            return False
+        self.pages += 1
+        if not self._check_order(products):
+            logger.warning("返回结果未按 %s 排序，本次改为完整抓取", self.orderby)
+            self.active = False
+            return False
+
+        codes = [product.get("cpdjbm") for product in products]
+        known = self.lookup([code for code in codes if code]) if all(codes) else {}
+        unchanged = all(code in known and _same(fingerprint(product), known[code])
+                        for code, product in zip(codes, products))
+        self.stale_pages = self.stale_pages + 1 if unchanged else 0
+        if self.stale_pages >= self.stop_pages:
+            self.stopped = True
+        return self.stopped
+
+    def _check_order(self, products: Iterable[dict]) -> bool:
+        """本页及与上一页之间是否满足排序，缺少排序字段时不检查"""
+        for product in products:
+            key = product.get(self.order_field)
+            if not key:
+                continue
+            if self._last_key is not None and (key > self._last_key if self.descending else key < self._last_key):
+                return False
+            self._last_key = key
+        return True
+
+    def finish(self, total_pages: int, complete: bool):
+        """结束本次抓取
+
+        Args:
+            total_pages: 本次应抓取的总页数
+            complete: 完整抓取是否覆盖了全部页面且没有失败页
+        """
+        metrics = get_metrics()
+        skipped = max(0, total_pages - self.pages) if self.stopped else 0
+        if skipped:
+            logger.info("增量抓取: 连续 %s 页没有变化，抓取 %s 页后停止，跳过 %s 页", self.stale_pages, self.pages, skipped)
+            metrics.inc('delta_pages_skipped_total', skipped, source=self.source)
+        # 增量抓取没有跳过页面时(包括在最后一页才满足停止条件)同样覆盖了全部页面
+        full_sweep = complete and not skipped
+        if full_sweep:
+            self._save_full_sweep(datetime.now())
+        metrics.set('crawl_full_sweep', 1 if full_sweep else 0, source=self.source)
+        self.active = False
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按截止时间安排抓取
+
+每次整页抓取开始时按CRAWL_DEADLINE确定截止时间。取得总数后，按剩余页数和实测的每页耗时
+(请求、下载、重试和写入背压，不含礼貌等待)计算每页可用的时间，在最小请求间隔和配置的
+request_delay之间选择本页的等待时间；每抓取一页重新计算一次。
+
+即使按最小请求间隔也无法在截止前抓完时进入追赶模式：
+- 预留一部分剩余时间，抓取结束后逐个刷新关注产品和近期活跃发行机构的产品
+- 其余时间能抓取的页数作为本次抓取的页数上限，超出的页面本次跳过
+截止前来不及再请求一次时停止，不会超时运行。结束时输出预计与实际的完成时间。
+"""
+
+import math
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+from ..utils.metrics import get_metrics
+from ..utils.scheduler import Schedule
+
+logger = logging.getLogger(__name__)
+
+# 每次请求在基础等待之外的随机等待(1~3秒)的均值，与BaseScraper._wait一致
+JITTER_MEAN = 2.0
+
+# 制定计划时按可用时间的这一比例确定目标完成时间，每页耗时的波动不会使最后几页错过截止时间
+PACING_SHARE = 0.9
+
+
+def _fmt(timestamp: Optional[float]) -> str:
+    """时间戳格式化为时:分:秒"""
+    return datetime.fromtimestamp(timestamp).strftime('%H:%M:%S') if timestamp else '-'
+
+
+class CrawlPlanner:
+    """按截止时间选择请求间隔和抓取页数"""
+
+    def __init__(self, deadline: str, request_delay: float, min_delay: float = 2.0, margin: float = 300.0,
+                 priority_share: float = 0.2, active_issuer_days: int = 7, smoothing: float = 0.3,
+                 clock: Callable[[], float] = time.time):
+        """
+        初始化抓取计划
+
+        Args:
+            deadline: 截止时间，"06:00"表示下一个06:00，"4h"/"90m"表示开始后的时长
+            request_delay: 时间充裕时的请求间隔(秒)
+            min_delay: 礼貌限制允许的最小请求间隔(秒)
+            margin: 截止前预留给入库和导出的秒数
+            priority_share: 追赶模式下预留给重点产品刷新的剩余时间比例
+            active_issuer_days: 选取重点产品时统计发行机构近期活跃度的天数
+            smoothing: 每页耗时指数移动平均的平滑系数
+            clock: 返回当前时间戳的函数，便于替换
+        """
+        self.schedule = Schedule(deadline)
+        self.request_delay = request_delay
+        self.min_delay = min(min_delay, request_delay)
+        self.margin = margin
+        self.priority_share = priority_share
+        self.active_issuer_days = active_issuer_days
+        self.smoothing = smoothing
+        self._clock = clock
+        self.active = False
+        self.deadline = None
+        self._reset()
+
+    @classmethod
+    def from_config(cls, config: Dict, deadline: str = None) -> Optional['CrawlPlanner']:
+        """根据爬虫配置创建抓取计划，未设置截止时间时返回None
+
+        Args:
+            config: get_scraper_config()或get_source_config()返回的配置字典
+            deadline: 覆盖配置的截止时间
+        """
+        deadline = deadline or config['deadline']
+        if not deadline:
+            return None
+        return cls(deadline, request_delay=config['request_delay'], min_delay=config['min_request_delay'],
+                   margin=config['deadline_margin'], priority_share=config['priority_share'],
+                   active_issuer_days=config['active_issuer_days'])
+
+    def _reset(self):
+        self.started_at = None
+        self.total_pages = 0
+        self.page_limit = 0
+        self.pages_done = 0
+        self.products_done = 0
+        self.overhead = None
+        self.delay = self.request_delay
+        self.behind = False
+        self.predicted_finish = None
+        self.target_finish = None
+        self.priority_reserve = 0.0
+        self.seen_codes = set()
+
+    # ---- 抓取过程 ----
+
+    def begin(self):
+        """开始一次整页抓取，确定本次的截止时间"""
+        self._reset()
+        self.started_at = self._clock()
+        self.deadline = self.schedule.next_run(datetime.fromtimestamp(self.started_at)).timestamp()
+        self.active = True
+        logger.info("本次抓取的截止时间: %s", datetime.fromtimestamp(self.deadline).strftime('%Y-%m-%d %H:%M:%S'))
+
+    def plan(self, total_pages: int, first_page_seconds: float):
+        """取得总页数后制定计划，第一页已经抓取
+
+        Args:
+            total_pages: 本次需要抓取的总页数(含第一页)
+            first_page_seconds: 第一页的耗时(秒)，不含会话初始化
+        """
+        self.total_pages = self.page_limit = total_pages
+        self.pages_done = 1
+        now = self._clock()
+        self.target_finish = now + (self.deadline - self.margin - now) * PACING_SHARE
+        self._observe(first_page_seconds)
+        self._replan()
+        self.predicted_finish = self._predict()
+        if self.behind:
+            logger.info("共 %s 页，请求间隔 %.1f 秒，预计 %s 完成，来不及全部抓取，本次最多抓取 %s 页",
+                        total_pages, self.delay, _fmt(self.predicted_finish), self.page_limit)
+        else:
+            logger.info("共 %s 页，请求间隔 %.1f 秒，预计 %s 完成", total_pages, self.delay, _fmt(self.predicted_finish))
+
+    def record_page(self, elapsed: float, codes: Iterable[str] = ()):
+        """记录一页的耗时并重新计算请求间隔
+
+        Args:
+            elapsed: 本页耗时(秒)，含等待、请求、重试和写入背压
+            codes: 本页的产品登记编码
+        """
+        self.pages_done += 1
+        self.seen_codes.update(code for code in codes if code)
+        self._observe(elapsed)
+        self._replan()
+
+    def record_product(self, elapsed: float):
+        """记录一次重点产品刷新的耗时"""
+        self.products_done += 1
+        self._observe(elapsed)
+
+    def _observe(self, elapsed: float):
+        sample = max(0.0, elapsed - self.delay - JITTER_MEAN)
+        if self.overhead is None:
+            self.overhead = sample
+        else:
+            self.overhead += self.smoothing * (sample - self.overhead)
+
+    def _request_cost(self, delay: float) -> float:
+        return (self.overhead or 0.0) + delay + JITTER_MEAN
+
+    def _replan(self):
+        """按剩余时间和剩余页数选择请求间隔，来不及时缩减页数上限
+
+        每页耗时的估计变化后重新判断，估计偏高导致的追赶模式可以恢复。
+        """
+        remaining = self.total_pages - self.pages_done
+        if remaining <= 0:
+            return
+        window = self.deadline - self.margin - self._clock()
+        behind = window < remaining * self._request_cost(self.min_delay)
+        if behind and not self.behind:
+            # 进入追赶模式时预留一部分剩余时间刷新重点产品
+            self.priority_reserve = window * self.priority_share
+            logger.warning("按最小请求间隔仍无法在截止前抓完剩余 %s 页，进入追赶模式", remaining)
+        elif self.behind and not behind:
+            self.priority_reserve = 0.0
+            logger.info("剩余 %s 页可以在截止前抓完，退出追赶模式", remaining)
+        self.behind = behind
+        if behind:
+            # 预留时间之外能抓取的页数作为上限
+            affordable = math.floor((window - self.priority_reserve) / self._request_cost(self.min_delay))
+            self.page_limit = self.pages_done + max(0, affordable)
+            self.delay = self.min_delay
+            return
+        self.page_limit = self.total_pages
+        needed = (self.target_finish - self._clock()) / remaining - (self.overhead or 0.0) - JITTER_MEAN
+        self.delay = min(self.request_delay, max(self.min_delay, needed))
+
+    def _predict(self) -> float:
+        return self._clock() + (self.page_limit - self.pages_done) * self._request_cost(self.delay)
+
+    def current_delay(self, default: float) -> float:
+        """本次请求的基础等待时间，未在计划中时返回default"""
+        return self.delay if self.active else default
+
+    def should_fetch(self, page: int) -> bool:
+        """是否继续抓取指定页
+
+        Args:
+            page: 页码
+        """
+        return page <= self.page_limit and self.has_time()
+
+    def has_time(self) -> bool:
+        """截止前是否还来得及再请求一次"""
+        return self._clock() + self._request_cost(self.delay) <= self.deadline - self.margin
+
+    # ---- 结束 ----
+
+    def finish(self, source: str = '') -> Dict:
+        """结束本次计划，输出并返回预计与实际的完成情况
+
+        Args:
+            source: 数据源名称，用于指标标签
+        """
+        if not self.active:
+            return {}
+        finished = self._clock()
+        report = {
+            'deadline': datetime.fromtimestamp(self.deadline),
+            'predicted_finish': datetime.fromtimestamp(self.predicted_finish) if self.predicted_finish else None,
+            'finished': datetime.fromtimestamp(finished),
+            'slack_seconds': round(self.deadline - finished, 1),
+            'total_pages': self.total_pages,
+            'pages_fetched': self.pages_done,
+            'pages_skipped': max(0, self.total_pages - self.pages_done),
+            'priority_products': self.products_done,
+            'delay': round(self.delay, 2),
+            'behind': self.behind,
+        }
+        self.active = False
+        self.delay = self.request_delay
+
+        metrics = get_metrics()
+        metrics.set('crawl_deadline_slack_seconds', report['slack_seconds'], source=source)
+        if self.predicted_finish:
+            metrics.set('crawl_prediction_error_seconds', round(finished - self.predicted_finish, 1), source=source)
+        metrics.inc('crawl_pages_skipped_total', report['pages_skipped'], source=source)
+        message = "抓取计划: 截止 %s，预计 %s 完成，实际 %s 完成，抓取 %s/%s 页，刷新重点产品 %s 个"
+        args = (_fmt(self.deadline), _fmt(self.predicted_finish), _fmt(finished), report['pages_fetched'],
+                report['total_pages'], report['priority_products'])
+        if report['slack_seconds'] < 0:
+            logger.warning(message + "，超出截止时间 %.0f 秒", *args, -report['slack_seconds'])
+        else:
+            logger.info(message + "，距截止还有 %.0f 秒", *args, report['slack_seconds'])
+        return report
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+请求速率限制
+每个数据源持有独立的令牌桶，多个数据源并行抓取时互不影响。
+"""
+
+import threading
+import time
+from typing import Callable
+
+from ..utils.metrics import get_metrics
+
+
+class RateLimiter:
+    """令牌桶速率限制器，线程安全"""
+
+    def __init__(self, rate: float = 0.0, burst: int = 1, name: str = '',
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化速率限制器
+
+        Args:
+            rate: 每秒允许的请求数，0表示不限制
+            burst: 令牌桶容量，允许的突发请求数
+            name: 数据源名称，用于指标标签
+            sleep: 等待函数，便于替换
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.name = name
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """获取一个令牌，令牌不足时等待
+
+        Returns:
+            等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 预先扣除令牌，并发调用方按顺序排队
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            self._sleep(wait)
+            get_metrics().inc('wait_seconds_total', wait, reason='rate_limit', source=self.name)
+        return wait
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+抓取结果记录类型与整页转换
+
+使用__slots__定义紧凑的产品记录和净值记录，按整页批量转换接口数据，
+抓取时间等公共字段每页只计算一次。记录对象实现了映射协议
+(keys/__getitem__/get/items)，可以直接传给DatabaseManager或Product(**record)。
+"""
+
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 接口中表示空净值的取值
+_NAV_NULL_VALUES = frozenset(["--", "null", "NULL", "None"])
+
+# build_product_record和build_nav_record读取的接口字段，解码时每条产品只保留这些字段
+PRODUCT_FIELDS = frozenset([
+    "id", "cpdjbm", "copy", "cpms", "fxjgms", "fxjgdm", "fxdjms", "cpfxdj",
+    "cptzxzms", "cptzxz", "mjbz", "qxms", "qdxsjef", "syztdm", "cpxsqy",
+    "cpqsrq", "cpyjzzrq", "cplx", "cpsylx", "sfxcp", "csjz", "ljjz", "cpjz",
+])
+
+
+class _SlottedRecord:
+    """紧凑记录基类，提供与字典兼容的只读访问接口"""
+
+    __slots__ = ()
+
+    def keys(self) -> Tuple[str, ...]:
+        """字段名列表"""
+        return self.__slots__
+
+    def __getitem__(self, key: str):
+        """按字段名取值"""
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key) -> bool:
+        """是否包含字段"""
+        return key in self.__slots__
+
+    def __iter__(self):
+        """遍历字段名"""
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        """字段数量"""
+        return len(self.__slots__)
+
+    def get(self, key: str, default=None):
+        """按字段名取值，不存在时返回默认值"""
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def items(self):
+        """(字段名, 值)列表"""
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def to_dict(self) -> dict:
+        """转换为普通字典"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        """按字段值比较"""
+        if isinstance(other, _SlottedRecord):
+            return self.__slots__ == other.__slots__ and self.items() == other.items()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<{type(self).__name__}(product_code='{self.product_code}')>"
+
+
+class ProductRecord(_SlottedRecord):
+    """产品基本信息记录，字段与Product模型一致"""
+
+    __slots__ = (
+        'product_id', 'product_code', 'product_name', 'issuer', 'issuer_code',
+        'risk_level', 'risk_level_code', 'product_type', 'product_type_code',
+        'currency', 'investment_period', 'min_investment', 'sale_status',
+        'sale_regions', 'start_date', 'end_date', 'product_category',
+        'income_type', 'sale_method', 'crawl_time',
+    )
+
+    def __init__(self, product_id, product_code, product_name, issuer, issuer_code,
+                 risk_level, risk_level_code, product_type, product_type_code,
+                 currency, investment_period, min_investment, sale_status,
+                 sale_regions, start_date, end_date, product_category,
+                 income_type, sale_method, crawl_time):
+        self.product_id = product_id
+        self.product_code = product_code
+        self.product_name = product_name
+        self.issuer = issuer
+        self.issuer_code = issuer_code
+        self.risk_level = risk_level
+        self.risk_level_code = risk_level_code
+        self.product_type = product_type
+        self.product_type_code = product_type_code
+        self.currency = currency
+        self.investment_period = investment_period
+        self.min_investment = min_investment
+        self.sale_status = sale_status
+        self.sale_regions = sale_regions
+        self.start_date = start_date
+        self.end_date = end_date
+        self.product_category = product_category
+        self.income_type = income_type
+        self.sale_method = sale_method
+        self.crawl_time = crawl_time
+
+
+class NavRecord(_SlottedRecord):
+    """产品净值记录，字段与save_product_navs的输入一致"""
+
+    __slots__ = (
+        'product_id', 'product_code', 'initial_nav', 'accumulated_nav',
+        'current_nav', 'nav_date', 'crawl_time',
+    )
+
+    def __init__(self, product_id, product_code, initial_nav, accumulated_nav,
+                 current_nav, nav_date, crawl_time):
+        self.product_id = product_id
+        self.product_code = product_code
+        self.initial_nav = initial_nav
+        self.accumulated_nav = accumulated_nav
+        self.current_nav = current_nav
+        self.nav_date = nav_date
+        self.crawl_time = crawl_time
+
+
+def parse_nav(value) -> Optional[float]:
+    """解析净值字符串
+
+    Args:
+        value: 原始净值，可能为字符串、数字或空值
+
+    Returns:
+        大于0的净值浮点数，无效值返回None
+    """
+    if not value or value in _NAV_NULL_VALUES:
+        return None
+    try:
+        nav = float(value)
+    except (ValueError, TypeError):
+        return None
+    return nav if nav > 0 else None
+
+
+def get_product_name(product_data: dict) -> str:
+    """获取产品名称，优先使用copy列表中的名称
+
+    Args:
+        product_data: 原始产品数据
+
+    Returns:
+        产品名称字符串
+    """
+    copy_list = product_data.get("copy")
+    if isinstance(copy_list, list) and len(copy_list) > 2:
+        return copy_list[2]
+    return product_data.get("cpms", "")
+
+
+def build_product_record(product_data: dict, crawl_time: str) -> ProductRecord:
+    """将单条接口数据转换为产品记录
+
+    Args:
+        product_data: 原始产品数据
+        crawl_time: 抓取时间字符串
+
+    Returns:
+        产品记录，产品登记编码为空时使用UNKNOWN_{id}
+    """
+    get = product_data.get
+    product_code = get("cpdjbm") or f"UNKNOWN_{get('id', '')}"
+    return ProductRecord(
+        get("id", ""), product_code, get_product_name(product_data),
+        get("fxjgms", ""), get("fxjgdm", ""), get("fxdjms", ""), get("cpfxdj", ""),
+        get("cptzxzms", ""), get("cptzxz", ""), get("mjbz", ""), get("qxms", ""),
+        get("qdxsjef", ""), get("syztdm", ""), get("cpxsqy", ""), get("cpqsrq", ""),
+        get("cpyjzzrq", ""), get("cplx", ""), get("cpsylx", ""), get("sfxcp", ""),
+        crawl_time,
+    )
+
+
+def build_nav_record(product_data: dict, nav_date: str, crawl_time: str) -> Optional[NavRecord]:
+    """将单条接口数据转换为净值记录
+
+    Args:
+        product_data: 原始产品数据
+        nav_date: 净值日期字符串
+        crawl_time: 抓取时间字符串
+
+    Returns:
+        净值记录，产品登记编码为空或无有效净值时返回None
+    """
+    get = product_data.get
+    product_code = get("cpdjbm")
+    if not product_code:
+        return None
+
+    initial_nav = parse_nav(get("csjz"))
+    accumulated_nav = parse_nav(get("ljjz"))
+    current_nav = parse_nav(get("cpjz"))
+    if initial_nav is None and accumulated_nav is None and current_nav is None:
+        return None
+
+    return NavRecord(get("id", ""), product_code, initial_nav, accumulated_nav,
+                     current_nav, nav_date, crawl_time)
+
+
+def transform_page(products: Iterable[dict],
+                   now: datetime = None) -> Tuple[List[ProductRecord], List[NavRecord]]:
+    """将一整页接口数据批量转换为产品记录和净值记录
+
+    Args:
+        products: 接口返回的产品数据列表
+        now: 抓取时间，默认为当前时间，整页共用
+
+    Returns:
+        (产品记录列表, 净值记录列表)
+    """
+    now = now or datetime.now()
+    crawl_time = now.strftime("%Y-%m-%d %H:%M:%S")
+    nav_date = now.strftime("%Y-%m-%d")
+
+    product_records = []
+    nav_records = []
+    missing_code_count = 0
+    for product_data in products:
+        try:
+            product_records.append(build_product_record(product_data, crawl_time))
+            nav_record = build_nav_record(product_data, nav_date, crawl_time)
+            if nav_record is not None:
+                nav_records.append(nav_record)
+            elif not product_data.get("cpdjbm"):
+                missing_code_count += 1
+        except Exception as e:
+            logger.error("处理产品数据时出错: %s", e)
+            continue
+
+    if missing_code_count:
+        logger.warning("本页有 %s 条产品登记编码为空，已使用默认值并跳过净值处理", missing_code_count)
+
+    return product_records, nav_records
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+爬虫注册表
+BaseScraper子类通过register_scraper按数据源名称注册，抓取命令和守护进程
+按SCRAPER_SOURCES配置的名称创建爬虫，不再直接依赖具体的爬虫类。
+"""
+
+import importlib
+from typing import Dict, List, Optional, Type
+
+# 数据源名称 -> 爬虫类
+SCRAPERS: Dict[str, Type] = {}
+
+# 内置数据源所在的模块，首次使用时才导入
+_BUILTIN_MODULES = {
+    'chinawealth': 'src.scrapers.chinawealth_scraper',
+}
+
+
+def register_scraper(name: str):
+    """注册爬虫类的装饰器，同时设置类的SOURCE属性
+
+    Args:
+        name: 数据源名称
+    """
+    def decorator(cls):
+        cls.SOURCE = name
+        SCRAPERS[name] = cls
+        return cls
+    return decorator
+
+
+def available_sources() -> List[str]:
+    """可用的数据源名称"""
+    return sorted(set(SCRAPERS) | set(_BUILTIN_MODULES))
+
+
+def get_scraper_class(name: str) -> Type:
+    """按数据源名称获取爬虫类
+
+    Args:
+        name: 数据源名称，也可以是"模块路径:类名"形式的外部爬虫
+
+    Returns:
+        爬虫类
+
+    Raises:
+        ValueError: 数据源不存在
+    """
+    if name not in SCRAPERS:
+        if ':' in name:
+            module_name, class_name = name.split(':', 1)
+            cls = getattr(importlib.import_module(module_name), class_name)
+            # 外部爬虫未声明SOURCE时使用类名作为数据来源标记
+            SCRAPERS[name] = register_scraper(cls.__dict__.get('SOURCE') or class_name.lower())(cls)
+            return cls
+        if name in _BUILTIN_MODULES:
+            importlib.import_module(_BUILTIN_MODULES[name])
+    if name not in SCRAPERS:
+        raise ValueError(f"未知的数据源: {name}，可用的数据源: {', '.join(available_sources())}")
+    return SCRAPERS[name]
+
+
+def create_scraper(name: str, config: Optional[Dict] = None, **kwargs):
+    """按数据源名称和配置创建爬虫实例
+
+    Args:
+        name: 数据源名称
+        config: 爬虫配置，默认为get_source_config(数据源的SOURCE)
+        **kwargs: 覆盖配置的其他参数
+
+    Returns:
+        爬虫实例
+    """
+    cls = get_scraper_class(name)
+    if config is None:
+        from src.config.config import get_source_config
+        config = get_source_config(cls.SOURCE)
+    return cls.from_config(config, **kwargs)
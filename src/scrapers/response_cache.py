@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTTP响应缓存
+
+按规范化后的请求参数计算缓存键，将成功解析的响应体压缩后保存在本地SQLite文件中。
+每条记录有各自的过期时间，总大小超过上限时按最近访问时间淘汰。
+同一天内重新运行抓取时，命中缓存的页面不再等待也不再请求上游网站。
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+from ..utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(method: str, url: str, params: Dict) -> str:
+    """计算请求的缓存键
+
+    参数按名称排序、取值统一转为字符串，参数顺序和类型不同但内容相同的请求得到相同的键。
+
+    Args:
+        method: 请求方法
+        url: 请求地址
+        params: 请求参数
+
+    Returns:
+        SHA-256十六进制字符串
+    """
+    normalized = '&'.join(f"{name}={'' if value is None else value}"
+                          for name, value in sorted(params.items()))
+    return hashlib.sha256(f"{method.upper()} {url}?{normalized}".encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """本地HTTP响应缓存"""
+
+    def __init__(self, path: str, ttl: float = 43200, max_bytes: int = 200 * 1024 * 1024,
+                 max_age: Optional[float] = None):
+        """
+        初始化响应缓存
+
+        Args:
+            path: 缓存数据库文件路径
+            ttl: 新写入记录的有效期(秒)
+            max_bytes: 缓存压缩后的总大小上限(字节)
+            max_age: 读取时可接受的最大缓存时长(秒)，为None表示只按记录自身的有效期判断，0表示不使用缓存
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Dict, max_age: Optional[float] = None) -> Optional['ResponseCache']:
+        """根据爬虫配置创建响应缓存
+
+        Args:
+            config: get_scraper_config()返回的配置字典
+            max_age: 命令行指定的最大缓存时长(秒)，覆盖默认判断
+
+        Returns:
+            响应缓存对象，未启用缓存时返回None
+        """
+        if not config['cache_enabled']:
+            return None
+        return cls(
+            os.path.join(config['cache_dir'], 'http_responses.db'),
+            ttl=config['cache_ttl'],
+            max_bytes=int(config['cache_max_mb'] * 1024 * 1024),
+            max_age=max_age
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存的响应体
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            解压后的响应体，未命中或已过期时返回None
+        """
+        if self.max_age == 0:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                body, created_at, expires_at = row
+                if now >= expires_at:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    row = None
+                elif self.max_age is not None and now - created_at > self.max_age:
+                    row = None
+                else:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+
+        if row is None:
+            get_metrics().inc('http_cache_total', result='miss')
+            return None
+        get_metrics().inc('http_cache_total', result='hit')
+        return zlib.decompress(body)
+
+    def put(self, key: str, url: str, body: bytes, ttl: Optional[float] = None):
+        """写入响应体，总大小超过上限时淘汰最久未访问的记录
+
+        Args:
+            key: 缓存键
+            url: 请求地址，便于排查
+            body: 原始响应体
+            ttl: 本条记录的有效期(秒)，默认使用初始化时的ttl
+        """
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, body, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, compressed, len(compressed), now, now + (self.ttl if ttl is None else ttl), now)
+            )
+            self._evict(now)
+            self._conn.commit()
+        get_metrics().inc('http_cache_bytes_written_total', len(compressed))
+
+    def _evict(self, now: float):
+        """删除过期记录，并按最近访问时间淘汰到总大小上限的90%以内(调用方需持有锁)"""
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        get_metrics().inc('http_cache_evictions_total', evicted)
+        logger.debug("响应缓存超过上限，淘汰 %s 条记录", evicted)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """缓存记录数和压缩后总大小"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'entries': count, 'bytes': size}
+
+    def close(self):
+        """关闭缓存数据库"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+统一重试策略
+
+将单页重试次数、整次抓取的重试预算和熔断器集中在一处管理，
+替代urllib3 Retry与_fetch_page各自重试叠加的做法，
+保证异常情况下抓取能快速降级而不是长时间挂起。
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict
+
+from ..utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# 重试原因
+CAUSE_NETWORK = 'network'            # 连接失败、超时等网络错误
+CAUSE_THROTTLED = 'throttled'        # HTTP 429
+CAUSE_SERVER_ERROR = 'server_error'  # HTTP 5xx
+CAUSE_HTTP_ERROR = 'http_error'      # 其他HTTP错误状态
+CAUSE_API_ERROR = 'api_error'        # 接口返回code=error，可能触发了访问限制
+CAUSE_DECODE_ERROR = 'decode_error'  # 响应不是合法JSON
+CAUSE_EMPTY = 'empty'                # 返回空数据
+
+# 重试时需要重新初始化会话的原因
+SESSION_RESET_CAUSES = frozenset([CAUSE_API_ERROR, CAUSE_THROTTLED])
+
+# 每页尝试次数直方图的分桶
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 10)
+
+
+class CircuitOpenError(Exception):
+    """熔断器多次打开后放弃本次抓取"""
+
+
+class CircuitBreaker:
+    """熔断器
+
+    在滑动窗口内统计请求失败率，超过阈值时打开熔断器并暂停请求，
+    冷却期结束后进入半开状态放行一个探测请求：成功则关闭，失败则再次打开。
+    打开次数超过上限时抛出CircuitOpenError终止抓取。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, error_rate: float = 0.5, window: int = 20, min_requests: int = 10,
+                 cooldown: float = 300.0, max_trips: int = 3,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化熔断器
+
+        Args:
+            error_rate: 触发熔断的失败率阈值
+            window: 统计失败率的滑动窗口大小(请求数)
+            min_requests: 窗口内至少有多少请求才判断失败率
+            cooldown: 熔断后暂停的时长(秒)
+            max_trips: 单次抓取允许熔断的最大次数
+            sleep: 暂停函数，便于替换
+        """
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self._sleep = sleep
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.trips = 0
+        self.paused_seconds = 0.0
+
+    def reset(self):
+        """重置熔断器状态"""
+        with self._lock:
+            self._outcomes.clear()
+            self.state = self.CLOSED
+            self.trips = 0
+            self.paused_seconds = 0.0
+
+    def before_request(self):
+        """请求前检查，熔断器打开时暂停直到冷却结束
+
+        Raises:
+            CircuitOpenError: 熔断次数已超过上限
+        """
+        with self._lock:
+            if self.state != self.OPEN:
+                return
+            if self.trips > self.max_trips:
+                raise CircuitOpenError(f"熔断器已打开 {self.trips} 次，放弃本次抓取")
+            cooldown = self.cooldown
+
+        logger.warning("请求失败率过高，熔断器打开，暂停 %.0f 秒", cooldown)
+        self._sleep(cooldown)
+        get_metrics().inc('wait_seconds_total', cooldown, reason='circuit_breaker')
+        with self._lock:
+            self.paused_seconds += cooldown
+            if self.state == self.OPEN:
+                self.state = self.HALF_OPEN
+
+    def record(self, success: bool):
+        """记录一次请求结果
+
+        Args:
+            success: 请求是否成功
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if success:
+                    logger.info("探测请求成功，熔断器关闭")
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+
+            self._outcomes.append(success)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_requests:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.error_rate:
+                    self._trip()
+
+    def _trip(self):
+        """打开熔断器(调用方需持有锁)"""
+        self.state = self.OPEN
+        self.trips += 1
+        self._outcomes.clear()
+
+
+class RetryBudget:
+    """整次抓取共享的重试预算"""
+
+    def __init__(self, total: int):
+        """
+        初始化重试预算
+
+        Args:
+            total: 允许的重试总次数，0表示不限制
+        """
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """重置已用次数"""
+        with self._lock:
+            self.used = 0
+
+    def consume(self) -> bool:
+        """消耗一次重试
+
+        Returns:
+            预算是否充足
+        """
+        with self._lock:
+            if self.total and self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def exhausted(self) -> bool:
+        """预算是否已耗尽"""
+        return bool(self.total) and self.used >= self.total
+
+
+class RetryPolicy:
+    """抓取重试策略
+
+    统一决定一次失败后是否重试、等待多久，并统计每页的尝试次数和各类重试原因。
+    """
+
+    def __init__(self, max_attempts: int = 5, budget: int = 50, empty_retries: int = 1,
+                 backoff_base: float = 2.0, backoff_max: float = 60.0,
+                 breaker: CircuitBreaker = None):
+        """
+        初始化重试策略
+
+        Args:
+            max_attempts: 单页最大尝试次数(含首次请求)
+            budget: 整次抓取的重试预算，0表示不限制
+            empty_retries: 返回空数据时的最大重试次数
+            backoff_base: 指数退避的基数(秒)
+            backoff_max: 单次退避的最长时间(秒)
+            breaker: 熔断器，默认使用默认参数创建
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.empty_retries = empty_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = RetryBudget(budget)
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self.page_attempts: Dict[object, int] = {}
+        self.retry_causes = Counter()
+        self.failed_pages = []
+
+    @classmethod
+    def from_config(cls, config: dict, sleep: Callable[[float], None] = time.sleep) -> 'RetryPolicy':
+        """根据爬虫配置创建重试策略
+
+        Args:
+            config: get_scraper_config()返回的配置字典
+            sleep: 熔断暂停函数
+
+        Returns:
+            重试策略对象
+        """
+        breaker = CircuitBreaker(
+            error_rate=config['breaker_error_rate'],
+            window=config['breaker_window'],
+            min_requests=config['breaker_min_requests'],
+            cooldown=config['breaker_cooldown'],
+            max_trips=config['breaker_max_trips'],
+            sleep=sleep
+        )
+        return cls(
+            max_attempts=config['retry_times'],
+            budget=config['retry_budget'],
+            empty_retries=config['empty_page_retries'],
+            backoff_base=config['backoff_base'],
+            backoff_max=config['backoff_max'],
+            breaker=breaker
+        )
+
+    def reset(self):
+        """开始新一次抓取时重置预算、熔断器和统计"""
+        self.budget.reset()
+        self.breaker.reset()
+        with self._lock:
+            self.page_attempts.clear()
+            self.retry_causes.clear()
+            self.failed_pages = []
+
+    def before_request(self):
+        """请求前检查熔断器"""
+        self.breaker.before_request()
+
+    def record_success(self, page, attempt: int):
+        """记录请求成功
+
+        Args:
+            page: 页标识
+            attempt: 本页第几次尝试
+        """
+        self.breaker.record(True)
+        with self._lock:
+            self.page_attempts[page] = attempt
+        get_metrics().observe('page_attempts', attempt, buckets=ATTEMPT_BUCKETS, result='success')
+
+    def record_failure(self, page, attempt: int, cause: str) -> bool:
+        """记录请求失败并决定是否重试
+
+        Args:
+            page: 页标识
+            attempt: 本页第几次尝试
+            cause: 失败原因
+
+        Returns:
+            是否应当重试
+        """
+        # 空数据不代表服务端异常，不计入熔断器
+        if cause != CAUSE_EMPTY:
+            self.breaker.record(False)
+
+        with self._lock:
+            self.page_attempts[page] = attempt
+
+        if cause == CAUSE_EMPTY and attempt > self.empty_retries:
+            should_retry = False
+        elif attempt >= self.max_attempts:
+            should_retry = False
+        elif not self.budget.consume():
+            logger.warning("重试预算已耗尽(%s/%s)，不再重试", self.budget.used, self.budget.total, extra={'page': page})
+            should_retry = False
+        else:
+            should_retry = True
+
+        with self._lock:
+            if should_retry:
+                self.retry_causes[cause] += 1
+            else:
+                self.failed_pages.append(page)
+        metrics = get_metrics()
+        metrics.inc('request_failures_total', cause=cause)
+        if should_retry:
+            metrics.inc('retries_total', cause=cause)
+        else:
+            metrics.observe('page_attempts', attempt, buckets=ATTEMPT_BUCKETS, result='failed')
+        return should_retry
+
+    def backoff(self, attempt: int) -> float:
+        """计算第attempt次失败后的退避时长(秒)
+
+        Args:
+            attempt: 已失败的次数
+
+        Returns:
+            退避秒数，带随机抖动
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def summary(self) -> Dict:
+        """获取本次抓取的重试统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            attempts = Counter(self.page_attempts.values())
+            return {
+                'pages': len(self.page_attempts),
+                'attempts_histogram': dict(sorted(attempts.items())),
+                'retries': sum(self.retry_causes.values()),
+                'retry_causes': dict(self.retry_causes),
+                'failed_pages': list(self.failed_pages),
+                'budget_used': self.budget.used,
+                'budget_total': self.budget.total,
+                'breaker_trips': self.breaker.trips,
+                'breaker_paused_seconds': self.breaker.paused_seconds,
+            }
@@ -7,13 +7,17 @@
 """
 
 import os
+import time
 import argparse
 import logging
-import pandas as pd
-from sqlalchemy import create_engine, text
+from contextlib import contextmanager
 from datetime import datetime
 
-from src.config.config import setup_logging, get_database_url
+from src.config.config import setup_logging, get_database_url, get_metrics_config, get_mysql_config
+from src.utils.metrics import get_metrics, RunTracker
+from src.utils.profiler import get_profiler, enable_profiling, disable_profiling
+
+# pandas和SQLAlchemy导入较慢，仅在实际导出时加载
 
 logger = logging.getLogger(__name__)
 
@@ -24,18 +28,36 @@ class DataExporter:
     支持导出产品基本信息、净值信息以及联合查询数据。
     """
 
-    def __init__(self, db_url=None, output_dir=None):
+    def __init__(self, db_url=None, output_dir=None, engine=None):
         """
         初始化数据导出器
         
         Args:
             db_url: 数据库连接URL，默认使用配置文件中的设置
             output_dir: 输出目录，默认为'data/export'
+            engine: 已有的数据库引擎，传入时复用该引擎而不再新建连接池
         """
-        self.db_url = db_url or get_database_url()
+        if engine is not None:
+            self.db_url = str(engine.url)
+            self.engine = engine
+        else:
+            self.db_url = db_url or get_database_url()
+            
+            # 创建数据库引擎，SQLite使用WAL等性能配置
+            from src.database.engine import create_db_engine
+            self.engine = create_db_engine(self.db_url)
         
-        # 创建数据库引擎
-        self.engine = create_engine(self.db_url)
+        # 当前打开的快照连接，查询优先使用该连接
+        self._snapshot_conn = None
+        # 净值查询读取的表或视图，首次查询时确定
+        self._nav_table = None
+        
+        # MySQL导出CSV时用无缓冲的服务端游标分块读取并逐块写文件，不在客户端缓存整个结果集
+        self.stream_chunk_rows = 0
+        if self.engine.dialect.name == 'mysql':
+            mysql_config = get_mysql_config()
+            if mysql_config['stream_exports']:
+                self.stream_chunk_rows = mysql_config['stream_chunk_rows']
         
         # 设置输出目录
         self.output_dir = output_dir or os.path.join(os.getcwd(), 'data', 'export')
@@ -44,13 +66,92 @@ class DataExporter:
         # 当前时间戳（用于文件名）
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        logger.info(f"数据导出工具初始化完成，输出目录: {self.output_dir}")
+        logger.info("数据导出工具初始化完成，输出目录: %s", self.output_dir)
+        
+    def _read_sql(self, query, name, chunksize=None):
+        """执行查询并返回DataFrame
+        
+        Args:
+            query: SQL查询语句
+            name: 查询名称，用于记录耗时指标
+            chunksize: 每块的行数，指定时以服务端游标流式读取，返回DataFrame迭代器
+            
+        Returns:
+            查询结果的DataFrame，或逐块的DataFrame迭代器
+        """
+        import pandas as pd
+        from sqlalchemy import text
+        if chunksize:
+            statement = text(query).execution_options(stream_results=True, max_row_buffer=chunksize)
+            return self._read_sql_chunks(statement, name, chunksize)
+        with get_profiler().stage('read_sql'), get_metrics().timer('export_query_duration_seconds', query=name):
+            return pd.read_sql(text(query), self._snapshot_conn or self.engine)
+    
+    def _read_sql_chunks(self, statement, name, chunksize):
+        """逐块读取流式查询结果，只统计读取本身的耗时
+        
+        服务端游标在读完之前占用连接，调用方需要读完一个查询再执行下一个。
+        """
+        import pandas as pd
+        elapsed = 0.0
+        begin = time.perf_counter()
+        try:
+            for chunk in pd.read_sql(statement, self._snapshot_conn, chunksize=chunksize):
+                elapsed += time.perf_counter() - begin
+                yield chunk
+                begin = time.perf_counter()
+            elapsed += time.perf_counter() - begin
+        finally:
+            get_metrics().observe('export_query_duration_seconds', elapsed, query=name)
+    
+    @contextmanager
+    def snapshot(self):
+        """在同一个读事务中执行其中的所有查询
+        
+        可以嵌套使用，内层直接复用外层的快照，抓取在此期间写入的数据不会出现在导出结果中。
+        """
+        if self._snapshot_conn is not None:
+            yield self._snapshot_conn
+            return
+        
+        from src.database.engine import snapshot_connection
+        with snapshot_connection(self.engine) as conn:
+            self._snapshot_conn = conn
+            try:
+                yield conn
+            finally:
+                self._snapshot_conn = None
+    
+    def _resolve_nav_table(self):
+        """净值查询读取汇总各月分区的视图
+        
+        导出只读数据库，不创建视图。视图不存在时(旧数据库尚未被抓取或维护命令升级)退回热表并给出警告。
+        """
+        if self._nav_table is None:
+            from sqlalchemy import inspect
+            from src.database.partitions import ALL_VIEW, HOT_TABLE
+            if ALL_VIEW in inspect(self.engine).get_view_names():
+                self._nav_table = ALL_VIEW
+            else:
+                logger.warning("数据库中没有净值汇总视图 %s，只导出热表 %s 中的净值", ALL_VIEW, HOT_TABLE)
+                self._nav_table = HOT_TABLE
+        return self._nav_table
+    
+    def _load_data(self):
+        """从同一个快照读取产品、净值和联合数据
         
-    def _get_products_data(self):
+        Returns:
+            (产品DataFrame, 净值DataFrame, 联合数据DataFrame)
+        """
+        self._resolve_nav_table()
+        with self.snapshot():
+            return self._get_products_data(), self._get_navs_data(), self._get_combined_data()
+    
+    def _get_products_data(self, chunksize=None):
         """获取产品基本信息数据
         
         Returns:
-            产品基本信息的DataFrame
+            产品基本信息的DataFrame，指定chunksize时为逐块的迭代器
         """
         query = """
         SELECT 
@@ -66,36 +167,36 @@ class DataExporter:
         ORDER BY 
             p.product_code, p.id
         """
-        return pd.read_sql(text(query), self.engine)
+        return self._read_sql(query, 'products', chunksize)
     
-    def _get_navs_data(self):
+    def _get_navs_data(self, chunksize=None):
         """获取产品净值数据
         
         Returns:
-            产品净值数据的DataFrame
+            产品净值数据的DataFrame，指定chunksize时为逐块的迭代器
         """
-        query = """
+        query = f"""
         SELECT 
             n.id, n.product_id, n.product_code, p.product_name,
             n.nav_date, n.initial_nav, n.accumulated_nav, n.current_nav,
             n.is_updated, n.last_update_date, n.crawl_time,
             n.created_at, n.updated_at
         FROM 
-            product_navs n
+            {self._resolve_nav_table()} n
         LEFT JOIN
             products p ON n.product_code = p.product_code
         ORDER BY 
             n.product_code, n.nav_date DESC
         """
-        return pd.read_sql(text(query), self.engine)
+        return self._read_sql(query, 'navs', chunksize)
     
-    def _get_combined_data(self):
+    def _get_combined_data(self, chunksize=None):
         """获取产品与净值的联合数据
         
         Returns:
-            产品信息与净值数据关联后的DataFrame
+            产品信息与净值数据关联后的DataFrame，指定chunksize时为逐块的迭代器
         """
-        query = """
+        query = f"""
         SELECT 
             p.product_id, p.product_code, p.product_name, 
             p.issuer, p.risk_level, p.product_type,
@@ -106,11 +207,11 @@ class DataExporter:
         FROM 
             products p
         LEFT JOIN
-            product_navs n ON p.product_code = n.product_code
+            {self._resolve_nav_table()} n ON p.product_code = n.product_code
         ORDER BY 
             p.product_code, n.nav_date DESC
         """
-        return pd.read_sql(text(query), self.engine)
+        return self._read_sql(query, 'combined', chunksize)
     
     def export_to_csv(self):
         """导出数据到CSV文件
@@ -118,23 +219,33 @@ class DataExporter:
         Returns:
             包含导出文件路径的字典
         """
-        # 导出产品基本信息
-        products_df = self._get_products_data()
+        start_time = time.perf_counter()
         products_file = os.path.join(self.output_dir, f'products_{self.timestamp}.csv')
-        products_df.to_csv(products_file, index=False, encoding='utf-8-sig')
-        logger.info(f"成功导出 {len(products_df)} 条产品信息到 {products_file}")
-        
-        # 导出净值数据
-        navs_df = self._get_navs_data()
         navs_file = os.path.join(self.output_dir, f'navs_{self.timestamp}.csv')
-        navs_df.to_csv(navs_file, index=False, encoding='utf-8-sig')
-        logger.info(f"成功导出 {len(navs_df)} 条净值信息到 {navs_file}")
-        
-        # 导出联合数据
-        combined_df = self._get_combined_data()
         combined_file = os.path.join(self.output_dir, f'combined_{self.timestamp}.csv')
-        combined_df.to_csv(combined_file, index=False, encoding='utf-8-sig')
-        logger.info(f"成功导出 {len(combined_df)} 条联合数据到 {combined_file}")
+        
+        if self.stream_chunk_rows:
+            # 三个查询在同一个快照中依次流式读取，边读边写文件
+            self._resolve_nav_table()
+            with self.snapshot():
+                products_rows = self._write_csv_chunks(self._get_products_data(self.stream_chunk_rows), products_file)
+                navs_rows = self._write_csv_chunks(self._get_navs_data(self.stream_chunk_rows), navs_file)
+                combined_rows = self._write_csv_chunks(self._get_combined_data(self.stream_chunk_rows), combined_file)
+        else:
+            # 三份数据来自同一个快照，写文件时不再占用读事务
+            products_df, navs_df, combined_df = self._load_data()
+            products_df.to_csv(products_file, index=False, encoding='utf-8-sig')
+            navs_df.to_csv(navs_file, index=False, encoding='utf-8-sig')
+            combined_df.to_csv(combined_file, index=False, encoding='utf-8-sig')
+            products_rows, navs_rows, combined_rows = len(products_df), len(navs_df), len(combined_df)
+        
+        logger.info("成功导出 %s 条产品信息到 %s", products_rows, products_file)
+        logger.info("成功导出 %s 条净值信息到 %s", navs_rows, navs_file)
+        logger.info("成功导出 %s 条联合数据到 %s", combined_rows, combined_file)
+        
+        metrics = get_metrics()
+        metrics.observe('export_duration_seconds', time.perf_counter() - start_time, format='csv')
+        metrics.inc('export_rows_total', products_rows + navs_rows + combined_rows, format='csv')
         
         return {
             'products': products_file,
@@ -142,67 +253,123 @@ class DataExporter:
             'combined': combined_file
         }
     
+    @staticmethod
+    def _write_csv_chunks(chunks, path):
+        """将逐块的DataFrame依次追加写入同一个CSV文件
+        
+        Returns:
+            写入的行数
+        """
+        rows = 0
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            for index, chunk in enumerate(chunks):
+                chunk.to_csv(f, index=False, header=index == 0)
+                rows += len(chunk)
+        return rows
+    
     def export_to_excel(self):
         """导出数据到Excel文件
         
         Returns:
             Excel文件路径
         """
+        start_time = time.perf_counter()
         excel_file = os.path.join(self.output_dir, f'financial_products_{self.timestamp}.xlsx')
         
+        # 三份数据来自同一个快照
+        products_df, navs_df, combined_df = self._load_data()
+        
         # 创建Excel写入器
+        import pandas as pd
         with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
             # 导出产品基本信息
-            products_df = self._get_products_data()
             products_df.to_excel(writer, sheet_name='产品基本信息', index=False)
             
             # 导出净值数据
-            navs_df = self._get_navs_data()
             navs_df.to_excel(writer, sheet_name='产品净值信息', index=False)
             
             # 导出联合数据
-            combined_df = self._get_combined_data()
             combined_df.to_excel(writer, sheet_name='产品完整数据', index=False)
         
-        logger.info(f"成功导出所有数据到Excel文件: {excel_file}")
+        metrics = get_metrics()
+        metrics.observe('export_duration_seconds', time.perf_counter() - start_time, format='excel')
+        metrics.inc('export_rows_total', len(products_df) + len(navs_df) + len(combined_df), format='excel')
+        
+        logger.info("成功导出所有数据到Excel文件: %s", excel_file)
         return excel_file
 
-def main():
-    """脚本入口函数"""
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(description='理财产品数据导出工具')
+def add_arguments(parser):
+    """注册导出命令的命令行参数
+    
+    Args:
+        parser: 命令行参数解析器
+    """
     parser.add_argument('--format', choices=['csv', 'excel', 'all'], default='all',
                         help='导出格式，可选csv/excel/all，默认为all')
     parser.add_argument('--output-dir', type=str, default=None,
                         help='输出目录，默认为data/export')
-    args = parser.parse_args()
+    parser.add_argument('--profile', action='store_true',
+                        help='按阶段剖析CPU和内存，结果写入data/profiles目录')
+
+def run(args):
+    """执行导出命令
     
+    Args:
+        args: 解析后的命令行参数
+    """
     # 初始化日志
     setup_logging()
     
     # 开始导出
     start_time = datetime.now()
-    logger.info(f"开始导出数据: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("开始导出数据: %s", start_time.strftime('%Y-%m-%d %H:%M:%S'))
+    
+    # 本次运行的指标记录
+    metrics_config = get_metrics_config()
+    tracker = RunTracker('export', output_dir=metrics_config['output_dir'], enabled=metrics_config['enabled'])
+    status = 'success'
+    
+    # 按阶段剖析，查询(read_sql)嵌套在各导出阶段内单独统计
+    if getattr(args, 'profile', False):
+        enable_profiling('export')
     
     try:
         # 初始化导出器
         exporter = DataExporter(output_dir=args.output_dir)
         
-        # 根据指定格式导出
-        if args.format in ['csv', 'all']:
-            csv_files = exporter.export_to_csv()
-            logger.info(f"CSV文件导出完成: {csv_files}")
-            
-        if args.format in ['excel', 'all']:
-            excel_file = exporter.export_to_excel()
-            logger.info(f"Excel文件导出完成: {excel_file}")
+        # 根据指定格式导出，所有格式读取同一个快照，导出期间抓取可以继续写入
+        with exporter.snapshot():
+            if args.format in ['csv', 'all']:
+                with get_profiler().stage('export_csv'):
+                    csv_files = exporter.export_to_csv()
+                logger.info("CSV文件导出完成: %s", csv_files)
+                
+            if args.format in ['excel', 'all']:
+                with get_profiler().stage('export_excel'):
+                    excel_file = exporter.export_to_excel()
+                logger.info("Excel文件导出完成: %s", excel_file)
             
     except Exception as e:
-        logger.error(f"导出数据时出错: {str(e)}")
+        status = 'failed'
+        logger.error("导出数据时出错: %s", e)
     finally:
+        # 输出运行指标并写入runs表，只写一行记录，不初始化DatabaseManager
+        exporter = locals().get('exporter')
+        tracker.finish(status, engine=exporter.engine if exporter is not None else None)
+        
+        # 输出剖析结果
+        disable_profiling()
+        
         # 计算耗时
         elapsed_time = (datetime.now() - start_time).total_seconds()
-        logger.info(f"数据导出完成，共耗时 {elapsed_time:.2f} 秒")
+        logger.info("数据导出完成，共耗时 %.2f 秒", elapsed_time)
+
+def main(argv=None):
+    """脚本入口函数"""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description='理财产品数据导出工具')
+    add_arguments(parser)
+    run(parser.parse_args(argv))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
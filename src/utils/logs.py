@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步结构化日志
+
+抓取线程只把日志记录放入内存队列，格式化和写文件由后台线程完成：
+- 日志记录保持惰性格式化(logger.warning("第 %s 页...", page))，消息在后台线程中才生成
+- 同一位置的重复日志(如逐个产品的警告)按时间窗口限流，窗口内超出的记录直接丢弃并计数，
+  下一条放行的记录附带省略的条数
+- 文件按大小轮转，可输出每行一条的JSON记录
+"""
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# LogRecord的标准属性，其余属性(logger调用时通过extra传入)作为结构化字段输出
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'suppressed'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """按日志位置限流
+
+    以(logger名称, 级别, 消息模板)区分日志位置，每个位置在window秒内最多放行burst条，
+    其余记录丢弃并计数。ERROR及以上级别不限流。使用惰性格式化时同一位置的消息模板相同，
+    f-string生成的消息各不相同，无法限流。
+    每个窗口结束时清理窗口已过期且没有省略记录的位置，位置数超过max_keys时淘汰最久未出现的位置，
+    消息各不相同的日志不会使限流状态无限增长。
+    """
+
+    def __init__(self, burst: int = 10, window: float = 60.0, max_keys: int = 4096):
+        """
+        初始化限流
+
+        Args:
+            burst: 每个窗口内每个位置放行的条数，0表示不限流
+            window: 窗口长度(秒)
+            max_keys: 最多记录的位置数
+        """
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # 位置 -> [窗口开始时间, 窗口内条数, 已省略条数]，按最近出现的顺序排列
+        self._state: 'OrderedDict[Tuple, List]' = OrderedDict()
+        self._pruned_at = 0.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        with self._lock:
+            if record.created - self._pruned_at >= self.window:
+                self._prune(record.created)
+            state = self._state.get(key)
+            if state is None or record.created - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._state[key] = [record.created, 1, 0]
+                self._state.move_to_end(key)
+                if len(self._state) > self.max_keys:
+                    self._state.popitem(last=False)
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            self._state.move_to_end(key)
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+    def _prune(self, now: float):
+        """删除窗口已过期且没有省略记录的位置，有省略记录的位置保留到下一条记录放行时输出条数"""
+        expired = [key for key, (start, _, suppressed) in self._state.items()
+                   if now - start >= self.window and not suppressed]
+        for key in expired:
+            del self._state[key]
+        self._pruned_at = now
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """不在调用线程中格式化消息的QueueHandler
+
+    标准QueueHandler入队前会格式化消息以便跨进程传递；这里的队列只在进程内使用，
+    记录原样入队，由后台线程格式化。日志参数在入队后不应再被修改。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，附带被限流省略的条数"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" (此前 {suppressed} 条相同日志已省略)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出一行JSON
+
+    包含时间、级别、logger名称、线程、消息和调用时通过extra传入的字段。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in _RECORD_ATTRS and not name.startswith('_'):
+                data[name] = value
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            data['suppressed'] = suppressed
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def build_handlers(log_file: Optional[str], fmt: str = 'text', max_bytes: int = 0, backup_count: int = 5,
+                   console: bool = True) -> List[logging.Handler]:
+    """创建输出日志的文件和控制台处理器
+
+    Args:
+        log_file: 日志文件路径，None表示不写文件
+        fmt: 文件日志格式，text或json
+        max_bytes: 文件达到该大小后轮转，0表示不轮转
+        backup_count: 轮转保留的历史文件数
+        console: 是否同时输出到标准错误
+
+    Returns:
+        处理器列表
+    """
+    handlers = []
+    if log_file:
+        if max_bytes > 0:
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                           encoding='utf-8')
+        else:
+            handler = logging.FileHandler(log_file, encoding='utf-8')
+        handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT))
+        handlers.append(handler)
+    if console:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(TextFormatter(TEXT_FORMAT))
+        handlers.append(handler)
+    return handlers
+
+
+def install(handlers: List[logging.Handler], level: int, rate_limit: int = 0, rate_window: float = 60.0,
+            asynchronous: bool = True):
+    """替换根logger的处理器
+
+    Args:
+        handlers: 实际输出日志的处理器
+        level: 根logger的级别
+        rate_limit: 每个日志位置每个窗口放行的条数，0表示不限流
+        rate_window: 限流窗口(秒)
+        asynchronous: 是否经队列由后台线程输出
+    """
+    global _listener
+    shutdown()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+
+    if asynchronous:
+        front = AsyncQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(front.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        front_handlers = [front]
+    else:
+        front_handlers = handlers
+    for handler in front_handlers:
+        if rate_limit > 0:
+            handler.addFilter(RateLimitFilter(rate_limit, rate_window))
+        root.addHandler(handler)
+
+
+def shutdown():
+    """停止后台线程，输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+# logging在导入时注册了关闭处理器的退出函数，这里后注册，先于它执行
+atexit.register(shutdown)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+运行指标采集
+记录HTTP延迟、传输字节数、重试原因、等待时间、解析耗时、数据库写入耗时和导出耗时，
+每次运行结束后输出Prometheus textfile和JSON文件，并写入数据库的runs表。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认耗时分桶(秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 指标名称前缀
+PREFIX = 'financial_scraper_'
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            buckets: 分桶上界，升序
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """记录一个观测值"""
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(上界, 累计次数)]，最后一项为+Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((bound, running))
+        result.append((float('inf'), self.count))
+        return result
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    支持计数器(counter)、仪表(gauge)和直方图(histogram)，按名称和标签区分，线程安全。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.gauges: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, object]) -> Tuple[str, Tuple]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器累加
+
+        Args:
+            name: 指标名称
+            value: 增量
+            **labels: 标签
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """设置仪表值"""
+        key = self._key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        """记录直方图观测值
+
+        Args:
+            name: 指标名称
+            value: 观测值
+            buckets: 分桶上界，仅在首次记录该指标时生效
+            **labels: 标签
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """计时上下文，退出时将耗时(秒)记录到直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_total(self, name: str, **labels) -> float:
+        """计数器在所有匹配标签上的总和"""
+        wanted = {(k, str(v)) for k, v in labels.items()}
+        with self._lock:
+            return sum(value for (metric, key), value in self.counters.items()
+                       if metric == name and wanted.issubset(key))
+
+    def histogram_totals(self, name: str, **labels) -> Tuple[int, float]:
+        """直方图在所有匹配标签上的(次数, 总和)"""
+        wanted = {(k, str(v)) for k, v in labels.items()}
+        count, total = 0, 0.0
+        with self._lock:
+            for (metric, key), histogram in self.histograms.items():
+                if metric == name and wanted.issubset(key):
+                    count += histogram.count
+                    total += histogram.sum
+        return count, total
+
+    def snapshot(self) -> Dict:
+        """导出所有指标为可JSON序列化的字典"""
+        def label_dict(key):
+            return dict(key)
+
+        with self._lock:
+            return {
+                'counters': [{'name': name, 'labels': label_dict(key), 'value': value}
+                             for (name, key), value in sorted(self.counters.items())],
+                'gauges': [{'name': name, 'labels': label_dict(key), 'value': value}
+                           for (name, key), value in sorted(self.gauges.items())],
+                'histograms': [{'name': name, 'labels': label_dict(key), 'count': h.count,
+                                'sum': round(h.sum, 6),
+                                'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                                            for bound, count in h.cumulative()}}
+                               for (name, key), h in sorted(self.histograms.items(), key=lambda item: item[0])],
+            }
+
+    def to_prometheus(self, extra_labels: Dict[str, str] = None) -> str:
+        """输出Prometheus文本格式
+
+        Args:
+            extra_labels: 附加到所有指标上的标签
+
+        Returns:
+            Prometheus exposition格式文本
+        """
+        extra = tuple(sorted((extra_labels or {}).items()))
+
+        def fmt_labels(key, more=()):
+            pairs = list(extra) + list(key) + list(more)
+            if not pairs:
+                return ''
+            escaped = ['{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs]
+            return '{' + ','.join(escaped) + '}'
+
+        lines = []
+        typed = set()
+        with self._lock:
+            for kind, store in (('counter', self.counters), ('gauge', self.gauges)):
+                for (name, key), value in sorted(store.items()):
+                    metric = PREFIX + name
+                    if metric not in typed:
+                        lines.append(f"# TYPE {metric} {kind}")
+                        typed.add(metric)
+                    lines.append(f"{metric}{fmt_labels(key)} {value}")
+            for (name, key), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                metric = PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                for bound, count in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(f"{metric}_bucket{fmt_labels(key, (('le', le),))} {count}")
+                lines.append(f"{metric}_sum{fmt_labels(key)} {histogram.sum}")
+                lines.append(f"{metric}_count{fmt_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+# 进程内共享的指标注册表
+_registry = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """获取进程内共享的指标注册表"""
+    return _registry
+
+
+class RunTracker:
+    """单次运行的指标汇总
+
+    开始时清空指标注册表，结束时汇总关键指标，输出到指标文件并写入runs表。
+    """
+
+    def __init__(self, command: str, output_dir: str = None, enabled: bool = True):
+        """
+        初始化运行记录
+
+        Args:
+            command: 运行的命令名称，如crawl/export
+            output_dir: 指标文件输出目录，默认为'data/metrics'
+            enabled: 是否输出指标文件
+        """
+        self.command = command
+        self.output_dir = output_dir or os.path.join(os.getcwd(), 'data', 'metrics')
+        self.enabled = enabled
+        self.started_at = datetime.now()
+        self.run_id = f"{command}_{self.started_at.strftime('%Y%m%d_%H%M%S_%f')}"
+        self.status = 'running'
+        self._start = time.perf_counter()
+        get_metrics().reset()
+
+    def summary(self, duration: float) -> Dict:
+        """汇总本次运行的关键指标
+
+        Args:
+            duration: 运行耗时(秒)
+
+        Returns:
+            汇总字典，字段与runs表一致
+        """
+        metrics = get_metrics()
+        http_requests, http_seconds = metrics.histogram_totals('http_request_duration_seconds')
+        _, parse_seconds = metrics.histogram_totals('parse_duration_seconds')
+        _, db_seconds = metrics.histogram_totals('db_write_duration_seconds')
+        _, export_seconds = metrics.histogram_totals('export_duration_seconds')
+        rows_written = metrics.counter_total('db_rows_written_total')
+        return {
+            'run_id': self.run_id,
+            'command': self.command,
+            'status': self.status,
+            'started_at': self.started_at,
+            'finished_at': datetime.now(),
+            'duration_seconds': round(duration, 3),
+            'pages': int(metrics.counter_total('pages_total', result='success')),
+            'failed_pages': int(metrics.counter_total('pages_total', result='failed')),
+            'products_count': int(metrics.counter_total('db_rows_written_total', table='products')),
+            'navs_count': int(metrics.counter_total('db_rows_written_total', table='product_navs')),
+            'rows_per_second': round(rows_written / duration, 3) if duration > 0 else 0.0,
+            'http_requests': http_requests,
+            'http_seconds': round(http_seconds, 3),
+            'http_bytes': int(metrics.counter_total('http_response_bytes_total')),
+            'retries': int(metrics.counter_total('retries_total')),
+            'wait_seconds': round(metrics.counter_total('wait_seconds_total'), 3),
+            'parse_seconds': round(parse_seconds, 3),
+            'db_seconds': round(db_seconds, 3),
+            'export_seconds': round(export_seconds, 3),
+        }
+
+    def finish(self, status: str = 'success', db_manager=None, engine=None) -> Dict:
+        """结束本次运行，输出指标并记录到数据库
+
+        Args:
+            status: 运行状态(success/failed)
+            db_manager: 数据库管理器，传入时写入runs表
+            engine: 数据库引擎，没有数据库管理器时直接用引擎写入runs表
+
+        Returns:
+            本次运行的汇总字典
+        """
+        self.status = status
+        duration = time.perf_counter() - self._start
+        metrics = get_metrics()
+        metrics.set('run_duration_seconds', duration)
+        summary = self.summary(duration)
+        metrics.set('rows_per_second', summary['rows_per_second'])
+
+        logger.info("运行指标: 耗时 %.2f 秒，HTTP请求 %s 次(累计 %.2f 秒，%s 字节)，等待 %.2f 秒，解析 %.2f 秒，数据库写入 %.2f 秒，导出 %.2f 秒，"
+                    "重试 %s 次，%.1f 行/秒",
+                    summary['duration_seconds'], summary['http_requests'], summary['http_seconds'],
+                    summary['http_bytes'], summary['wait_seconds'], summary['parse_seconds'], summary['db_seconds'],
+                    summary['export_seconds'], summary['retries'], summary['rows_per_second'])
+
+        snapshot = metrics.snapshot()
+        if self.enabled:
+            self._write_files(summary, snapshot)
+        if db_manager is not None or engine is not None:
+            run_info = dict(summary, metrics_json=json.dumps(snapshot, ensure_ascii=False))
+            try:
+                if db_manager is not None:
+                    db_manager.record_run(run_info)
+                else:
+                    from src.database.db_manager import record_run
+                    record_run(engine, run_info)
+            except Exception as e:
+                logger.warning("写入运行记录失败: %s", e)
+        return summary
+
+    def _write_files(self, summary: Dict, snapshot: Dict):
+        """写入Prometheus textfile和JSON指标文件"""
+        try:
+            os.makedirs(os.path.join(self.output_dir, 'runs'), exist_ok=True)
+
+            # textfile collector按命令区分文件，抓取和导出互不覆盖
+            prom_file = os.path.join(self.output_dir, f'financial_scraper_{self.command}.prom')
+            with open(f"{prom_file}.tmp", 'w', encoding='utf-8') as f:
+                f.write(get_metrics().to_prometheus({'command': self.command}))
+            os.replace(f"{prom_file}.tmp", prom_file)
+
+            json_file = os.path.join(self.output_dir, 'runs', f'{self.run_id}.json')
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump({'summary': summary, 'metrics': snapshot}, f,
+                          ensure_ascii=False, indent=2, default=str)
+        except Exception as e:
+            logger.warning("写入指标文件失败: %s", e)
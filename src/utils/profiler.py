@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分阶段性能剖析
+使用cProfile和tracemalloc分别记录抓取、解析、入库和导出各阶段的CPU耗时、
+内存分配热点和内存峰值，结果写入独立的运行目录。
+
+未开启剖析时get_profiler()返回空实现，stage()只返回一个共享的空上下文，不产生额外开销。
+"""
+
+import os
+import io
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class _NullStage:
+    """空上下文"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullProfiler:
+    """未开启剖析时使用的空实现"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        """返回共享的空上下文"""
+        return _NULL_STAGE
+
+    def finish(self):
+        """无操作"""
+        return None
+
+
+class _StageStats:
+    """单个阶段的累计统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.peak_bytes = 0
+        self.profiles: List[cProfile.Profile] = []
+        self.alloc_samples = 0
+        self.alloc_diffs: Dict[str, List[int]] = {}
+
+
+class _ProfiledStage:
+    """一次阶段执行的上下文"""
+
+    def __init__(self, profiler: 'StageProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(self.name)
+        return False
+
+
+class StageProfiler:
+    """分阶段剖析器
+
+    同一阶段可以多次进入(如每页的抓取和解析)，CPU剖析结果和耗时会累计；
+    内存分配热点取每个阶段前几次执行的快照差异，避免频繁快照拖慢运行。
+    阶段可以嵌套，进入子阶段时暂停父阶段的CPU剖析。
+    """
+
+    def __init__(self, output_dir: str, top_n: int = 30, alloc_samples: int = 3):
+        """
+        初始化剖析器
+
+        Args:
+            output_dir: 本次运行的输出目录
+            top_n: 报告中输出的函数/分配位置条数
+            alloc_samples: 每个阶段采集内存分配快照的执行次数
+        """
+        self.enabled = True
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.alloc_samples = alloc_samples
+        self.stages: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+
+    def stage(self, name: str) -> _ProfiledStage:
+        """返回剖析指定阶段的上下文
+
+        Args:
+            name: 阶段名称，如fetch/parse/persist/export_csv
+        """
+        return _ProfiledStage(self, name)
+
+    def _stack(self) -> list:
+        """当前线程的阶段栈"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _stats(self, name: str) -> _StageStats:
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = _StageStats(name)
+            return stats
+
+    def _propagate_peak(self, stack: list):
+        """将当前内存峰值计入所有未结束的阶段"""
+        _, peak = tracemalloc.get_traced_memory()
+        for frame in stack:
+            if peak > frame['stats'].peak_bytes:
+                frame['stats'].peak_bytes = peak
+
+    def _enter(self, name: str):
+        stack = self._stack()
+        stats = self._stats(name)
+
+        # 暂停父阶段的CPU剖析
+        if stack and stack[-1]['profile'] is not None:
+            stack[-1]['profile'].disable()
+
+        self._propagate_peak(stack)
+        tracemalloc.reset_peak()
+
+        snapshot = None
+        with self._lock:
+            if stats.alloc_samples < self.alloc_samples:
+                stats.alloc_samples += 1
+                take_snapshot = True
+            else:
+                take_snapshot = False
+        if take_snapshot:
+            snapshot = tracemalloc.take_snapshot()
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 其他线程正在剖析(Python 3.12+同一时间只允许一个剖析器)，仅记录耗时和内存
+            profile = None
+
+        stack.append({'stats': stats, 'profile': profile, 'snapshot': snapshot,
+                      'start': time.perf_counter()})
+
+    def _exit(self, name: str):
+        stack = self._stack()
+        frame = stack.pop()
+        stats = frame['stats']
+        profile = frame['profile']
+        if profile is not None:
+            profile.disable()
+
+        elapsed = time.perf_counter() - frame['start']
+        self._propagate_peak(stack + [frame])
+
+        diffs = None
+        if frame['snapshot'] is not None:
+            after = tracemalloc.take_snapshot()
+            diffs = after.compare_to(frame['snapshot'], 'lineno')
+
+        with self._lock:
+            stats.calls += 1
+            stats.wall_seconds += elapsed
+            if profile is not None:
+                stats.profiles.append(profile)
+            for diff in diffs or []:
+                if diff.size_diff <= 0:
+                    continue
+                key = str(diff.traceback[0])
+                entry = stats.alloc_diffs.setdefault(key, [0, 0])
+                entry[0] += diff.size_diff
+                entry[1] += diff.count_diff
+
+        # 恢复父阶段的CPU剖析
+        if stack and stack[-1]['profile'] is not None:
+            try:
+                stack[-1]['profile'].enable()
+            except ValueError:
+                stack[-1]['profile'] = None
+
+    def finish(self) -> str:
+        """停止剖析并写出结果
+
+        Returns:
+            输出目录路径
+        """
+        total_seconds = time.perf_counter() - self._start
+        _, overall_peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = {'total_seconds': round(total_seconds, 3), 'stages': {}}
+
+        for name, stats in self.stages.items():
+            stage_summary = {
+                'calls': stats.calls,
+                'wall_seconds': round(stats.wall_seconds, 3),
+                'peak_memory_bytes': max(stats.peak_bytes, 0),
+                'top_allocations': [
+                    {'location': location, 'size_bytes': size, 'count': count}
+                    for location, (size, count) in sorted(
+                        stats.alloc_diffs.items(), key=lambda item: item[1][0], reverse=True
+                    )[:self.top_n]
+                ],
+            }
+
+            if stats.profiles:
+                merged = pstats.Stats(stats.profiles[0])
+                for profile in stats.profiles[1:]:
+                    merged.add(profile)
+                merged.dump_stats(os.path.join(self.output_dir, f'{name}.prof'))
+
+                buffer = io.StringIO()
+                merged.stream = buffer
+                merged.sort_stats('cumulative').print_stats(self.top_n)
+                with open(os.path.join(self.output_dir, f'{name}_cpu.txt'), 'w', encoding='utf-8') as f:
+                    f.write(buffer.getvalue())
+
+            with open(os.path.join(self.output_dir, f'{name}_alloc.txt'), 'w', encoding='utf-8') as f:
+                f.write(f"阶段: {name}  执行次数: {stats.calls}  耗时: {stats.wall_seconds:.3f} 秒  "
+                        f"内存峰值: {stats.peak_bytes / 1024 / 1024:.2f} MiB\n")
+                f.write(f"内存分配热点(取前 {min(stats.alloc_samples, self.alloc_samples)} 次执行的净增量):\n")
+                for item in stage_summary['top_allocations']:
+                    f.write(f"  {item['size_bytes'] / 1024:10.1f} KiB  {item['count']:8d} 块  {item['location']}\n")
+
+            summary['stages'][name] = stage_summary
+
+        summary['peak_memory_bytes'] = max([overall_peak] + [s.peak_bytes for s in self.stages.values()])
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        for name, stage_summary in summary['stages'].items():
+            logger.info("剖析阶段 %s: 执行 %s 次，耗时 %.2f 秒，内存峰值 %.2f MiB",
+                        name, stage_summary['calls'], stage_summary['wall_seconds'],
+                        stage_summary['peak_memory_bytes'] / 1024 / 1024)
+        logger.info("剖析结果已写入: %s", self.output_dir)
+        return self.output_dir
+
+
+# 进程内当前使用的剖析器，默认不剖析
+_profiler = NullProfiler()
+
+def get_profiler():
+    """获取当前剖析器"""
+    return _profiler
+
+def enable_profiling(command: str, base_dir: str = None) -> StageProfiler:
+    """开启剖析
+
+    Args:
+        command: 命令名称，用于命名运行目录
+        base_dir: 剖析结果根目录，默认为'data/profiles'
+
+    Returns:
+        剖析器对象
+    """
+    global _profiler
+    base_dir = base_dir or os.path.join(os.getcwd(), 'data', 'profiles')
+    run_dir = os.path.join(base_dir, f"{command}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    _profiler = StageProfiler(run_dir)
+    logger.info("已开启性能剖析，结果目录: %s", run_dir)
+    return _profiler
+
+def disable_profiling():
+    """结束剖析并写出结果
+
+    Returns:
+        结果目录，未开启剖析时返回None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, NullProfiler()
+    return profiler.finish()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+进程内任务调度器
+用于守护进程模式下按计划执行抓取、导出和定向刷新任务
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Schedule:
+    """调度表达式
+
+    支持每日定时("02:00")和固定间隔("30s"/"15m"/"2h")两种写法。
+    """
+
+    _INTERVAL_PATTERN = re.compile(r'^(\d+)\s*([smh]?)$')
+    _DAILY_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+    _UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+    def __init__(self, spec: str):
+        """
+        解析调度表达式
+
+        Args:
+            spec: 调度表达式
+
+        Raises:
+            ValueError: 表达式格式不正确
+        """
+        self.spec = spec.strip().lower()
+        self.daily_time = None
+        self.interval = None
+
+        daily_match = self._DAILY_PATTERN.match(self.spec)
+        interval_match = self._INTERVAL_PATTERN.match(self.spec)
+        if daily_match:
+            hour, minute = int(daily_match.group(1)), int(daily_match.group(2))
+            if hour > 23 or minute > 59:
+                raise ValueError(f"无效的调度时间: {spec}")
+            self.daily_time = (hour, minute)
+        elif interval_match:
+            self.interval = int(interval_match.group(1)) * self._UNITS[interval_match.group(2)]
+            if self.interval <= 0:
+                raise ValueError(f"调度间隔必须大于0: {spec}")
+        else:
+            raise ValueError(f"无法解析的调度表达式: {spec}")
+
+    def next_run(self, after: datetime) -> datetime:
+        """计算下一次执行时间
+
+        Args:
+            after: 基准时间
+
+        Returns:
+            基准时间之后的下一次执行时间
+        """
+        if self.interval is not None:
+            return after + timedelta(seconds=self.interval)
+
+        hour, minute = self.daily_time
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def __repr__(self):
+        """对象的字符串表示"""
+        return f"<Schedule('{self.spec}')>"
+
+
+class Job:
+    """调度任务
+
+    记录任务函数、调度计划以及历次执行的耗时统计。
+    """
+
+    def __init__(self, name: str, func: Callable[[], None], schedule: Optional[Schedule] = None):
+        """
+        初始化调度任务
+
+        Args:
+            name: 任务名称
+            func: 任务函数
+            schedule: 调度计划，为None表示仅能被手动触发
+        """
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.next_run = schedule.next_run(datetime.now()) if schedule else None
+
+        # 防止同一任务重叠执行
+        self.lock = threading.Lock()
+
+        # 执行统计
+        self.run_count = 0
+        self.failure_count = 0
+        self.skipped_count = 0
+        self.total_duration = 0.0
+        self.last_duration = None
+        self.last_started = None
+        self.last_status = None
+
+    def is_due(self, now: datetime) -> bool:
+        """任务是否到期"""
+        return self.next_run is not None and self.next_run <= now
+
+    def stats(self) -> Dict:
+        """获取任务执行统计
+
+        Returns:
+            任务统计信息字典
+        """
+        return {
+            'schedule': self.schedule.spec if self.schedule else None,
+            'run_count': self.run_count,
+            'failure_count': self.failure_count,
+            'skipped_count': self.skipped_count,
+            'last_status': self.last_status,
+            'last_started': self.last_started.strftime('%Y-%m-%d %H:%M:%S') if self.last_started else None,
+            'last_duration': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'avg_duration': round(self.total_duration / self.run_count, 3) if self.run_count else None,
+            'next_run': self.next_run.strftime('%Y-%m-%d %H:%M:%S') if self.next_run else None,
+        }
+
+
+class JobScheduler:
+    """进程内任务调度器
+
+    所有任务在调度线程中串行执行，保证同一时刻只有一个任务在运行，
+    执行期间错过的调度会被合并为一次，不会堆积补跑。
+    """
+
+    def __init__(self, stats_file: str = None, poll_interval: float = 30.0):
+        """
+        初始化调度器
+
+        Args:
+            stats_file: 任务统计输出文件路径，为None则不落盘
+            poll_interval: 空闲时的轮询间隔(秒)
+        """
+        self.jobs: Dict[str, Job] = {}
+        self.stats_file = stats_file
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        # 全局执行锁，防止不同任务之间重叠执行
+        self._run_lock = threading.Lock()
+
+    def add_job(self, name: str, func: Callable[[], None], schedule_spec: str = None) -> Job:
+        """
+        注册任务
+
+        Args:
+            name: 任务名称
+            func: 任务函数
+            schedule_spec: 调度表达式，为空表示仅能被手动触发
+
+        Returns:
+            注册的任务对象
+        """
+        schedule = Schedule(schedule_spec) if schedule_spec else None
+        job = Job(name, func, schedule)
+        self.jobs[name] = job
+        logger.info("注册任务 %s，调度: %s，下次执行: %s", name, schedule.spec if schedule else '手动触发', job.next_run or '-')
+        return job
+
+    def trigger(self, name: str):
+        """将任务标记为立即执行
+
+        Args:
+            name: 任务名称
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            logger.warning("未找到任务: %s", name)
+            return
+        job.next_run = datetime.now()
+
+    def run_job(self, name: str) -> bool:
+        """立即执行指定任务
+
+        如果该任务或其他任务正在执行，则跳过本次执行。
+
+        Args:
+            name: 任务名称
+
+        Returns:
+            任务是否执行成功
+        """
+        job = self.jobs[name]
+        if not self._run_lock.acquire(blocking=False):
+            job.skipped_count += 1
+            logger.warning("已有任务正在执行，跳过任务 %s", name)
+            return False
+
+        try:
+            if not job.lock.acquire(blocking=False):
+                job.skipped_count += 1
+                logger.warning("任务 %s 仍在执行，跳过本次调度", name)
+                return False
+
+            try:
+                job.last_started = datetime.now()
+                start_time = time.perf_counter()
+                logger.info("任务 %s 开始执行", name)
+                try:
+                    job.func()
+                    job.last_status = 'success'
+                except Exception as e:
+                    job.failure_count += 1
+                    job.last_status = 'failed'
+                    logger.error("任务 %s 执行失败: %s", name, e)
+                finally:
+                    job.last_duration = time.perf_counter() - start_time
+                    job.total_duration += job.last_duration
+                    job.run_count += 1
+                    # 从完成时刻重新计算下次执行时间，合并执行期间错过的调度
+                    job.next_run = job.schedule.next_run(datetime.now()) if job.schedule else None
+                    logger.info("任务 %s 执行结束，状态: %s，耗时 %.2f 秒", name, job.last_status, job.last_duration)
+                    self._dump_stats()
+                return job.last_status == 'success'
+            finally:
+                job.lock.release()
+        finally:
+            self._run_lock.release()
+
+    def run_pending(self) -> List[str]:
+        """执行所有到期任务
+
+        Returns:
+            本轮执行过的任务名称列表
+        """
+        executed = []
+        for name, job in list(self.jobs.items()):
+            if self.stop_event.is_set():
+                break
+            if job.is_due(datetime.now()):
+                self.run_job(name)
+                executed.append(name)
+        return executed
+
+    def seconds_until_next(self) -> float:
+        """距离最近一个到期任务的秒数"""
+        pending = [job.next_run for job in self.jobs.values() if job.next_run is not None]
+        if not pending:
+            return self.poll_interval
+        delta = (min(pending) - datetime.now()).total_seconds()
+        return max(0.0, min(delta, self.poll_interval))
+
+    def run_forever(self):
+        """持续运行调度循环，直到调用stop()"""
+        logger.info("调度器开始运行")
+        while not self.stop_event.is_set():
+            executed = self.run_pending()
+            if not executed:
+                self.stop_event.wait(self.seconds_until_next())
+        logger.info("调度器已停止")
+
+    def stop(self):
+        """停止调度循环"""
+        self.stop_event.set()
+
+    def stats(self) -> Dict[str, Dict]:
+        """获取所有任务的执行统计"""
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    def _dump_stats(self):
+        """将任务统计写入文件"""
+        if not self.stats_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.stats_file), exist_ok=True)
+            tmp_file = f"{self.stats_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'jobs': self.stats()
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.stats_file)
+        except Exception as e:
+            logger.warning("写入任务统计失败: %s", e)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""从导出文件回填数据库"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from src.backfill import backfill, find_export_files
+from src.database.db_manager import DatabaseManager
+from src.database.partitions import add_months
+
+
+def _write_csv(path, header, rows):
+    path.write_text('\n'.join([','.join(header)] + [','.join(row) for row in rows]) + '\n', encoding='utf-8-sig')
+
+
+def test_backfill_writes_old_months_to_month_tables(tmp_path, monkeypatch):
+    """已结束月份的净值直接写入月表，不覆盖已有的净值，同一净值以较新的导出为准"""
+    monkeypatch.setenv('NAV_VALIDATION', 'false')
+    monkeypatch.setenv('NAV_HOT_MONTHS', '1')
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    old = add_months(date.today(), -3).replace(day=5)
+    older = add_months(date.today(), -3) - timedelta(days=1)
+    db_manager.save_products([{'product_code': 'A', 'issuer': '甲理财'}])
+    db_manager.save_product_navs([{'product_code': 'A', 'nav_date': old.isoformat(), 'current_nav': 1.01}])
+    db_manager.rotate_nav_partitions(keep_months=1)
+
+    today = date.today().isoformat()
+    export_dir = tmp_path / 'export'
+    export_dir.mkdir()
+    header = ('product_code', 'nav_date', 'current_nav')
+    _write_csv(export_dir / 'navs_20260201_000000.csv', header, [
+        ('A', old.isoformat(), '9.99'), ('B', old.isoformat(), '1.00'), ('C', older.isoformat(), '0.98')])
+    _write_csv(export_dir / 'navs_20260301_000000.csv', header, [
+        ('B', old.isoformat(), '1.05'), ('D', today, '1.10')])
+
+    stats = backfill(db_manager, find_export_files([str(export_dir)]), workers=1, chunk_rows=2)
+    assert stats['new_navs'] == 3
+    assert stats['new_products'] == 3
+
+    with db_manager.engine.connect() as conn:
+        def rows(table):
+            return [tuple(row) for row in conn.execute(text(
+                f"SELECT product_code, nav_date, current_nav FROM {table} ORDER BY product_code"))]
+        assert rows(f"product_navs_{old:%Y%m}") == [('A', old.isoformat(), 1.01), ('B', old.isoformat(), 1.05)]
+        assert rows(f"product_navs_{older:%Y%m}") == [('C', older.isoformat(), 0.98)]
+        assert rows('product_navs') == [('D', today, 1.1)]
+        assert conn.execute(text("SELECT COUNT(*) FROM product_navs_all")).scalar() == 4
+
+    # 重复回填不产生新记录
+    assert backfill(db_manager, find_export_files([str(export_dir)]), workers=1, chunk_rows=2)['new_navs'] == 0
+    db_manager.close()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""净值聚合立方的增量维护"""
+
+from datetime import date
+
+from sqlalchemy import select
+
+from src.database.db_manager import DatabaseManager
+from src.models.aggregate import NavAggregate
+
+
+def _product(product_code, issuer, risk_level='R2'):
+    return {'product_code': product_code, 'product_name': f'产品{product_code}', 'issuer': issuer,
+            'risk_level': risk_level, 'product_type': '固定收益类', 'currency': '人民币'}
+
+
+def _cells(db_manager):
+    with db_manager.engine.connect() as conn:
+        rows = conn.execute(select(
+            NavAggregate.nav_date, NavAggregate.dimension, NavAggregate.dim_value, NavAggregate.product_count,
+            NavAggregate.median_nav, NavAggregate.id
+        ).order_by(NavAggregate.nav_date, NavAggregate.dimension, NavAggregate.dim_value)).all()
+    return {(row[0], row[1], row[2]): (row[3], row[4], row[5]) for row in rows}
+
+
+def test_regrouped_product_only_recomputes_moved_cells(tmp_path, monkeypatch):
+    """产品更换发行机构后，只有原发行机构和新发行机构的单元格重新计算，结果与全量重建一致"""
+    monkeypatch.setenv('NAV_VALIDATION', 'false')
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    db_manager.save_products([_product('A', '甲理财'), _product('B', '甲理财'), _product('C', '乙理财')])
+    db_manager.save_product_navs([
+        {'product_code': code, 'nav_date': day.isoformat(), 'current_nav': nav}
+        for day in (date(2026, 3, 2), date(2026, 3, 3))
+        for code, nav in (('A', 1.01), ('B', 1.03), ('C', 0.98))
+    ])
+    before = _cells(db_manager)
+    assert before[(date(2026, 3, 2), 'issuer', '甲理财')][:2] == (2, 1.02)
+
+    db_manager.save_products([_product('A', '乙理财')])
+    after = _cells(db_manager)
+    for day in (date(2026, 3, 2), date(2026, 3, 3)):
+        assert after[(day, 'issuer', '甲理财')][:2] == (1, 1.03)
+        assert after[(day, 'issuer', '乙理财')][:2] == (2, 0.995)
+        # 'all'和取值未变的维度没有重新计算
+        for key in ((day, 'all', ''), (day, 'risk_level', 'R2'), (day, 'currency', '人民币')):
+            assert after[key] == before[key]
+
+    # 增量维护的结果与全量重建一致
+    db_manager.cube.rebuild()
+    assert {key: value[:2] for key, value in _cells(db_manager).items()} == \
+        {key: value[:2] for key, value in after.items()}
+    db_manager.close()
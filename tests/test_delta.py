@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""增量抓取"""
+
+from datetime import date, datetime, timedelta
+
+from src.database.db_manager import DatabaseManager
+from src.database.partitions import add_months
+from src.scrapers.delta import MODE_DELTA, DeltaCrawl
+
+
+def test_change_fingerprints_read_rotated_navs(tmp_path, monkeypatch):
+    """最新净值已移入月表的产品仍取得已入库的指纹，没有净值的产品净值为空"""
+    monkeypatch.setenv('NAV_VALIDATION', 'false')
+    monkeypatch.setenv('NAV_HOT_MONTHS', '1')
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    db_manager.save_products([{'product_code': code, 'issuer': '甲理财', 'sale_status': '在售'}
+                              for code in ('A', 'B', 'C')])
+    last_month = add_months(date.today(), -1)
+    db_manager.save_product_navs([
+        {'product_code': 'A', 'nav_date': last_month.isoformat(), 'current_nav': 1.01},
+        {'product_code': 'A', 'nav_date': last_month.replace(day=2).isoformat(), 'current_nav': 1.02},
+        {'product_code': 'B', 'nav_date': date.today().isoformat(), 'current_nav': 0.99},
+    ])
+    assert db_manager.rotate_nav_partitions(keep_months=1) == {last_month.strftime('%Y%m'): 2}
+
+    fingerprints = db_manager.get_change_fingerprints(['A', 'B', 'C', 'D'])
+    assert fingerprints['A'][0] == '在售' and fingerprints['A'][3] == 1.02
+    assert fingerprints['B'][3] == 0.99
+    assert fingerprints['C'] == ('在售', None, None, None)
+    assert 'D' not in fingerprints
+    db_manager.close()
+
+
+def _page(*codes):
+    return [{'cpdjbm': code, 'cpqsrq': '20260301'} for code in codes]
+
+
+def test_finish_records_sweep_when_stopped_on_last_page(tmp_path):
+    """在最后一页才满足停止条件时同样记为完整抓取，提前停止并跳过页面时不记录"""
+    crawl = DeltaCrawl(mode=MODE_DELTA, stop_pages=1, full_sweep_days=7,
+                       state_file=str(tmp_path / 'state.json'), source='test')
+    # 以K开头的产品已入库且没有变化，其余为新产品
+    crawl.bind(lambda codes: {code: ('', None, None, None) for code in codes if code.startswith('K')})
+    yesterday = (datetime.now() - timedelta(days=1)).replace(microsecond=0)
+    crawl._save_full_sweep(yesterday)
+
+    assert crawl.begin()
+    assert crawl.observe(_page('K1', 'K2'))
+    crawl.finish(total_pages=3, complete=False)
+    assert crawl.last_full_sweep() == yesterday
+
+    assert crawl.begin()
+    assert not crawl.observe(_page('N1', 'K1'))
+    assert crawl.observe(_page('K2', 'K3'))
+    crawl.finish(total_pages=2, complete=True)
+    assert crawl.last_full_sweep().date() == date.today()
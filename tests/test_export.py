@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""数据导出"""
+
+from datetime import date
+
+from sqlalchemy import create_engine, inspect, text
+
+from src.database.db_manager import DatabaseManager
+from src.database.partitions import ALL_VIEW, HOT_TABLE
+from src.utils.export_data import DataExporter
+from src.utils.metrics import RunTracker
+
+
+def test_run_record_written_without_database_manager(tmp_path):
+    """导出结束时只写入一条运行记录，不创建其他表"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'navs.db'}")
+    tracker = RunTracker('export', output_dir=str(tmp_path / 'metrics'), enabled=False)
+    tracker.finish('success', engine=engine)
+
+    assert inspect(engine).get_table_names() == ['runs']
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT command, status, created_at FROM runs")).one()
+    assert row[:2] == ('export', 'success') and row[2] is not None
+    engine.dispose()
+
+
+def _nav_schema(engine):
+    with engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(text("SELECT type, name FROM sqlite_master")))
+
+
+def test_export_reads_without_changing_schema(tmp_path, monkeypatch, caplog):
+    """导出不创建视图和索引，有汇总视图时读取视图，没有时退回热表"""
+    monkeypatch.setenv('NAV_VALIDATION', 'false')
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    db_manager.save_products([{'product_code': 'A', 'issuer': '甲理财'}])
+    db_manager.save_product_navs([{'product_code': 'A', 'nav_date': date.today().isoformat(), 'current_nav': 1.01}])
+    engine = db_manager.engine
+
+    exporter = DataExporter(engine=engine, output_dir=str(tmp_path / 'export'))
+    before = _nav_schema(engine)
+    assert len(exporter._load_data()[1]) == 1
+    assert exporter._nav_table == ALL_VIEW
+    assert _nav_schema(engine) == before
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP VIEW {ALL_VIEW}")
+    exporter = DataExporter(engine=engine, output_dir=str(tmp_path / 'export'))
+    before = _nav_schema(engine)
+    assert len(exporter._load_data()[1]) == 1
+    assert exporter._nav_table == HOT_TABLE
+    assert _nav_schema(engine) == before
+    assert ALL_VIEW in caplog.text
+    db_manager.close()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""产品列表变化"""
+
+from sqlalchemy import text
+
+from src.database.db_manager import DatabaseManager
+
+
+def _crawl(db_manager, codes, complete=True, status='在售'):
+    db_manager.begin_listing('chinawealth')
+    db_manager.save_products([{'product_code': code, 'issuer': '甲理财', 'sale_status': status} for code in codes],
+                             source='chinawealth')
+    return db_manager.finish_listing('chinawealth', complete=complete)
+
+
+def _changes(db_manager):
+    with db_manager.engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(
+            "SELECT product_code, change FROM product_changes ORDER BY id"))]
+
+
+def test_listing_diff_marks_delisted_and_relisted(tmp_path, monkeypatch):
+    """完整抓取中缺少的产品标记为下架，不完整的抓取不判断下架，重新出现的产品记为重新上架"""
+    monkeypatch.setenv('LISTING_DIFF_DIR', str(tmp_path / 'changes'))
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+
+    # 第一次完整抓取只建立基线
+    assert _crawl(db_manager, ['A', 'B', 'C']) is None
+
+    # 不完整的抓取缺少B、C，不标记下架
+    result = _crawl(db_manager, ['A'], complete=False)
+    assert (result['listed'], result['delisted'], result['changed']) == (0, 0, 0)
+    assert _changes(db_manager) == []
+
+    # 完整抓取缺少C，C下架；B的销售状态变化
+    db_manager.begin_listing('chinawealth')
+    db_manager.save_products([{'product_code': 'A', 'issuer': '甲理财', 'sale_status': '在售'},
+                              {'product_code': 'B', 'issuer': '甲理财', 'sale_status': '停售'}], source='chinawealth')
+    result = db_manager.finish_listing('chinawealth', complete=True)
+    assert (result['listed'], result['delisted'], result['changed']) == (0, 1, 1)
+    assert sorted(_changes(db_manager)) == [('B', 'changed'), ('C', 'delisted')]
+    assert result['file'] and (tmp_path / 'changes').exists()
+
+    # C重新出现
+    result = _crawl(db_manager, ['C'], complete=False)
+    assert (result['listed'], result['delisted']) == (1, 0)
+    assert _changes(db_manager)[-1] == ('C', 'listed')
+    with db_manager.engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT product_code FROM listing_snapshots ORDER BY product_code")).scalars().all() == ['A', 'B', 'C']
+    db_manager.close()
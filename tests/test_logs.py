@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""日志限流"""
+
+import logging
+
+from src.utils.logs import RateLimitFilter
+
+
+def _record(msg, created, level=logging.WARNING):
+    record = logging.LogRecord('crawler', level, __file__, 1, msg, None, None)
+    record.created = created
+    return record
+
+
+def test_rate_limit_state_is_bounded():
+    """消息各不相同的日志不会使限流状态无限增长"""
+    limiter = RateLimitFilter(burst=2, window=60.0, max_keys=100)
+    for i in range(1000):
+        assert limiter.filter(_record(f"产品 {i} 净值异常", created=float(i)))
+    assert len(limiter._state) <= 100
+
+    # 窗口结束后清理过期的位置
+    limiter.filter(_record("第 %s 页抓取完成", created=2000.0))
+    assert list(limiter._state) == [('crawler', logging.WARNING, "第 %s 页抓取完成")]
+
+
+def test_rate_limit_keeps_suppressed_count_until_next_window():
+    """有省略记录的位置在清理时保留，下一个窗口放行的记录附带省略的条数"""
+    limiter = RateLimitFilter(burst=1, window=60.0)
+    assert limiter.filter(_record("第 %s 页重试", created=0.0))
+    assert not limiter.filter(_record("第 %s 页重试", created=1.0))
+    assert not limiter.filter(_record("第 %s 页重试", created=2.0))
+
+    limiter.filter(_record("其他日志", created=100.0))
+    record = _record("第 %s 页重试", created=101.0)
+    assert limiter.filter(record)
+    assert record.suppressed == 2
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""净值分区轮转"""
+
+from datetime import date
+
+from sqlalchemy import text
+
+from src.database.db_manager import DatabaseManager
+
+
+def _insert_nav(conn, product_code, nav_date, current_nav):
+    conn.execute(text(
+        "INSERT INTO product_navs (product_code, nav_date, current_nav, source) "
+        "VALUES (:code, :nav_date, :nav, 'chinawealth')"
+    ), {'code': product_code, 'nav_date': nav_date, 'nav': current_nav})
+
+
+def test_rotate_twice_into_same_month_keeps_rows(tmp_path):
+    """热表的id在轮转后被重新使用，第二次轮转到同一个月表时不能覆盖已有的行"""
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    partitions = db_manager.partitions
+    today = date(2026, 2, 10)
+
+    with db_manager.engine.begin() as conn:
+        _insert_nav(conn, 'A', '2026-01-05', 1.01)
+        _insert_nav(conn, 'A', '2026-01-06', 1.02)
+    assert partitions.rotate(keep_months=1, today=today) == {'202601': 2}
+
+    # 热表清空后，迟到的净值会再次得到id 1
+    with db_manager.engine.begin() as conn:
+        _insert_nav(conn, 'B', '2026-01-05', 0.99)
+        _insert_nav(conn, 'A', '2026-01-06', 1.03)
+        assert conn.execute(text("SELECT MIN(id) FROM product_navs")).scalar() == 1
+    assert partitions.rotate(keep_months=1, today=today) == {'202601': 2}
+
+    with db_manager.engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT product_code, nav_date, current_nav FROM product_navs_202601 ORDER BY product_code, nav_date"
+        )).all()
+        hot_rows = conn.execute(text("SELECT COUNT(*) FROM product_navs")).scalar()
+    assert [tuple(row) for row in rows] == [
+        ('A', '2026-01-05', 1.01),
+        ('A', '2026-01-06', 1.03),
+        ('B', '2026-01-05', 0.99),
+    ]
+    assert hot_rows == 0
+    db_manager.close()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""流水线抓取入库"""
+
+import itertools
+import threading
+from datetime import date
+
+import pytest
+
+from src.database.db_manager import DatabaseManager
+from src.pipeline import IngestPipeline
+
+
+class _PageSource:
+    """按页产出产品的爬虫，pages为None时无限翻页"""
+
+    SOURCE = 'chinawealth'
+
+    def __init__(self, pages=None):
+        self.pages = pages
+        self.fetched = 0
+
+    def iter_pages(self, max_pages=None, session_max_age=None):
+        for page in itertools.count(1) if self.pages is None else range(1, self.pages + 1):
+            self.fetched += 1
+            yield [f'P{page}']
+
+    def _process_page(self, products):
+        today = date.today().isoformat()
+        return ([{'product_code': code, 'issuer': '甲理财'} for code in products],
+                [{'product_code': code, 'nav_date': today, 'current_nav': 1.0} for code in products])
+
+
+def _pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+
+@pytest.fixture
+def db_manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('NAV_VALIDATION', 'false')
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    yield manager
+    manager.close()
+
+
+def test_pipeline_writes_all_pages(db_manager):
+    """全部页面按批写入，统计页数、产品数和净值数"""
+    stats = IngestPipeline(_PageSource(pages=7), db_manager, queue_size=2, write_batch_pages=3).run()
+    assert (stats['pages'], stats['products'], stats['navs']) == (7, 7, 7)
+    assert db_manager.get_products_count() == 7
+    assert not _pipeline_threads()
+
+
+def test_writer_error_propagates_and_stops_fetching(db_manager, monkeypatch):
+    """写入线程出错时run()抛出该异常，抓取线程停止翻页，所有线程结束"""
+    calls = []
+
+    def failing_save(navs, source=None):
+        calls.append(len(navs))
+        raise RuntimeError('磁盘已满')
+
+    monkeypatch.setattr(db_manager, 'save_product_navs', failing_save)
+    scraper = _PageSource()
+    with pytest.raises(RuntimeError, match='磁盘已满'):
+        IngestPipeline(scraper, db_manager, queue_size=2, write_batch_pages=1).run()
+
+    assert len(calls) == 1
+    # 队列有界，抓取线程在背压下最多多抓取两个队列容量和各线程手中的几页
+    assert scraper.fetched < 10
+    assert not _pipeline_threads()
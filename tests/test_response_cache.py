@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""HTTP响应缓存"""
+
+from types import SimpleNamespace
+
+from src.config.config import get_scraper_config
+from src.scrapers import response_cache
+from src.scrapers.response_cache import ResponseCache, cache_key
+
+
+def test_entries_expire_at_ttl(tmp_path, monkeypatch):
+    """记录在有效期内命中，到期后不再返回并被删除"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(response_cache, 'time', SimpleNamespace(time=lambda: clock.now))
+    cache = ResponseCache(str(tmp_path / 'cache.db'), ttl=60)
+    key = cache_key('post', 'http://example.com/query', {'pagenum': 1, 'orderby': ''})
+    cache.put(key, 'http://example.com/query', b'{"List": []}')
+
+    clock.now = 1059.0
+    assert cache.get(key) == b'{"List": []}'
+    clock.now = 1060.0
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+    cache.close()
+
+
+def test_max_cache_age_zero_bypasses_cache(tmp_path, monkeypatch):
+    """缓存默认关闭；--max-cache-age 0时不读取缓存，已有的记录保留"""
+    monkeypatch.delenv('HTTP_CACHE_ENABLED', raising=False)
+    assert ResponseCache.from_config(get_scraper_config()) is None
+
+    config = dict(get_scraper_config(), cache_enabled=True, cache_dir=str(tmp_path))
+    key = cache_key('POST', 'http://example.com/query', {'orderby': None, 'pagenum': '1'})
+    cache = ResponseCache.from_config(config)
+    cache.put(key, 'http://example.com/query', b'page 1')
+    assert cache.get(key) == b'page 1'
+    cache.close()
+
+    cache = ResponseCache.from_config(config, max_age=0)
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 1
+    cache.close()
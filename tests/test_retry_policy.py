@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""重试策略和熔断器"""
+
+import pytest
+
+from src.scrapers.retry_policy import (
+    CAUSE_EMPTY, CAUSE_SERVER_ERROR, CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+)
+
+
+def _breaker(sleeps, **kwargs):
+    options = dict(error_rate=0.5, window=4, min_requests=4, cooldown=30.0, max_trips=1)
+    options.update(kwargs)
+    return CircuitBreaker(sleep=sleeps.append, **options)
+
+
+def test_breaker_trips_at_error_rate():
+    """窗口内失败率达到阈值时打开，未达到最少请求数时不判断"""
+    sleeps = []
+    breaker = _breaker(sleeps)
+    for success in (False, False, True):
+        breaker.record(success)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+    breaker.before_request()
+    assert sleeps == [30.0]
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_probe_success_closes():
+    """探测请求成功后关闭，之后重新统计失败率"""
+    sleeps = []
+    breaker = _breaker(sleeps)
+    for _ in range(4):
+        breaker.record(False)
+    breaker.before_request()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_request()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert sleeps == [30.0]
+
+
+def test_half_open_probe_failure_reopens_until_max_trips():
+    """探测请求失败后再次打开，超过熔断次数上限时放弃抓取"""
+    sleeps = []
+    breaker = _breaker(sleeps)
+    for _ in range(4):
+        breaker.record(False)
+    breaker.before_request()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    assert sleeps == [30.0]
+    assert breaker.paused_seconds == 30.0
+
+
+def test_budget_exhaustion_stops_retries():
+    """预算耗尽后不再重试，页面计入失败页"""
+    budget = RetryBudget(2)
+    assert budget.consume() and budget.consume()
+    assert budget.exhausted and not budget.consume()
+    assert RetryBudget(0).consume() and not RetryBudget(0).exhausted
+
+    policy = RetryPolicy(max_attempts=5, budget=2, breaker=_breaker([], min_requests=100))
+    assert policy.record_failure(1, 1, CAUSE_SERVER_ERROR)
+    assert policy.record_failure(2, 1, CAUSE_SERVER_ERROR)
+    assert not policy.record_failure(3, 1, CAUSE_SERVER_ERROR)
+    summary = policy.summary()
+    assert summary['failed_pages'] == [3]
+    assert summary['retry_causes'] == {CAUSE_SERVER_ERROR: 2}
+    assert summary['budget_used'] == 2
+
+
+def test_empty_pages_do_not_count_toward_breaker():
+    """空数据按空页重试次数决定是否重试，不计入熔断器"""
+    sleeps = []
+    policy = RetryPolicy(max_attempts=5, budget=0, empty_retries=1, breaker=_breaker(sleeps))
+    for page in range(10):
+        assert policy.record_failure(page, 1, CAUSE_EMPTY)
+        assert not policy.record_failure(page, 2, CAUSE_EMPTY)
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+    policy.before_request()
+    assert sleeps == []
+
+    for page in range(4):
+        policy.record_failure(page, 1, CAUSE_SERVER_ERROR)
+    assert policy.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""任务调度"""
+
+from datetime import datetime
+
+import pytest
+
+from src.utils.scheduler import JobScheduler, Schedule
+
+
+@pytest.mark.parametrize('spec, seconds', [('30s', 30), ('15m', 900), ('2h', 7200), ('45', 45), (' 10 M ', 600)])
+def test_interval_schedule(spec, seconds):
+    """固定间隔按单位换算为秒，从基准时间起计算"""
+    schedule = Schedule(spec)
+    assert schedule.interval == seconds and schedule.daily_time is None
+    after = datetime(2026, 3, 2, 23, 59, 50)
+    assert (schedule.next_run(after) - after).total_seconds() == seconds
+
+
+def test_daily_schedule():
+    """每日定时当天未到时取当天，已到或已过时取次日，跨越月末和年末"""
+    schedule = Schedule('02:00')
+    assert schedule.daily_time == (2, 0)
+    assert schedule.next_run(datetime(2026, 3, 2, 1, 59, 59)) == datetime(2026, 3, 2, 2, 0)
+    assert schedule.next_run(datetime(2026, 3, 2, 2, 0)) == datetime(2026, 3, 3, 2, 0)
+    assert schedule.next_run(datetime(2026, 3, 2, 23, 30)) == datetime(2026, 3, 3, 2, 0)
+    assert schedule.next_run(datetime(2026, 2, 28, 12, 0)) == datetime(2026, 3, 1, 2, 0)
+    assert Schedule('23:45').next_run(datetime(2026, 12, 31, 23, 50)) == datetime(2027, 1, 1, 23, 45)
+    assert Schedule('0:05').next_run(datetime(2026, 3, 2, 23, 59, 30)) == datetime(2026, 3, 3, 0, 5)
+
+
+@pytest.mark.parametrize('spec', ['24:00', '12:60', '0s', '1d', 'daily', ''])
+def test_invalid_schedule(spec):
+    """格式不正确的表达式抛出ValueError"""
+    with pytest.raises(ValueError):
+        Schedule(spec)
+
+
+def test_run_job_reschedules_from_completion():
+    """执行后从完成时刻重新计算下次执行时间，失败的任务计入失败次数"""
+    scheduler = JobScheduler()
+    calls = []
+    job = scheduler.add_job('crawl', lambda: calls.append(1), '1h')
+    failing = scheduler.add_job('export', lambda: 1 / 0)
+    assert failing.next_run is None
+
+    scheduler.trigger('crawl')
+    assert scheduler.run_pending() == ['crawl']
+    assert calls == [1]
+    assert 3590 < (job.next_run - datetime.now()).total_seconds() <= 3600
+
+    assert not scheduler.run_job('export')
+    assert failing.stats()['failure_count'] == 1 and failing.next_run is None
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""产品全文检索"""
+
+from src.database.db_manager import DatabaseManager
+from src.database.search import bigram_text, fts_query
+
+
+def _codes(db_manager, query):
+    return sorted(item['product'].product_code for item in db_manager.search_products(query)['items'])
+
+
+def test_bigram_tokens():
+    """中文切分为相邻两字并补末尾单字，英文数字按小写单词保留"""
+    assert bigram_text('招银理财A款') == '招银 银理 理财 财 a 款'
+    assert fts_query('理财') == '"理财"'
+    assert fts_query('银') == '"银"*'
+    assert fts_query('稳健7天') == '"稳健 健 7 天"*'
+    assert fts_query('  ') == ''
+
+
+def test_search_cjk_and_mixed_queries(tmp_path):
+    """单字、双字和中英文混合的检索词都能命中，写入产品时增量更新索引"""
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    assert db_manager.search_index.mode == 'fts5'
+    db_manager.save_products([
+        {'product_code': 'A', 'product_name': '招银理财招睿稳健7天持有期', 'issuer': '招银理财', 'sale_regions': '全国'},
+        {'product_code': 'B', 'product_name': '工银理财恒睿睿益ESG主题', 'issuer': '工银理财', 'sale_regions': '北京'},
+        {'product_code': 'C', 'product_name': '阳光金12M丰利', 'issuer': '光大理财', 'sale_regions': '上海'},
+    ])
+
+    assert _codes(db_manager, '睿') == ['A', 'B']
+    assert _codes(db_manager, '理财') == ['A', 'B', 'C']
+    assert _codes(db_manager, '招银') == ['A']
+    assert _codes(db_manager, '稳健7天') == ['A']
+    assert _codes(db_manager, 'esg') == ['B']
+    assert _codes(db_manager, '金12M') == ['C']
+    assert _codes(db_manager, '12') == ['C']
+    # 检索词须在原文中连续出现，多个检索词之间为AND
+    assert _codes(db_manager, '银招') == []
+    assert _codes(db_manager, '理财 北京') == ['B']
+    # 名称命中的权重高于销售区域
+    assert db_manager.search_products('上海')['items'][0]['product'].product_code == 'C'
+
+    # 更新产品后旧名称不再命中，新名称命中
+    db_manager.save_products([{'product_code': 'C', 'product_name': '光大阳光橙安盈', 'issuer': '光大理财',
+                               'sale_regions': '上海'}])
+    assert _codes(db_manager, '丰利') == []
+    assert _codes(db_manager, '橙安') == ['C']
+    db_manager.save_products([{'product_code': 'D', 'product_name': '中银理财睿享', 'issuer': '中银理财'}])
+    assert _codes(db_manager, '睿') == ['A', 'B', 'D']
+    db_manager.close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""净值入库校验和隔离"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from src.database.db_manager import DatabaseManager
+from src.database.validation import ACTION_QUARANTINE, ACTION_RELEASED, REASON_JUMP
+
+
+def _navs(db_manager):
+    with db_manager.engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(
+            "SELECT product_code, nav_date, current_nav FROM product_navs_all ORDER BY product_code, nav_date"))]
+
+
+def test_spike_is_quarantined_and_released(tmp_path, monkeypatch):
+    """超过涨跌幅阈值的净值被隔离、不写入净值表，正常净值照常入库，放行后写入净值表"""
+    monkeypatch.setenv('NAV_ANOMALY_ACTION', 'quarantine')
+    monkeypatch.setenv('NAV_MAX_CHANGE', '0.2')
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'navs.db'}", archive_dir=str(tmp_path / 'archive'))
+    db_manager.save_products([{'product_code': code, 'issuer': '甲理财'} for code in ('A', 'B')])
+    yesterday, today = (date.today() - timedelta(days=1)).isoformat(), date.today().isoformat()
+    db_manager.save_product_navs([
+        {'product_code': 'A', 'nav_date': yesterday, 'current_nav': 1.00, 'accumulated_nav': 1.00},
+        {'product_code': 'B', 'nav_date': yesterday, 'current_nav': 1.00, 'accumulated_nav': 1.00},
+    ])
+    assert db_manager.save_product_navs([
+        {'product_code': 'A', 'nav_date': today, 'current_nav': 1.01, 'accumulated_nav': 1.01},
+        {'product_code': 'B', 'nav_date': today, 'current_nav': 1.50, 'accumulated_nav': 1.50},
+    ], source='chinawealth') == 1
+
+    assert _navs(db_manager) == [('A', yesterday, 1.0), ('A', today, 1.01), ('B', yesterday, 1.0)]
+    anomaly, = db_manager.get_nav_anomalies()
+    assert (anomaly.product_code, anomaly.current_nav, anomaly.prev_current_nav) == ('B', 1.5, 1.0)
+    assert REASON_JUMP in anomaly.reasons.split(',')
+    assert anomaly.action == ACTION_QUARANTINE
+
+    assert db_manager.release_nav_anomalies([anomaly.id]) == 1
+    assert ('B', today, 1.5) in _navs(db_manager)
+    assert db_manager.get_nav_anomalies()[0].action == ACTION_RELEASED
+    # 已放行的记录不会重复写入
+    assert db_manager.release_nav_anomalies([anomaly.id]) == 0
+    cell = db_manager.cube.query(start_date=date.today(), end_date=date.today())[0]
+    assert cell['product_count'] == 2
+    db_manager.close()